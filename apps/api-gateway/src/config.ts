@@ -19,6 +19,9 @@ export const OPENROUTER_API_KEY = process.env.OPENROUTER_API_KEY as string;
 export const OPENROUTER_URL = process.env.OPENROUTER_URL as string;
 export const ML_SERVICE_URL = process.env.ML_SERVICE_URL || process.env.VITE_API_URL_FASTAPI1 || 'http://localhost:8000';
 export const FRONTEND_URL = process.env.FRONTEND_URL || process.env.VITE_FRONTEND_URL || 'http://localhost:5173';
+// Trace export: a file path (OTLP/JSON lines) or an OTLP/HTTP collector URL; tracing is off while empty
+export const TRACE_EXPORT = process.env.TRACE_EXPORT || '';
+export const TRACE_SAMPLE_RATE = parseFloat(process.env.TRACE_SAMPLE_RATE || '1.0');
 
 // 🔒 Validate critical environment variables (only log if missing)
 const requiredEnvVars = [
@@ -7,6 +7,7 @@ import Account from '../models/Account';
 import axios from 'axios';
 import { OPENROUTER_URL, ML_SERVICE_URL, FRONTEND_URL } from '../config';
 import { trackUsage, getApiKey } from '../middleware/usageTracking';
+import { SpanContext, traceRequest, withSpan } from '../utils/tracing';
 
 
 // OpenRouter API response interface
@@ -36,8 +37,8 @@ const FREE_MODELS = [
   'google/gemma-3n-e2b-it:free'
 ];
 
-// Helper function to call OpenRouter API with fallback models
-async function callOpenRouterAPI(prompt: string, apiKey: string, conversationHistory: Array<{ role: string, content: string }>): Promise<string> {
+// Helper function to call OpenRouter API with fallback models (one trace span per attempt)
+async function callOpenRouterAPI(prompt: string, apiKey: string, conversationHistory: Array<{ role: string, content: string }>, parent: SpanContext | null = null): Promise<string> {
   const systemPrompt = `You are MedChat, a caring medical assistant. Answer in 2-3 sentences MAX.
 
 FORBIDDEN:
@@ -68,7 +69,7 @@ Bad: "Hello! I'm here to help with your medication questions. Based on the infor
         { role: 'user', content: prompt }
       ];
 
-      const response = await axios.post<OpenRouterResponse>(
+      const response = await withSpan('llm openrouter', parent, () => axios.post<OpenRouterResponse>(
         OPENROUTER_URL,
         {
           model: model,
@@ -83,7 +84,7 @@ Bad: "Hello! I'm here to help with your medication questions. Based on the infor
           },
           timeout: 30000
         }
-      );
+      ), { 'llm.model': model, 'llm.attempt': i + 1 }, 'client');
 
       let aiResponse = response.data.choices?.[0]?.message?.content?.trim();
 
@@ -172,6 +173,7 @@ router.get('/:patientId', async (req: Request, res: Response): Promise<void> =>
 
 // Send message and get AI response
 router.post('/message', trackUsage, async (req: Request, res: Response): Promise<void> => {
+  const span = traceRequest(req, res, '/api/chat/message');
   try {
     const { patientId, content, userId } = req.body;
 
@@ -188,10 +190,11 @@ router.post('/message', trackUsage, async (req: Request, res: Response): Promise
 
 
     // Fetch recent conversation history (last 10 messages)
-    const recentMessages = await ChatMessage.find({ patientId })
+    const recentMessages = await withSpan('chat.load_history', span, () => ChatMessage.find({ patientId })
       .sort({ timestamp: -1 })
       .limit(10)
-      .lean();
+      .lean()
+      .exec());
 
     // Build conversation history for context (reverse to chronological order)
     const conversationHistory = recentMessages
@@ -233,7 +236,7 @@ Rules:
     let extractedData: any = {};
 
     try {
-      const analysisResponse = await callOpenRouterAPI(analysisPrompt, apiKey, []);
+      const analysisResponse = await withSpan('chat.intent', span, (s) => callOpenRouterAPI(analysisPrompt, apiKey, [], s));
 
       // Extract JSON from response
       const jsonMatch = analysisResponse.match(/\{[\s\S]*\}/);
@@ -311,7 +314,10 @@ Rules:
     // Try to get structured patient data from MongoDB (consultation notes)
     let structuredData: any = null;
     try {
-      const response = await axios.get<{ notes: any[] }>(`${ML_SERVICE_URL}/api/patient-history?patientId=${patientId}`);
+      const response = await withSpan('ml-service GET /api/patient-history', span, (s) =>
+        axios.get<{ notes: any[] }>(`${ML_SERVICE_URL}/api/patient-history?patientId=${patientId}`, {
+          headers: { traceparent: s.traceparent }
+        }), {}, 'client');
       if (response.data?.notes && response.data.notes.length > 0) {
         const latestNote = response.data.notes[0];
         structuredData = latestNote.structured;
@@ -388,7 +394,7 @@ Rules:
     }
 
     // Call AI with conversation history
-    const aiContent = await callOpenRouterAPI(aiPrompt, apiKey, conversationHistory);
+    const aiContent = await withSpan('chat.answer', span, (s) => callOpenRouterAPI(aiPrompt, apiKey, conversationHistory, s));
 
 
     // Save AI response
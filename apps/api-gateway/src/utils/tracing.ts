@@ -0,0 +1,179 @@
+import { randomBytes } from 'crypto';
+import { promises as fs } from 'fs';
+import { Request, Response } from 'express';
+import axios from 'axios';
+import { TRACE_EXPORT, TRACE_SAMPLE_RATE } from '../config';
+
+/**
+ * Request tracing with W3C trace context (traceparent).
+ *
+ * Routes open a server span per request with traceRequest(), child spans
+ * with withSpan(), and pass `traceparent` on to the ml-service so its spans
+ * (and the ddi-service's) join the same trace. Finished spans are exported
+ * in batches as OTLP/JSON, in the same format as the Python services:
+ * appended to the TRACE_EXPORT file or POSTed to an OTLP/HTTP collector when
+ * TRACE_EXPORT is a URL. Nothing is exported while TRACE_EXPORT is empty.
+ */
+
+export interface SpanContext {
+  traceId: string;
+  spanId: string;
+  sampled: boolean;
+}
+
+type SpanKind = 'internal' | 'server' | 'client';
+type AttributeValue = string | number | boolean | undefined;
+
+const SERVICE_NAME = 'api-gateway';
+const KINDS: Record<SpanKind, number> = { internal: 1, server: 2, client: 3 };
+const MAX_PENDING = 20000;
+
+// Wall clock in nanoseconds with hrtime resolution
+const EPOCH_OFFSET_NS = BigInt(Date.now()) * 1000000n - process.hrtime.bigint();
+const nowNs = (): bigint => EPOCH_OFFSET_NS + process.hrtime.bigint();
+
+/**
+ * Parses a traceparent header value; returns null if it is missing or malformed
+ */
+export const parseTraceparent = (value: string | string[] | undefined): SpanContext | null => {
+  if (typeof value !== 'string') return null;
+  const m = /^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$/.exec(value.trim().toLowerCase());
+  if (!m || m[1] === 'ff' || (m[1] === '00' && m[5]) || /^0+$/.test(m[2]) || /^0+$/.test(m[3])) {
+    return null;
+  }
+  return { traceId: m[2], spanId: m[3], sampled: (parseInt(m[4], 16) & 1) === 1 };
+};
+
+export const formatTraceparent = (ctx: SpanContext): string =>
+  `00-${ctx.traceId}-${ctx.spanId}-${ctx.sampled ? '01' : '00'}`;
+
+export class Span implements SpanContext {
+  readonly traceId: string;
+  readonly spanId: string;
+  readonly parentSpanId: string;
+  readonly sampled: boolean;
+  private readonly startNs = nowNs();
+  private attributes: Record<string, AttributeValue>;
+  private error?: string;
+  private ended = false;
+
+  constructor(public name: string, parent: SpanContext | null, private kind: SpanKind = 'internal',
+              attributes: Record<string, AttributeValue> = {}) {
+    this.traceId = parent ? parent.traceId : randomBytes(16).toString('hex');
+    this.parentSpanId = parent ? parent.spanId : '';
+    this.sampled = parent ? parent.sampled : Math.random() < TRACE_SAMPLE_RATE;
+    this.spanId = randomBytes(8).toString('hex');
+    this.attributes = { ...attributes };
+  }
+
+  set(key: string, value: AttributeValue): this {
+    this.attributes[key] = value;
+    return this;
+  }
+
+  fail(error: any): this {
+    this.error = error?.message || String(error);
+    return this;
+  }
+
+  /** Header for outgoing requests made within this span */
+  get traceparent(): string {
+    return formatTraceparent(this);
+  }
+
+  end(): void {
+    if (this.ended) return;
+    this.ended = true;
+    if (!TRACE_EXPORT || !this.sampled) return;
+    submit({
+      traceId: this.traceId,
+      spanId: this.spanId,
+      parentSpanId: this.parentSpanId,
+      name: this.name,
+      kind: KINDS[this.kind],
+      startTimeUnixNano: this.startNs.toString(),
+      endTimeUnixNano: nowNs().toString(),
+      attributes: Object.entries(this.attributes)
+        .filter(([, value]) => value !== undefined)
+        .map(([key, value]) => ({ key, value: otlpValue(value) })),
+      status: this.error ? { code: 2, message: this.error } : {}
+    });
+  }
+}
+
+const otlpValue = (value: AttributeValue) => {
+  if (typeof value === 'boolean') return { boolValue: value };
+  if (typeof value === 'number') return Number.isInteger(value) ? { intValue: String(value) } : { doubleValue: value };
+  return { stringValue: String(value) };
+};
+
+/**
+ * Starts the server span of a request, continuing the caller's trace if it
+ * sent a traceparent header. The span ends when the response is finished.
+ */
+export const traceRequest = (req: Request, res: Response, route: string): Span => {
+  const span = new Span(`${req.method} ${route}`, parseTraceparent(req.headers.traceparent), 'server', {
+    'http.method': req.method,
+    'http.route': route
+  });
+  res.on('finish', () => {
+    span.set('http.status_code', res.statusCode);
+    if (res.statusCode >= 500) span.fail(`HTTP ${res.statusCode}`);
+    span.end();
+  });
+  return span;
+};
+
+/**
+ * Runs fn inside a child span of parent, recording a thrown error on the span
+ */
+export async function withSpan<T>(name: string, parent: SpanContext | null, fn: (span: Span) => Promise<T>,
+                                  attributes: Record<string, AttributeValue> = {},
+                                  kind: SpanKind = 'internal'): Promise<T> {
+  const span = new Span(name, parent, kind, attributes);
+  try {
+    return await fn(span);
+  } catch (error) {
+    span.fail(error);
+    throw error;
+  } finally {
+    span.end();
+  }
+}
+
+// ─── Export ───────────────────────────────────────────────────────────
+let pending: object[] = [];
+let dropped = 0;
+
+function submit(span: object): void {
+  if (pending.length >= MAX_PENDING) {
+    dropped++;
+    return;
+  }
+  pending.push(span);
+}
+
+async function flush(): Promise<void> {
+  if (pending.length === 0) return;
+  const spans = pending;
+  pending = [];
+  const payload = {
+    resourceSpans: [{
+      resource: { attributes: [{ key: 'service.name', value: { stringValue: SERVICE_NAME } }] },
+      scopeSpans: [{ scope: { name: 'drugnexus.tracing' }, spans }]
+    }]
+  };
+  try {
+    if (/^https?:\/\//.test(TRACE_EXPORT)) {
+      await axios.post(TRACE_EXPORT, payload, { timeout: 5000 });
+    } else {
+      await fs.appendFile(TRACE_EXPORT, JSON.stringify(payload) + '\n');
+    }
+  } catch (error: any) {
+    console.error(`⚠️ Trace export to ${TRACE_EXPORT} failed (${spans.length} spans, ${dropped} dropped):`, error.message);
+  }
+}
+
+if (TRACE_EXPORT) {
+  setInterval(() => { void flush(); }, 2000).unref();
+}
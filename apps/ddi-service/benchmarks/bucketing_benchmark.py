@@ -0,0 +1,71 @@
+# benchmarks/bucketing_benchmark.py
+# Padding waste and throughput of the ChemBERTa batching strategies in
+# models/chemberta_encoder.py (naive / length-sorted / token-budget buckets)
+# on the unique drug SMILES of the PDI CSV.
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.bucketing_benchmark --limit 1000 --batch-size 32 --token-budget 8192
+
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from config2 import PDI_CONDITIONS_CSV
+from models.chemberta_encoder import BUCKET_STRATEGIES, get_base_encoder, padding_stats, plan_batches
+
+
+def load_smiles(csv_path: str, limit: int = None, seed: int = 42):
+    smiles = pd.read_csv(csv_path, usecols=["smiles"])["smiles"].dropna().drop_duplicates()
+    if limit and limit < len(smiles):
+        smiles = smiles.sample(n=limit, random_state=seed)
+    return smiles.tolist()
+
+
+def run(encoder, smiles, strategy: str, batch_size: int, token_budget: int) -> dict:
+    lengths = [len(ids) for ids in encoder.token_ids(smiles)]  # cached after the first strategy
+    stats = padding_stats(lengths, plan_batches(lengths, strategy, batch_size=batch_size, token_budget=token_budget))
+    t0 = time.perf_counter()
+    encoder._encode_batch(smiles, strategy, batch_size=batch_size, token_budget=token_budget)
+    elapsed = time.perf_counter() - t0
+    stats.update(strategy=strategy, seconds=elapsed, smiles_per_s=len(smiles) / elapsed,
+                 real_tokens_per_s=stats["real_tokens"] / elapsed)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChemBERTa batching strategies")
+    parser.add_argument("--csv", default=PDI_CONDITIONS_CSV, help="CSV with a smiles column")
+    parser.add_argument("--limit", type=int, default=1000, help="number of unique SMILES to encode")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    encoder = get_base_encoder()
+    smiles = load_smiles(args.csv, args.limit)
+    encoder._encode_batch(smiles[:8])  # warm-up
+
+    results = []
+    print(f"{len(smiles)} SMILES, batch size {args.batch_size}, token budget {args.token_budget}")
+    print(f"{'strategy':>8} {'batches':>8} {'padding tok':>12} {'padding %':>10} {'seconds':>8} {'SMILES/s':>9}")
+    for strategy in BUCKET_STRATEGIES:
+        r = run(encoder, smiles, strategy, args.batch_size, args.token_budget)
+        results.append(r)
+        print(f"{strategy:>8} {r['batches']:>8} {r['padding_tokens']:>12} {r['padding_fraction']:>9.1%} "
+              f"{r['seconds']:>8.2f} {r['smiles_per_s']:>9.1f}")
+
+    naive = results[0]
+    for r in results[1:]:
+        saved = naive["padding_tokens"] - r["padding_tokens"]
+        print(f"{r['strategy']}: {saved} padding tokens saved vs naive, "
+              f"{r['smiles_per_s'] / naive['smiles_per_s']:.2f}x throughput")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
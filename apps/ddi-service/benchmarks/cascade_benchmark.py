@@ -0,0 +1,115 @@
+# benchmarks/cascade_benchmark.py
+# Measures how much ChemBERTa work the /predict-ddi cascade avoids on a
+# realistic regimen mix, compared with running the type classifier on every
+# pair (as /predict-ddi-batch does).
+#
+# Regimens are drawn from the drugs in the PDI training CSV with a
+# polypharmacy-like size distribution; every ordered pair in a regimen is
+# scored, as the ml-service screening does.
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.cascade_benchmark --regimens 200 --thresholds 0.3 0.5 0.7
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from config2 import PDI_CONDITIONS_CSV
+from models import DLTypeClassificationInference as type_inference
+from models.ddi_cascade import predict_cascade
+from models.hybrid_binary_ddi_inference import generate_fingerprint
+
+# Number of active medications per regimen and its relative frequency
+REGIMEN_SIZES = [2, 3, 4, 5, 6, 7, 8, 10, 12]
+REGIMEN_WEIGHTS = [10, 14, 16, 16, 14, 10, 8, 7, 5]
+
+
+def load_drugs(csv_path: str):
+    """Unique drug SMILES from the PDI CSV that RDKit can fingerprint."""
+    df = pd.read_csv(csv_path, usecols=["drug_name", "smiles"]).dropna().drop_duplicates("smiles")
+    smiles = []
+    for smi in df["smiles"]:
+        try:
+            generate_fingerprint(smi)
+            smiles.append(smi)
+        except ValueError:
+            continue
+    return smiles
+
+
+def make_regimens(smiles, n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    weights = np.array(REGIMEN_WEIGHTS, dtype=float) / sum(REGIMEN_WEIGHTS)
+    sizes = rng.choice(REGIMEN_SIZES, size=n, p=weights)
+    return [[smiles[i] for i in rng.choice(len(smiles), size=k, replace=False)] for k in sizes]
+
+
+def regimen_pairs(regimen):
+    return [(a, b) for a in regimen for b in regimen if a != b]
+
+
+def _clear_embedding_cache():
+    type_inference.encoder.clear_cache()
+
+
+def run(regimens, threshold: float, top_k: int = 3):
+    """Cascade vs. type classifier on every pair, each regimen starting with a
+    cold embedding cache so encoder passes are comparable."""
+    stats = {"pairs": 0, "type_stage_pairs": 0, "unique_smiles": 0, "type_stage_smiles": 0,
+             "cascade_s": 0.0, "full_s": 0.0}
+    for regimen in regimens:
+        pairs = regimen_pairs(regimen)
+
+        _clear_embedding_cache()
+        t0 = time.perf_counter()
+        _, summary = predict_cascade(pairs, threshold, top_k=top_k)
+        stats["cascade_s"] += time.perf_counter() - t0
+
+        _clear_embedding_cache()
+        t0 = time.perf_counter()
+        predict_cascade(pairs, threshold=float("-inf"), top_k=top_k)
+        stats["full_s"] += time.perf_counter() - t0
+
+        for key in ("pairs", "type_stage_pairs", "unique_smiles", "type_stage_smiles"):
+            stats[key] += summary[key]
+
+    stats["threshold"] = threshold
+    stats["type_pair_fraction"] = stats["type_stage_pairs"] / max(stats["pairs"], 1)
+    stats["encoder_passes_saved"] = 1 - stats["type_stage_smiles"] / max(stats["unique_smiles"], 1)
+    stats["speedup"] = stats["full_s"] / max(stats["cascade_s"], 1e-9)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the binary → type DDI cascade")
+    parser.add_argument("--csv", default=PDI_CONDITIONS_CSV, help="CSV with drug_name and smiles columns")
+    parser.add_argument("--regimens", type=int, default=200)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    regimens = make_regimens(load_drugs(args.csv), args.regimens, args.seed)
+    # Warm fingerprints and the encoder so the first regimen is not an outlier.
+    predict_cascade(regimen_pairs(regimens[0]), threshold=float("-inf"))
+
+    results = []
+    print(f"{len(regimens)} regimens, {sum(len(regimen_pairs(r)) for r in regimens)} ordered pairs")
+    print(f"{'threshold':>9} {'type pairs':>11} {'encoder saved':>14} {'cascade s':>10} {'full s':>8} {'speedup':>8}")
+    for threshold in args.thresholds:
+        stats = run(regimens, threshold, args.top_k)
+        results.append(stats)
+        print(f"{threshold:>9.2f} {stats['type_pair_fraction']:>10.1%} {stats['encoder_passes_saved']:>13.1%} "
+              f"{stats['cascade_s']:>10.2f} {stats['full_s']:>8.2f} {stats['speedup']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/corpora.py
+# Fixed inputs for the ddi-service benchmark suite (benchmarks/ddi_suite.py).
+#
+# SMILES, drug pairs and search queries are sampled with a fixed seed from
+# the PDI training CSV; clinical notes are synthetic, built from templates
+# with made-up identifiers and the CSV's drug and condition names. The
+# result is committed as benchmarks/corpora.json so runs stay comparable
+# even if the CSV changes. Regenerate with
+#   python -m benchmarks.corpora --csv ... --out benchmarks/corpora.json
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from rdkit import Chem, RDLogger
+
+from config2 import PDI_CONDITIONS_CSV
+
+RDLogger.DisableLog('rdApp.*')
+
+CORPORA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora.json")
+
+FIRST_NAMES = ["John", "Maria", "Wei", "Aisha", "Carlos", "Emma", "Noah", "Fatima", "Liam", "Olga"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Khan", "Silva", "Johnson", "Brown", "Ivanova", "Okafor", "Nguyen"]
+STREETS = ["Main Street", "Oak Avenue", "Pine Road", "Maple Lane", "Cedar Drive"]
+NOTE_TEMPLATES = [
+    "Patient {name} (MRN {mrn}) seen on {date} for follow-up of {condition}. Currently taking {drug1} and "
+    "{drug2}. Lives at {address}. Contact: {phone}.",
+    "{date}: {name}, DOB {dob}, presents with worsening {condition}. Started {drug1}; {drug2} discontinued "
+    "due to side effects. Referred by Dr. {doctor}. Email {email}.",
+    "Discharge summary for {name}. Admitted {date} with {condition}. Medications on discharge: {drug1}, "
+    "{drug2}, {drug3}. Follow up with Dr. {doctor} at {address}, phone {phone}. ID {mrn}.",
+    "Telephone note {date}: {name} reports dizziness after adding {drug1} to {drug2}. History of "
+    "{condition}. Callback number {phone}.",
+]
+
+
+def _note(rng, drugs, conditions) -> str:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    picked = rng.choice(drugs, size=3, replace=False)
+    return rng.choice(NOTE_TEMPLATES).format(
+        name=name,
+        doctor=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        mrn=str(rng.integers(10**7, 10**8)),
+        date=f"{rng.integers(1, 13):02d}/{rng.integers(1, 29):02d}/20{rng.integers(18, 26)}",
+        dob=f"{rng.integers(1, 13):02d}/{rng.integers(1, 29):02d}/19{rng.integers(40, 100)}",
+        phone=f"555{rng.integers(10**6, 10**7)}",
+        email=f"{name.split()[0].lower()}.{name.split()[1].lower()}@example.com",
+        address=f"{rng.integers(1, 999)} {rng.choice(STREETS)}",
+        condition=rng.choice(conditions),
+        drug1=picked[0], drug2=picked[1], drug3=picked[2],
+    )
+
+
+def build(csv_path: str, n_smiles: int = 200, n_pairs: int = 200, n_notes: int = 60,
+          n_queries: int = 100, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(csv_path, usecols=["drug_name", "condition", "smiles"]).dropna()
+    unique = df.drop_duplicates("smiles")
+    valid = [s for s in unique["smiles"] if Chem.MolFromSmiles(s) is not None]
+    smiles = [valid[i] for i in sorted(rng.choice(len(valid), size=min(n_smiles, len(valid)), replace=False))]
+    pairs = [[smiles[a], smiles[b]] for a, b in rng.choice(len(smiles), size=(n_pairs, 2))]
+
+    drugs = sorted(unique["drug_name"].unique())
+    conditions = sorted(df["condition"].unique())
+    notes = [_note(rng, drugs, conditions) for _ in range(n_notes)]
+    queries = [str(drugs[i])[:int(rng.integers(2, 6))] for i in rng.choice(len(drugs), size=n_queries)]
+    return {"seed": seed, "smiles": smiles, "pairs": pairs, "notes": notes, "queries": queries}
+
+
+def load(path: str = CORPORA_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fixed benchmark corpora")
+    parser.add_argument("--csv", default=PDI_CONDITIONS_CSV)
+    parser.add_argument("--out", default=CORPORA_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    corpora = build(args.csv, seed=args.seed)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(corpora, f, indent=1)
+    print(f"✅ {len(corpora['smiles'])} SMILES, {len(corpora['pairs'])} pairs, {len(corpora['notes'])} notes, "
+          f"{len(corpora['queries'])} queries → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
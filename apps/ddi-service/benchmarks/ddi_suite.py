@@ -0,0 +1,244 @@
+# benchmarks/ddi_suite.py
+# Reproducible latency / throughput benchmarks for the ddi-service inference
+# paths, on the fixed inputs in benchmarks/corpora.json.
+#
+# Every target runs in its own subprocess, so cold start (imports, model
+# load and first call) and peak RSS are measured per target. After the
+# first call, a target reports sequential p50/p95/p99 latency and
+# throughput with 1..N client threads.
+#
+#   smiles_to_embedding        ChemBERTa mean embedding, embedding cache disabled
+#   predict_ddi                embedding + 86-class head, embedding cache disabled
+#   generate_fingerprint       Morgan + MACCS fingerprint, fingerprint cache bypassed
+#   predict_hybrid_binary_ddi  hybrid binary model, fingerprints cached as in serving
+#   deidentify_text            NER + regex de-identification of a clinical note
+#   search_drugs               /search-drugs prefix query (needs MongoDB; skipped otherwise)
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.ddi_suite run --stub-models --out before.json
+#   python -m benchmarks.ddi_suite run --stub-models --out after.json
+#   python -m benchmarks.ddi_suite compare before.json after.json --threshold 0.10
+# `compare` exits with status 1 if any metric regressed by more than the threshold.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks import corpora
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Skip(Exception):
+    pass
+
+
+# ─── Targets ────────────────────────────────────
+# Each setup() loads what the target needs and returns op(item).
+
+def _setup_smiles_to_embedding():
+    from models import DLTypeClassificationInference as type_inference
+    type_inference.encoder.cache_size = 0
+    return type_inference.smiles_to_embedding
+
+def _setup_predict_ddi():
+    from models import DLTypeClassificationInference as type_inference
+    type_inference.encoder.cache_size = 0
+    return lambda pair: type_inference.predict_ddi(*pair)
+
+def _setup_generate_fingerprint():
+    from models.hybrid_binary_ddi_inference import generate_fingerprint
+    return generate_fingerprint.__wrapped__
+
+def _setup_predict_hybrid_binary_ddi():
+    from models.hybrid_binary_ddi_inference import predict_hybrid_binary_ddi
+    return lambda pair: predict_hybrid_binary_ddi(*pair)
+
+def _setup_deidentify_text():
+    try:
+        from models.deidentifier import deidentify_text
+    except Exception:
+        from models.deidentifier_fallback import deidentify_text
+    return deidentify_text
+
+def _setup_search_drugs():
+    import server2
+    try:
+        server2.mongo_client.admin.command("ping")
+    except Exception as e:
+        raise Skip(f"skipped, MongoDB not reachable: {str(e).split(',')[0]}")
+    return server2.search_drugs
+
+TARGETS = {
+    "smiles_to_embedding": ("smiles", _setup_smiles_to_embedding),
+    "predict_ddi": ("pairs", _setup_predict_ddi),
+    "generate_fingerprint": ("smiles", _setup_generate_fingerprint),
+    "predict_hybrid_binary_ddi": ("pairs", _setup_predict_hybrid_binary_ddi),
+    "deidentify_text": ("notes", _setup_deidentify_text),
+    "search_drugs": ("queries", _setup_search_drugs),
+}
+
+
+def _percentiles(latencies) -> dict:
+    ms = np.asarray(latencies) * 1e3
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+def measure(name: str, requests: int, concurrency) -> dict:
+    """Runs one target in this process; call in a fresh process."""
+    corpus_key, setup = TARGETS[name]
+    items = corpora.load()[corpus_key]
+
+    t0 = time.perf_counter()
+    op = setup()
+    loaded = time.perf_counter()
+    op(items[0])
+    first = time.perf_counter()
+    result = {"load_s": loaded - t0, "first_call_ms": (first - loaded) * 1e3, "cold_start_s": first - t0}
+
+    work = [items[i % len(items)] for i in range(1, requests + 1)]
+    latencies = []
+    for item in work:
+        start = time.perf_counter()
+        op(item)
+        latencies.append(time.perf_counter() - start)
+    result.update(_percentiles(latencies))
+
+    result["throughput"] = {}
+    for threads in concurrency:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            list(ex.map(op, work))
+        result["throughput"][str(threads)] = len(work) / (time.perf_counter() - start)
+
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+# ─── Run ────────────────────────────────────────
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def run(targets, requests: int, concurrency, stub_dir=None, timeout: int = 1800) -> dict:
+    env = dict(os.environ)
+    if stub_dir:
+        from benchmarks.stub_models import build
+        env.update(build(stub_dir))
+
+    report = {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+                 "stub_models": bool(stub_dir), "requests": requests, "concurrency": list(concurrency),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "targets": {},
+    }
+    for name in targets:
+        cmd = [sys.executable, "-m", "benchmarks.ddi_suite", "target", name,
+               "--requests", str(requests), "--concurrency", *map(str, concurrency)]
+        proc = subprocess.run(cmd, cwd=SERVICE_DIR, env=env, capture_output=True, text=True, timeout=timeout)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+        if lines:
+            result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        else:
+            result = {"error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+        report["targets"][name] = result
+        _print_row(name, result)
+    return report
+
+def _print_row(name: str, r: dict):
+    if "error" in r or "skipped" in r:
+        print(f"{name:<26} {r.get('skipped') or 'failed: ' + r['error']}")
+        return
+    tput = " ".join(f"{c}:{v:.0f}/s" for c, v in r["throughput"].items())
+    print(f"{name:<26} cold {r['cold_start_s']:6.2f}s  p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}  "
+          f"p99 {r['p99_ms']:8.2f} ms  {tput}  peak {r['peak_rss_mb']:.0f} MB")
+
+
+# ─── Compare ────────────────────────────────────
+# (metric, True if higher is better)
+COMPARED = [("cold_start_s", False), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False),
+            ("peak_rss_mb", False)]
+
+def compare(base: dict, new: dict, threshold: float):
+    """[(target, metric, base, new, relative change, regressed)] for every
+    metric both runs have. Throughput is compared per concurrency level."""
+    rows = []
+    for name, b in base["targets"].items():
+        n = new["targets"].get(name)
+        if not n or "p50_ms" not in b or "p50_ms" not in n:
+            continue
+        metrics = [(m, higher, b[m], n[m]) for m, higher in COMPARED]
+        metrics += [(f"throughput@{c}", True, v, n["throughput"][c]) for c, v in b["throughput"].items()
+                    if c in n["throughput"]]
+        for metric, higher_better, old, cur in metrics:
+            change = (cur - old) / old if old else 0.0
+            worse = -change if higher_better else change
+            rows.append((name, metric, old, cur, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ddi-service latency/throughput benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="benchmark every target, each in a fresh process")
+    p_run.add_argument("--out", required=True, help="JSON results file")
+    p_run.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    p_run.add_argument("--requests", type=int, default=200)
+    p_run.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    p_run.add_argument("--stub-models", action="store_true", help="use tiny random models (benchmarks/stub_models.py)")
+    p_run.add_argument("--stub-dir", default="/tmp/ddi_stub_models")
+
+    p_target = sub.add_parser("target", help="(internal) benchmark one target in this process")
+    p_target.add_argument("name", choices=list(TARGETS))
+    p_target.add_argument("--requests", type=int, default=200)
+    p_target.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+
+    p_cmp = sub.add_parser("compare", help="flag regressions between two result files")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "target":
+        try:
+            result = measure(args.name, args.requests, args.concurrency)
+        except Skip as e:
+            result = {"skipped": str(e)}
+        print(RESULT_PREFIX + json.dumps(result))
+
+    elif args.command == "run":
+        report = run(args.targets, args.requests, args.concurrency, args.stub_dir if args.stub_models else None)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        rows = compare(base, new, args.threshold)
+        print(f"{'target':<26} {'metric':<16} {'base':>10} {'new':>10} {'change':>8}")
+        for name, metric, old, cur, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<26} {metric:<16} {old:>10.2f} {cur:>10.2f} {change:>+7.1%}{flag}")
+        regressions = sum(r[5] for r in rows)
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/layer_cutoff_eval.py
+# Agreement and latency of layer-truncated ChemBERTa DDI heads ("shallow"
+# mode) against the full model, one row per layer cut-off. Top-1 agreement:
+# same best class as the full model; top-3 agreement: the full model's best
+# class is among the shallow top 3.
+#
+# A head for layer N is trained with
+#   python -m training.build_embeddings --csv ... --layer N --out models/model_Files/embedding_store_lN
+#   python -m training.train_type_head --store models/model_Files/embedding_store_lN --out models/model_Files/ddi_classifier_lN.pth
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.layer_cutoff_eval --csv drugbank_ddi_dataset.csv --layers 2 3 4 5 --pairs 1000
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+
+from config2 import DDI_CLASSIFIER_PATH, DDI_SHALLOW_CLASSIFIER_PATH
+from models.chemberta_encoder import get_base_encoder, get_layer_encoder
+from models.ddi_classifier import DDIClassifier
+
+
+def load_head(path: str) -> DDIClassifier:
+    head = DDIClassifier()
+    head.load_state_dict(torch.load(path, map_location="cpu"))
+    return head.eval()
+
+
+def top_k(encoder, head, pairs, k: int = 3) -> np.ndarray:
+    """[M, k] 0-based class ids, highest probability first."""
+    unique = list(dict.fromkeys(s for pair in pairs for s in pair))
+    index = {s: i for i, s in enumerate(unique)}
+    embs = encoder.encode(unique)
+    x = torch.cat((embs[[index[a] for a, _ in pairs]], embs[[index[b] for _, b in pairs]]), dim=1)
+    with torch.no_grad():
+        return torch.topk(F.softmax(head(x), dim=1), k=k, dim=1).indices.numpy()
+
+
+def latency(encoder, head, pairs, single: int = 50):
+    """(batched ms/pair, single-pair p50 ms), both with a cold embedding cache."""
+    encoder.clear_cache()
+    t0 = time.perf_counter()
+    top_k(encoder, head, pairs)
+    batched = (time.perf_counter() - t0) * 1e3 / len(pairs)
+
+    times = []
+    for pair in pairs[:single]:
+        encoder.clear_cache()
+        t0 = time.perf_counter()
+        top_k(encoder, head, [pair])
+        times.append((time.perf_counter() - t0) * 1e3)
+    return batched, float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate layer-truncated ChemBERTa DDI heads")
+    parser.add_argument("--csv", required=True, help="DrugBank DDI CSV with Drug1, Drug2 and optionally Y")
+    parser.add_argument("--layers", type=int, nargs="+", required=True)
+    parser.add_argument("--pairs", type=int, default=1000)
+    parser.add_argument("--head-template", default=DDI_SHALLOW_CLASSIFIER_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv).dropna(subset=["Drug1", "Drug2"])
+    df = df.sample(n=min(args.pairs, len(df)), random_state=args.seed)
+    pairs = list(zip(df["Drug1"], df["Drug2"]))
+    labels = df["Y"].to_numpy() - 1 if "Y" in df else None
+
+    base = get_base_encoder()
+    base.store = None  # time real forward passes, not precomputed rows
+    full_head = load_head(DDI_CLASSIFIER_PATH)
+    reference = top_k(base, full_head, pairs)
+
+    rows = []
+    configs = [("full", base, full_head)]
+    for layer in args.layers:
+        path = args.head_template.format(layer=layer)
+        if not os.path.exists(path):
+            print(f"Skipping layer {layer}: no head at {path}")
+            continue
+        configs.append((layer, get_layer_encoder(layer), load_head(path)))
+
+    print(f"{len(pairs)} pairs")
+    print(f"{'layer':>6} {'top-1 agr':>10} {'top-3 agr':>10} {'accuracy':>9} {'ms/pair':>8} {'single p50':>11}")
+    for layer, encoder, head in configs:
+        encoder.clear_cache()
+        pred = top_k(encoder, head, pairs)
+        row = {
+            "layer": layer,
+            "top1_agreement": float(np.mean(pred[:, 0] == reference[:, 0])),
+            "top3_agreement": float(np.mean((pred == reference[:, :1]).any(axis=1))),
+            "accuracy": float(np.mean(pred[:, 0] == labels)) if labels is not None else None,
+        }
+        row["batched_ms_per_pair"], row["single_pair_p50_ms"] = latency(encoder, head, pairs)
+        rows.append(row)
+        acc = f"{row['accuracy']:.3f}" if row["accuracy"] is not None else "-"
+        print(f"{str(layer):>6} {row['top1_agreement']:>10.3f} {row['top3_agreement']:>10.3f} {acc:>9} "
+              f"{row['batched_ms_per_pair']:>8.2f} {row['single_pair_p50_ms']:>11.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
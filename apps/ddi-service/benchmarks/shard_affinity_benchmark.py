@@ -0,0 +1,143 @@
+# benchmarks/shard_affinity_benchmark.py
+# End-to-end comparison of consistent-hash routing (shard_proxy.py) with
+# round-robin across local ddi-service replicas.
+#
+# For each strategy, starts --replicas fresh `uvicorn server2:app`
+# processes and one shard proxy. It then replays regimen page loads: each
+# visit re-posts every ordered pair of one patient's regimen to
+# /predict-chemberta-ddi and /predict-hybrid-binary-ddi. Frequent patients
+# are revisited more often. The combined result-cache hit rate over all
+# replicas is read from the proxy's /shards.
+# Also reports how many routing keys move when a replica joins the ring.
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.shard_affinity_benchmark --replicas 3 --patients 100 --visits 500
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from rdkit import Chem, RDLogger
+
+from config2 import PDI_CONDITIONS_CSV
+from shard_proxy import HashRing
+
+RDLogger.DisableLog('rdApp.*')
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT = 600
+
+
+def load_smiles(csv_path: str):
+    df = pd.read_csv(csv_path, usecols=["smiles"]).dropna().drop_duplicates("smiles")
+    return [s for s in df["smiles"] if Chem.MolFromSmiles(s) is not None]
+
+
+def make_visits(smiles, patients: int, visits: int, seed: int):
+    """Regimens of 2–8 drugs and a visit sequence in which patient i is
+    seen with probability ∝ 1 / (i + 1)."""
+    rng = np.random.default_rng(seed)
+    regimens = [[smiles[j] for j in rng.choice(len(smiles), size=rng.integers(2, 9), replace=False)]
+                for _ in range(patients)]
+    weights = 1 / np.arange(1, patients + 1)
+    order = rng.choice(patients, size=visits, p=weights / weights.sum())
+    return [regimens[i] for i in order]
+
+
+def _start(module_app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", module_app, "--port", str(port), "--log-level", "warning"],
+                            cwd=SERVICE_DIR, env={**os.environ, **env})
+
+def _wait_ready(url: str, proc: subprocess.Popen):
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            requests.get(f"{url}/", timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(1)
+    raise TimeoutError(f"{url} did not start within {READY_TIMEOUT}s")
+
+
+def visit(proxy_url: str, regimen):
+    for a in regimen:
+        for b in regimen:
+            if a != b:
+                body = {"smiles1": a, "smiles2": b}
+                requests.post(f"{proxy_url}/predict-chemberta-ddi", json=body, timeout=120)
+                requests.post(f"{proxy_url}/predict-hybrid-binary-ddi", json=body, timeout=120)
+
+
+def run_strategy(strategy: str, replicas: int, base_port: int, visits, concurrency: int) -> dict:
+    urls = [f"http://127.0.0.1:{base_port + 1 + i}" for i in range(replicas)]
+    proxy_url = f"http://127.0.0.1:{base_port}"
+    procs = [_start("server2:app", base_port + 1 + i, {}) for i in range(replicas)]
+    procs.append(_start("shard_proxy:app", base_port, {"DDI_REPLICAS": ",".join(urls), "SHARD_STRATEGY": strategy}))
+    try:
+        for url, proc in zip(urls + [proxy_url], procs):
+            _wait_ready(url, proc)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(lambda regimen: visit(proxy_url, regimen), visits))
+        elapsed = time.perf_counter() - t0
+        shards = requests.get(f"{proxy_url}/shards", timeout=30).json()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+    return {"strategy": strategy, "seconds": elapsed, **shards}
+
+
+def remapped_on_join(replicas: int, keys) -> float:
+    ring = HashRing([f"replica{i}" for i in range(replicas)])
+    before = [ring.nodes_for(k)[0] for k in keys]
+    ring.add(f"replica{replicas}")
+    return float(np.mean([ring.nodes_for(k)[0] != b for k, b in zip(keys, before)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare consistent-hash and round-robin routing across replicas")
+    parser.add_argument("--csv", default=PDI_CONDITIONS_CSV, help="CSV with a smiles column")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--visits", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-port", type=int, default=9100, help="proxy port; replicas use the following ports")
+    parser.add_argument("--strategies", nargs="+", default=["round_robin", "hash"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    smiles = load_smiles(args.csv)
+    visits = make_visits(smiles, args.patients, args.visits, args.seed)
+    print(f"{args.replicas} replicas, {args.visits} visits, "
+          f"{sum(len(r) * (len(r) - 1) for r in visits)} pair requests per endpoint")
+
+    results = []
+    for strategy in args.strategies:
+        row = run_strategy(strategy, args.replicas, args.base_port, visits, args.concurrency)
+        results.append(row)
+        per_shard = ", ".join(f"{r['cache'].get('hit_rate', 0):.1%}" for r in row["replicas"])
+        print(f"{strategy:>12}: combined hit rate {row['combined']['hit_rate']:.1%} "
+              f"(per replica {per_shard}), {row['seconds']:.1f}s")
+
+    moved = remapped_on_join(args.replicas, [f"key{i}" for i in range(20000)])
+    print(f"Keys remapped when replica {args.replicas + 1} joins: {moved:.1%} (ideal {1 / (args.replicas + 1):.1%})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"strategies": results, "remapped_on_join": moved}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
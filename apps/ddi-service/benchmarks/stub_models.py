@@ -0,0 +1,109 @@
+# benchmarks/stub_models.py
+# Tiny randomly initialised stand-ins for every ddi-service model, so the
+# benchmark suite (benchmarks/ddi_suite.py) runs on a laptop CPU without
+# downloading ChemBERTa or the Stanford de-identifier.
+#
+# The stubs keep the real interfaces and shapes where the serving code
+# depends on them (768-d ChemBERTa output for the 1536-input DDI head, 1191-d
+# fingerprints for the hybrid model) but use 2 transformer layers and a
+# character-level tokenizer. Timings are for comparing runs against each
+# other, not for estimating production latency.
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.stub_models --out /tmp/ddi_stub_models   # prints the env to export
+
+import argparse
+import os
+import string
+
+import numpy as np
+import torch
+
+from models.ddi_classifier import DDIClassifier
+from models.hybrid_binary_model import FP_DIM
+
+SEED = 0
+SMILES_CHARS = "CNOSPFIBrclnos()[]=#@+-\\/.%0123456789HKLaeigu"
+DEID_LABELS = ["O", "B-PATIENT", "I-PATIENT", "B-HCW", "I-HCW", "B-DATE", "I-DATE", "B-ID", "I-ID"]
+
+
+def _char_tokenizer(chars: str):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from tokenizers.processors import TemplateProcessing
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for c in chars:
+        vocab.setdefault(c, len(vocab))
+    tok = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.Split("", "isolated")
+    tok.post_processor = TemplateProcessing(single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 2)])
+    return PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>",
+                                   pad_token="<pad>", unk_token="<unk>")
+
+def _roberta_config(vocab_size: int, hidden: int, **extra):
+    from transformers import RobertaConfig
+    return RobertaConfig(vocab_size=vocab_size, hidden_size=hidden, num_hidden_layers=2,
+                         num_attention_heads=max(1, hidden // 64), intermediate_size=hidden // 2,
+                         max_position_embeddings=520, pad_token_id=1, **extra)
+
+
+def build_encoder(path: str):
+    from transformers import RobertaModel
+    tokenizer = _char_tokenizer(SMILES_CHARS)
+    RobertaModel(_roberta_config(len(tokenizer), 768)).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+def build_deidentifier(path: str):
+    from transformers import RobertaForTokenClassification
+    tokenizer = _char_tokenizer(string.printable)
+    config = _roberta_config(len(tokenizer), 64, id2label=dict(enumerate(DEID_LABELS)),
+                             label2id={l: i for i, l in enumerate(DEID_LABELS)})
+    RobertaForTokenClassification(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+def build_ddi_classifier(path: str):
+    torch.save(DDIClassifier().state_dict(), path)
+
+def build_hybrid_binary(path: str):
+    rng = np.random.default_rng(SEED)
+    def dense(*shape):
+        return (rng.standard_normal(shape) / np.sqrt(shape[-2])).astype(np.float32)
+    np.savez(path, w1=dense(2, FP_DIM, 256), b1=np.zeros((2, 256), np.float32),
+             w2=dense(2, 256, 128), b2=np.zeros((2, 128), np.float32),
+             w3=dense(256, 64), b3=np.zeros(64, np.float32), w4=dense(64, 1), b4=np.zeros(1, np.float32))
+
+
+def build(out_dir: str) -> dict:
+    """Writes every stub (skipping ones that exist) and returns the
+    environment variables that make the service load them."""
+    torch.manual_seed(SEED)
+    env = {
+        "CHEMBERTA_MODEL": os.path.join(out_dir, "chemberta"),
+        "DEID_MODEL": os.path.join(out_dir, "deidentifier"),
+        "DDI_CLASSIFIER_PATH": os.path.join(out_dir, "ddi_classifier.pth"),
+        "HYBRID_BINARY_NPZ_PATH": os.path.join(out_dir, "hybrid_binary.npz"),
+    }
+    builders = [(build_encoder, env["CHEMBERTA_MODEL"]), (build_deidentifier, env["DEID_MODEL"]),
+                (build_ddi_classifier, env["DDI_CLASSIFIER_PATH"]), (build_hybrid_binary, env["HYBRID_BINARY_NPZ_PATH"])]
+    os.makedirs(out_dir, exist_ok=True)
+    for builder, path in builders:
+        if not os.path.exists(path):
+            builder(path)
+    # Keep the real precomputed artifacts out of stub runs.
+    missing = os.path.join(out_dir, "none")
+    env.update(EMBEDDING_STORE_DIR=missing, PAIR_TABLE_DIR=missing, DDI_STUDENT_PATH=missing,
+               PDI_MODEL_DIR=missing, HF_HUB_OFFLINE="1")
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write tiny stub models for the ddi-service benchmarks")
+    parser.add_argument("--out", default="/tmp/ddi_stub_models")
+    args = parser.parse_args()
+    for key, value in build(args.out).items():
+        print(f"export {key}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/test_shard_affinity_benchmark.py
+# Integration test for shard_proxy.py: runs the shard affinity benchmark on
+# two local replicas serving the stub models (benchmarks/stub_models.py)
+# and checks that consistent-hash routing reaches a higher combined
+# result-cache hit rate than round-robin on the same visits.
+#
+# Starts real uvicorn processes, so it takes a minute or two on a laptop CPU.
+
+import socket
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("rdkit")
+
+from benchmarks import stub_models
+from benchmarks.shard_affinity_benchmark import load_smiles, make_visits, run_strategy
+from config2 import PDI_CONDITIONS_CSV
+
+REPLICAS = 2
+
+
+def _free_base_port(span: int) -> int:
+    """A port such that it and the `span` ports after it are free."""
+    for _ in range(50):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            base = s.getsockname()[1]
+        if base + span < 65536 and all(_port_free(base + i) for i in range(span + 1)):
+            return base
+    raise RuntimeError("No free port range for the proxy and replicas")
+
+def _port_free(port: int) -> bool:
+    with socket.socket() as s:
+        try:
+            s.bind(("127.0.0.1", port))
+            return True
+        except OSError:
+            return False
+
+
+@pytest.fixture(scope="module")
+def stub_env(tmp_path_factory):
+    env = stub_models.build(str(tmp_path_factory.mktemp("stub_models")))
+    # Mongo is only needed by the catalog endpoints; fail fast instead of waiting
+    env.update(MONGO_URI="mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=300", DB_NAME="test",
+               COLLECTION_NAME="drugs", DDI_MODEL_WORKERS="0", PROFILE_DIR="", TRACE_EXPORT="")
+    return env
+
+
+def test_hash_routing_beats_round_robin(stub_env, monkeypatch):
+    for key, value in stub_env.items():
+        monkeypatch.setenv(key, value)
+    smiles = load_smiles(PDI_CONDITIONS_CSV)[:80]
+    visits = make_visits(smiles, patients=12, visits=40, seed=0)
+
+    hit_rate = {}
+    for strategy in ("round_robin", "hash"):
+        row = run_strategy(strategy, REPLICAS, _free_base_port(REPLICAS), visits, concurrency=4)
+        assert sum(r["requests"] for r in row["replicas"]) > 0
+        assert all("error" not in r["cache"] for r in row["replicas"])
+        hit_rate[strategy] = row["combined"]["hit_rate"]
+
+    assert hit_rate["hash"] > hit_rate["round_robin"]
@@ -0,0 +1,102 @@
+# benchmarks/worker_pool_benchmark.py
+# Throughput and memory of the model worker pool (models/worker_pool.py)
+# for several worker counts, compared with in-process inference (0 workers).
+#
+# Each request is what /predict-chemberta-ddi plus /predict-hybrid-binary-ddi
+# do for one uncached pair: fingerprints, tokenization, a ChemBERTa pass and
+# both heads. Requests are sent from a thread pool, as FastAPI's threadpool
+# does. Memory is read from /proc/<pid>/smaps_rollup (Linux): "private" is
+# what a worker does not share with the others, i.e. its real extra cost.
+#
+# Usage (from apps/ddi-service):
+#   python -m benchmarks.worker_pool_benchmark --workers 0 1 2 4 --requests 400
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.cascade_benchmark import load_drugs
+from config2 import PDI_CONDITIONS_CSV
+from models import DLTypeClassificationInference as type_inference
+from models import worker_pool
+from models.hybrid_binary_ddi_inference import generate_fingerprint, predict_hybrid_binary_ddi
+
+
+def score_pair(smiles1: str, smiles2: str):
+    return predict_hybrid_binary_ddi(smiles1, smiles2), type_inference.predict_ddi(smiles1, smiles2)
+
+
+def memory_mb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields.get("Rss", 0.0), "pss": fields.get("Pss", 0.0),
+            "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)}
+
+
+def run_config(workers: int, pairs, concurrency: int) -> dict:
+    # Cold per-process caches, so every configuration does the same work.
+    type_inference.encoder.clear_cache()
+    generate_fingerprint.cache_clear()
+    if workers:
+        worker_pool.start(workers)
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(lambda pair: worker_pool.run(score_pair, *pair), pairs))
+        elapsed = time.perf_counter() - t0
+
+        row = {"workers": workers, "requests": len(pairs), "seconds": elapsed,
+               "requests_per_s": len(pairs) / elapsed, "front": memory_mb(os.getpid())}
+        per_worker = [memory_mb(pid) for pid in worker_pool.worker_pids()]
+        if per_worker:
+            row["worker_rss_mb"] = float(np.mean([m["rss"] for m in per_worker]))
+            row["worker_private_mb"] = float(np.mean([m["private"] for m in per_worker]))
+        return row
+    finally:
+        worker_pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ddi-service model worker pool")
+    parser.add_argument("--csv", default=PDI_CONDITIONS_CSV, help="CSV with drug_name and smiles columns")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=0, help="client threads (default: 2 per worker, min 4)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    smiles = load_drugs(args.csv)
+    type_inference.encoder.store = None  # time real forward passes, not precomputed rows
+    rng = np.random.default_rng(args.seed)
+    print(f"{len(smiles)} drugs, {args.requests} requests per configuration, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'req/s':>8} {'speed-up':>8} {'front RSS':>10} {'worker RSS':>11} {'worker private':>15}")
+
+    rows = []
+    for workers in args.workers:
+        idx = rng.choice(len(smiles), size=(args.requests, 2))
+        pairs = [(smiles[a], smiles[b]) for a, b in idx]
+        concurrency = args.concurrency or max(4, 2 * workers)
+        row = run_config(workers, pairs, concurrency)
+        row["speedup"] = row["requests_per_s"] / rows[0]["requests_per_s"] if rows else 1.0
+        rows.append(row)
+        rss = f"{row['worker_rss_mb']:.0f} MB" if "worker_rss_mb" in row else "-"
+        private = f"{row['worker_private_mb']:.0f} MB" if "worker_private_mb" in row else "-"
+        print(f"{workers:>7} {row['requests_per_s']:>8.1f} {row['speedup']:>7.2f}x "
+              f"{row['front']['rss']:>7.0f} MB {rss:>11} {private:>15}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
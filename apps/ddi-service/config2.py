@@ -13,4 +13,88 @@ LLM_MODEL = os.getenv("LLM_MODEL")
 CHAT_DB = os.getenv("CHAT_DB")
 MEDS_DB = os.getenv("MEDS_DB")
 USER_DB = os.getenv("USER_DB")
-TESSERACT_CMD = os.getenv("TESSERACT_CMD")
\ No newline at end of file
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+
+# Saved ChemPDIPredictor directory (trainer.save_model output)
+PDI_MODEL_DIR = os.getenv("PDI_MODEL_DIR", "models/model_Files/pdi_chempdi_model")
+
+# PDI training data; the condition resolver indexes its condition names
+PDI_CONDITIONS_CSV = os.getenv(
+    "PDI_CONDITIONS_CSV",
+    str(Path(__file__).parent.parent.parent / "docs/ml-models/Patientcondition_drug_interaction_model/pdi_with_smiles_full.csv")
+)
+
+# Precomputed ChemBERTa embeddings (training/build_embeddings.py)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "models/model_Files/embedding_store")
+
+# DDI type-classifier head weights (training/train_type_head.py writes this format)
+DDI_CLASSIFIER_PATH = os.getenv("DDI_CLASSIFIER_PATH", "models/model_Files/ddi_classifier2.pth")
+# Retrained heads are written here and only served once promoted to DDI_CLASSIFIER_PATH
+DDI_CLASSIFIER_CANDIDATE_PATH = os.getenv("DDI_CLASSIFIER_CANDIDATE_PATH",
+                                          os.path.splitext(DDI_CLASSIFIER_PATH)[0] + ".candidate.pth")
+
+# Hybrid binary model exported to NumPy with BatchNorm folded in
+# (training/convert_hybrid_binary.py); TensorFlow is only loaded without it
+HYBRID_BINARY_NPZ_PATH = os.getenv("HYBRID_BINARY_NPZ_PATH", "models/model_Files/hybrid_ddi_model_final.npz")
+
+# /predict-ddi cascade: the ChemBERTa type classifier only runs for pairs whose
+# hybrid binary probability is at least this value
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.5"))
+
+# Packed Morgan fingerprints of the drug catalog for /similar-drugs; built
+# from MongoDB on first use (python -m models.similarity_index --rebuild)
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "models/model_Files/similarity_index.npz")
+
+# Shallow mode: mean-pooled output of an earlier ChemBERTa layer with a head
+# trained on those features (build_embeddings --layer N, then train_type_head)
+DDI_SHALLOW_LAYER = int(os.getenv("DDI_SHALLOW_LAYER", "3"))
+DDI_SHALLOW_CLASSIFIER_PATH = os.getenv("DDI_SHALLOW_CLASSIFIER_PATH", "models/model_Files/ddi_classifier_l{layer}.pth")
+
+# Fingerprint-only student of the DDI type classifier, served as mode="fast"
+# (training/distill_type_student.py)
+DDI_STUDENT_PATH = os.getenv("DDI_STUDENT_PATH", "models/model_Files/ddi_student.npz")
+
+# Precomputed top-k DDI classes for every ordered pair of catalog drugs
+# (training/materialize_pairs.py)
+PAIR_TABLE_DIR = os.getenv("PAIR_TABLE_DIR", "models/model_Files/pair_table")
+
+# Single-pair prediction results kept in memory (models/result_cache.py)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "50000"))
+
+# Model worker processes behind the ddi-service front process
+# (models/worker_pool.py); 0 runs inference in the server process itself
+DDI_MODEL_WORKERS = int(os.getenv("DDI_MODEL_WORKERS", "0"))
+
+# shard_proxy.py: ddi-service replica URLs (comma-separated), routing
+# strategy ("hash" = consistent hashing on canonical SMILES, "round_robin")
+# and virtual nodes per replica on the hash ring
+DDI_REPLICAS = [u.strip().rstrip("/") for u in os.getenv("DDI_REPLICAS", "").split(",") if u.strip()]
+SHARD_STRATEGY = os.getenv("SHARD_STRATEGY", "hash")
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "128"))
+
+# Default smoke-test agreement (0..1) that reloaded weights must reach with
+# the serving version before POST /admin/reload swaps them in
+RELOAD_MIN_AGREEMENT = float(os.getenv("RELOAD_MIN_AGREEMENT", "0.75"))
+
+# Shared secret for the /admin endpoints (sent as the X-Admin-Token header);
+# the admin API is disabled while this is empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Hugging Face ids (or local directories) of the ChemBERTa encoder and the
+# de-identifier NER model; benchmarks/stub_models.py points these at tiny stubs
+CHEMBERTA_MODEL = os.getenv("CHEMBERTA_MODEL", "seyonec/ChemBERTa-zinc-base-v1")
+DEID_MODEL = os.getenv("DEID_MODEL", "StanfordAIMI/stanford-deidentifier-base")
+
+# tracing.py: where finished spans go, a file path (OTLP/JSON lines) or an
+# OTLP/HTTP collector URL such as http://localhost:4318/v1/traces; tracing
+# is off while empty. Root requests are sampled at TRACE_SAMPLE_RATE.
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# profiling.py: ring directory for collapsed-stack profiles (profiling is
+# off while empty), newest files kept, sampling period, and 1-in-N request
+# sampling (0 profiles only requests sent with X-Profile: 1 and the admin token)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
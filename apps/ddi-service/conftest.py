@@ -0,0 +1,4 @@
+# conftest.py
+# Puts apps/ddi-service on sys.path so the tests import the service
+# modules the way uvicorn and the benchmarks do. Run from apps/ddi-service:
+#   python -m pytest
@@ -0,0 +1,30 @@
+# metrics.py
+# Prometheus metrics for the ddi-service, served as text by GET /metrics.
+#
+# The registry, metric types, HTTP/Mongo latency and the worker-pool
+# capture/replay live in the shared observability package
+# (packages/observability); this module adds the model inference metric.
+# Gauges that already exist elsewhere (cache statistics) are read by
+# collectors at scrape time instead of being updated per request.
+#
+#   REQUEST_SECONDS.observe(0.012, "/predict-ddi", "POST", "200")
+#   register_collector(lambda: [("name", "gauge", "help", [({"cache": "x"}, 1.0)])])
+
+import time
+
+import tracing
+from observability.metrics import (
+    Counter, Histogram, MetricsMiddleware, MONGO_SECONDS, REQUEST_SECONDS, batch_label, begin_capture,
+    end_capture, mongo_listener, register_collector, render, replay,
+)
+
+# ─── Service Metrics ────────────────────────────
+INFERENCE_SECONDS = Histogram("model_inference_seconds", "Model forward pass latency by model and batch size",
+                              ("model", "batch_size"))
+
+
+def observe_inference(model: str, batch_size: int, start: float):
+    """Records a forward pass that began at perf_counter() `start`, as a
+    latency sample and a trace span."""
+    INFERENCE_SECONDS.observe(time.perf_counter() - start, model, batch_label(batch_size))
+    tracing.record(f"inference {model}", start, model=model, batch_size=batch_size)
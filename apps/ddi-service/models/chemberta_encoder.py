@@ -0,0 +1,304 @@
+# models/chemberta_encoder.py
+# Shared ChemBERTa encoder component for every SMILES model in the service.
+#
+# A ChemBERTaEncoder owns a tokenizer, a transformer, an LRU embedding cache
+# and batching. One forward pass produces every pooling (masked mean and CLS)
+# so heads with different poolings reuse the same encoding of a SMILES.
+#
+# SMILES range from ~10 to 300+ tokens, so uncached SMILES are sorted by
+# token length and grouped into buckets whose padded size (rows × longest
+# row) stays under a token budget; token ids are cached per SMILES.
+#
+# Encoders are registered by weight source, so all heads built on the same
+# weights share one transformer in memory. Heads register against an encoder
+# with the pooling they consume:
+#
+#   encoder = get_base_encoder()
+#   register_head("ddi_type", encoder, pooling="mean", module=model)
+#   embs = get_head("ddi_type").embed(smiles_list)
+#
+# A head whose checkpoint fine-tuned ChemBERTa itself (the PDI model) cannot
+# use the base encoder and gets an encoder of its own. It reuses the base
+# tokenizer and every parameter fine-tuning left unchanged, such as frozen
+# embeddings or lower layers (share_parameters()). The rest is a second
+# transformer in memory, and its embeddings are cached separately.
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from config2 import CHEMBERTA_MODEL, EMBEDDING_STORE_DIR
+from metrics import observe_inference
+from models.embedding_store import EmbeddingStore
+
+# ─── Config ─────────────────────────────────────
+DEVICE = torch.device("cpu")  # Force CPU
+CHEMBERTA_NAME = CHEMBERTA_MODEL
+MAX_LENGTH = 512
+EMBEDDING_CACHE_SIZE = 4096
+TOKEN_CACHE_SIZE = 16384
+TOKEN_BUDGET = 8192   # padded tokens (rows × longest row) per forward pass
+MAX_BATCH_SIZE = 64
+POOLINGS = ("mean", "cls")
+BUCKET_STRATEGIES = ("naive", "sorted", "budget")
+
+
+# ─── Batch Planning ─────────────────────────────
+def plan_batches(lengths: List[int], strategy: str = "budget", batch_size: int = MAX_BATCH_SIZE,
+                 token_budget: int = TOKEN_BUDGET) -> List[List[int]]:
+    """Groups item indices into forward-pass batches.
+
+    naive  – input order, fixed batch size
+    sorted – ascending token length, fixed batch size
+    budget – ascending token length, a batch grows while rows × longest row
+             stays within `token_budget` (and rows <= batch_size)
+    """
+    if strategy not in BUCKET_STRATEGIES:
+        raise ValueError(f"Unknown bucket strategy: {strategy}")
+    if strategy == "naive":
+        order = list(range(len(lengths)))
+    else:
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    if strategy != "budget":
+        return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    batches, current = [], []
+    for i in order:
+        # Sorted ascending, so the new item is the longest in the batch.
+        if current and ((len(current) + 1) * lengths[i] > token_budget or len(current) >= batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+def padding_stats(lengths: List[int], batches: List[List[int]]) -> dict:
+    real = sum(lengths)
+    padded = sum(len(b) * max(lengths[i] for i in b) for b in batches)
+    return {"batches": len(batches), "real_tokens": real, "padded_tokens": padded,
+            "padding_tokens": padded - real, "padding_fraction": (padded - real) / max(padded, 1)}
+
+
+class ChemBERTaEncoder:
+    def __init__(self, key: str, tokenizer, model, max_length: int = MAX_LENGTH,
+                 cache_size: int = EMBEDDING_CACHE_SIZE, store: Optional[EmbeddingStore] = None):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model.to(DEVICE).eval()
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.store = store  # precomputed mean embeddings of the final layer
+        self._cache = OrderedDict()  # smiles → {pooling: tensor}
+        self._token_cache = OrderedDict()  # smiles → token ids
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 1
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0  # embedding lookups served from store/cache vs encoded
+
+    @property
+    def hidden_size(self) -> int:
+        return self.model.config.hidden_size
+
+    # ─── Tokenization ───────────────────────────
+    def token_ids(self, smiles_list) -> List[List[int]]:
+        """Truncated token ids per SMILES, cached so repeated SMILES are only
+        tokenized once."""
+        ids, missing = {}, []
+        with self._lock:
+            for s in dict.fromkeys(smiles_list):
+                if s in self._token_cache:
+                    self._token_cache.move_to_end(s)
+                    ids[s] = self._token_cache[s]
+                else:
+                    missing.append(s)
+        if missing:
+            encoded = self.tokenizer(missing, truncation=True, max_length=self.max_length)["input_ids"]
+            with self._lock:
+                for s, row in zip(missing, encoded):
+                    ids[s] = self._token_cache[s] = row
+                while len(self._token_cache) > TOKEN_CACHE_SIZE:
+                    self._token_cache.popitem(last=False)
+        return [ids[s] for s in smiles_list]
+
+    # ─── Forward Pass ───────────────────────────
+    def _forward(self, id_rows: List[List[int]]) -> Dict[str, torch.Tensor]:
+        """All poolings for one padded batch. Padding is masked out of the mean
+        and does not change the CLS position, so each row matches a
+        single-SMILES encoding."""
+        width = max(len(r) for r in id_rows)
+        input_ids = torch.full((len(id_rows), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(id_rows), width), dtype=torch.long)
+        for i, row in enumerate(id_rows):
+            input_ids[i, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[i, :len(row)] = 1
+        start = time.perf_counter()
+        with torch.no_grad():
+            hidden = self.model(input_ids=input_ids.to(DEVICE), attention_mask=attention_mask.to(DEVICE)).last_hidden_state
+            mask = attention_mask.to(DEVICE).unsqueeze(-1).to(hidden.dtype)
+            pooled = {
+                "mean": ((hidden * mask).sum(dim=1) / mask.sum(dim=1)).cpu(),
+                "cls": hidden[:, 0, :].cpu(),
+            }
+        observe_inference(f"encoder:{self.key}", len(id_rows), start)
+        return pooled
+
+    def _encode_batch(self, smiles_list, strategy: str = "budget", **plan) -> Dict[str, torch.Tensor]:
+        """All poolings for many SMILES, run in length buckets and returned in
+        input order. `plan` is passed to plan_batches()."""
+        id_rows = self.token_ids(smiles_list)
+        out = {p: torch.zeros((len(id_rows), self.hidden_size)) for p in POOLINGS}
+        for batch in plan_batches([len(r) for r in id_rows], strategy, **plan):
+            pooled = self._forward([id_rows[i] for i in batch])
+            for p in POOLINGS:
+                out[p][batch] = pooled[p]
+        return out
+
+    # ─── Cached Encoding ────────────────────────
+    def encode(self, smiles_list: List[str], pooling: str = "mean") -> torch.Tensor:
+        """[N, hidden] embeddings; only SMILES missing from the store and
+        cache are run through the transformer."""
+        if pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling: {pooling}")
+        rows, missing = {}, []
+        with self._lock:
+            for s in dict.fromkeys(smiles_list):
+                if pooling == "mean" and self.store is not None and s in self.store:
+                    rows[s] = torch.from_numpy(self.store.get(s))
+                elif s in self._cache:
+                    self._cache.move_to_end(s)
+                    rows[s] = self._cache[s][pooling]
+                else:
+                    missing.append(s)
+            self.misses += len(missing)
+            self.hits += len(rows)
+
+        if missing:
+            encoded = self._encode_batch(missing)
+            with self._lock:
+                for i, s in enumerate(missing):
+                    entry = {p: encoded[p][i] for p in POOLINGS}
+                    rows[s] = entry[pooling]
+                    self._cache[s] = entry
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not smiles_list:
+            return torch.zeros((0, self.hidden_size))
+        return torch.stack([rows[s] for s in smiles_list])
+
+    def clear_cache(self):
+        """Drops cached embeddings; token ids are kept."""
+        with self._lock:
+            self._cache.clear()
+
+    def cache_info(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "capacity": self.cache_size,
+                    "store": len(self.store) if self.store is not None else 0,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# ─── Encoder Registry ───────────────────────────
+_encoders: Dict[str, ChemBERTaEncoder] = {}
+_encoders_lock = threading.RLock()  # loaders may fetch other encoders
+
+def get_encoder(key: str, loader: Callable[[], ChemBERTaEncoder]) -> ChemBERTaEncoder:
+    """The encoder registered under `key`, created with `loader` on first use."""
+    with _encoders_lock:
+        if key not in _encoders:
+            _encoders[key] = loader()
+            print(f"✅ ChemBERTa encoder loaded: {key}")
+        return _encoders[key]
+
+def _load_base_encoder() -> ChemBERTaEncoder:
+    store = EmbeddingStore.open_if_exists(EMBEDDING_STORE_DIR)
+    if store is not None and (store.meta.get("model") != CHEMBERTA_NAME or store.layer != -1):
+        print("Warning: embedding store was built with a different encoder configuration; ignoring it")
+        store = None
+    return ChemBERTaEncoder(CHEMBERTA_NAME, AutoTokenizer.from_pretrained(CHEMBERTA_NAME),
+                            AutoModel.from_pretrained(CHEMBERTA_NAME), store=store)
+
+def get_base_encoder() -> ChemBERTaEncoder:
+    """The pretrained ChemBERTa shared by all heads trained on frozen features."""
+    return get_encoder(CHEMBERTA_NAME, _load_base_encoder)
+
+# ─── Layer Truncation ───────────────────────────
+def truncate_layers(model, n_layers: int):
+    """A view of `model` that runs only its first `n_layers` transformer
+    layers. Parameters are shared with `model`, so no weights are copied."""
+    layers = model.encoder.layer
+    if n_layers <= 0 or n_layers >= len(layers):
+        return model
+    encoder = copy.copy(model.encoder)
+    encoder._modules = dict(model.encoder._modules)
+    encoder.layer = torch.nn.ModuleList(list(layers)[:n_layers])
+    truncated = copy.copy(model)
+    truncated._modules = dict(model._modules)
+    truncated.encoder = encoder
+    return truncated
+
+def share_parameters(model, base_model) -> int:
+    """Replaces parameters of `model` that are identical to the same-named
+    ones in `base_model` with the base tensors, so parts left unchanged by
+    fine-tuning are stored once. Returns the number of values shared."""
+    base = dict(base_model.named_parameters())
+    shared = 0
+    for name, param in list(model.named_parameters()):
+        other = base.get(name)
+        if other is None or other is param or other.shape != param.shape or not torch.equal(other, param):
+            continue
+        owner_name, _, leaf = name.rpartition(".")
+        setattr(model.get_submodule(owner_name), leaf, other)
+        shared += other.numel()
+    return shared
+
+def get_layer_encoder(n_layers: int) -> ChemBERTaEncoder:
+    """Base ChemBERTa cut off after `n_layers` layers, with its own embedding
+    cache. Shares tokenizer and weights with the base encoder."""
+    base = get_base_encoder()
+    if n_layers <= 0 or n_layers >= base.model.config.num_hidden_layers:
+        return base
+    key = f"{CHEMBERTA_NAME}@layer{n_layers}"
+    return get_encoder(key, lambda: ChemBERTaEncoder(key, base.tokenizer, truncate_layers(base.model, n_layers),
+                                                     max_length=base.max_length))
+
+def loaded_encoders() -> Dict[str, ChemBERTaEncoder]:
+    with _encoders_lock:
+        return dict(_encoders)
+
+
+# ─── Head Registry ──────────────────────────────
+@dataclass
+class EncoderHead:
+    name: str
+    encoder: ChemBERTaEncoder
+    pooling: str
+    module: Optional[torch.nn.Module] = None
+    version: str = ""  # short hash of the head's weights
+
+    def embed(self, smiles_list: List[str]) -> torch.Tensor:
+        return self.encoder.encode(smiles_list, self.pooling)
+
+_heads: Dict[str, EncoderHead] = {}
+
+def register_head(name: str, encoder: ChemBERTaEncoder, pooling: str = "mean",
+                  module: Optional[torch.nn.Module] = None, version: str = "") -> EncoderHead:
+    """Registers (or replaces) head `name`. Callers holding the previous
+    head keep using it until they drop their reference."""
+    if pooling not in POOLINGS:
+        raise ValueError(f"Unknown pooling: {pooling}")
+    head = EncoderHead(name, encoder, pooling, module, version)
+    _heads[name] = head
+    return head
+
+def get_head(name: str) -> EncoderHead:
+    return _heads[name]
+
+def registered_heads() -> Dict[str, EncoderHead]:
+    return dict(_heads)
@@ -0,0 +1,241 @@
+# models/condition_resolver.py
+# Resolves free-text condition names (e.g. from extract_structured_summary)
+# to the PDI model's condition_id vocabulary, without an LLM call.
+#
+# Matching order: exact → normalized → abbreviation → token-level fuzzy.
+# The fuzzy stage uses an inverted token index (token → aliases) with IDF
+# weighting, plus a one-deletion neighbourhood index for typo tolerance.
+# Null answers ("none", "n/a", "no known ...") never resolve, and a fuzzy
+# match below MIN_FUZZY_SCORE is left unresolved rather than guessed.
+
+import csv
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+from config2 import PDI_CONDITIONS_CSV
+
+# ─── Config ─────────────────────────────────────
+MIN_FUZZY_SCORE = 0.8
+CACHE_SIZE = 10000
+# Tokens this short only match the vocabulary exactly ("tone" is not "stone")
+MAX_EXACT_ONLY_LEN = 4
+
+# Common clinical abbreviations; only used when the expansion is a known condition.
+CLINICAL_ABBREVIATIONS = {
+    "htn": "hypertension",
+    "dm": "diabetes mellitus",
+    "t2dm": "type 2 diabetes mellitus",
+    "t1dm": "type 1 diabetes mellitus",
+    "ckd": "chronic kidney disease",
+    "chf": "congestive heart failure",
+    "hf": "heart failure",
+    "mi": "myocardial infarction",
+    "afib": "atrial fibrillation",
+    "af": "atrial fibrillation",
+    "copd": "chronic obstructive pulmonary disease",
+    "gerd": "gastroesophageal reflux disease",
+    "mdd": "major depressive disorder",
+    "cad": "coronary artery disease",
+    "dvt": "deep vein thrombosis",
+    "pe": "pulmonary embolism",
+    "uti": "urinary tract infection",
+    "ra": "rheumatoid arthritis",
+    "ms": "multiple sclerosis",
+    "sle": "systemic lupus erythematosus",
+    "bph": "benign prostatic hyperplasia",
+    "adhd": "attention deficit hyperactivity disorder",
+    "tia": "transient ischemic attack",
+}
+
+STOPWORDS = {"the", "of", "and", "or", "with", "in", "a", "an", "to", "on", "for", "history", "hx"}
+
+# Entries that mean "no condition" in clinical notes
+NULL_CONDITIONS = {"none", "n/a", "na", "nil", "null", "unknown", "not applicable", "nothing", "no", "nad"}
+NULL_PREFIXES = ("no known", "none known", "not known")
+
+_PAREN = re.compile(r"\(([^)]*)\)")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+# ─── Normalization ──────────────────────────────
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "is", "us")):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _NON_ALNUM.split(text.lower()) if t and t not in STOPWORDS]
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+def _deletes(token: str):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def is_null_condition(text: str) -> bool:
+    key = text.strip(" .-").lower()
+    return key in NULL_CONDITIONS or key.startswith(NULL_PREFIXES)
+
+
+# ─── Index ──────────────────────────────────────
+class ConditionIndex:
+    def __init__(self, names_by_id: Dict[int, List[str]]):
+        self.names_by_id = names_by_id
+        # Each lookup table maps to (condition_id, condition name as in the CSV);
+        # a few ids in the dataset carry more than one condition name.
+        self.exact: Dict[str, tuple] = {}
+        self.normalized: Dict[str, tuple] = {}
+        self.abbreviations: Dict[str, tuple] = {}
+        self.alias_tokens: List[frozenset] = []
+        self.alias_entries: List[tuple] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.deletion_index: Dict[str, set] = defaultdict(set)
+        self._cache: Dict[str, Optional[dict]] = {}
+
+        initialisms = defaultdict(set)
+        for cid, names in names_by_id.items():
+            for name in names:
+                entry = (cid, name)
+                self.exact.setdefault(name.strip().lower(), entry)
+                variants = {name, _PAREN.sub(" ", name)}
+                for inner in _PAREN.findall(name):
+                    inner_norm = normalize(inner)
+                    if inner_norm and " " not in inner_norm and len(inner_norm) <= 6:
+                        self.abbreviations.setdefault(inner_norm, entry)
+                    else:
+                        variants.add(inner)
+                for variant in variants:
+                    self._add_alias(variant, entry)
+                words = tokenize(_PAREN.sub(" ", name))
+                if len(words) >= 3:
+                    initialisms["".join(w[0] for w in words)].add(entry)
+
+        # Derived initialisms only count when they are unambiguous.
+        for abbr, entries in initialisms.items():
+            if len(entries) == 1:
+                self.abbreviations.setdefault(abbr, next(iter(entries)))
+        for abbr, expansion in CLINICAL_ABBREVIATIONS.items():
+            entry = self.normalized.get(normalize(expansion))
+            if entry is not None:
+                self.abbreviations.setdefault(abbr, entry)
+
+        n = len(self.alias_tokens)
+        self.idf = {tok: math.log(1 + n / len(ids)) for tok, ids in self.postings.items()}
+        self.max_idf = max(self.idf.values(), default=1.0)
+        for tok in self.postings:
+            for d in _deletes(tok):
+                self.deletion_index[d].add(tok)
+
+    def _add_alias(self, text: str, entry: tuple):
+        norm = normalize(text)
+        if not norm or norm in self.normalized:
+            return
+        self.normalized[norm] = entry
+        alias_idx = len(self.alias_tokens)
+        toks = frozenset(norm.split())
+        self.alias_tokens.append(toks)
+        self.alias_entries.append(entry)
+        for tok in toks:
+            self.postings[tok].append(alias_idx)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ConditionIndex":
+        names_by_id = defaultdict(list)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name, cid = row.get("condition"), row.get("condition_id")
+                if not name or not cid:
+                    continue
+                cid = int(float(cid))
+                if name not in names_by_id[cid]:
+                    names_by_id[cid].append(name)
+        return cls(dict(names_by_id))
+
+    # ── Lookups ───────────────────────────────
+    def _vocab_token(self, token: str) -> Optional[str]:
+        """Exact vocabulary token or one within a single edit of it."""
+        if token in self.postings:
+            return token
+        if len(token) <= MAX_EXACT_ONLY_LEN:
+            return None
+        candidates = set(self.deletion_index.get(token, ()))   # query is missing a character
+        for d in _deletes(token):
+            if d in self.postings:                              # query has an extra character
+                candidates.add(d)
+            candidates |= self.deletion_index.get(d, set())     # substitution / transposition
+        if not candidates:
+            return None
+        return max(candidates, key=lambda t: (self.idf.get(t, 0), t))
+
+    def _fuzzy(self, tokens: List[str]) -> Optional[dict]:
+        matched = [t for t in (self._vocab_token(t) for t in tokens) if t]
+        if not matched:
+            return None
+        query = set(matched)
+        # Words with no vocabulary match count as rare words the alias lacks.
+        unmatched_weight = self.max_idf * (len(tokens) - len(matched))
+
+        scores = defaultdict(float)
+        for tok in query:
+            w = self.idf[tok]
+            for alias_idx in self.postings[tok]:
+                scores[alias_idx] += w
+
+        q_weight = sum(self.idf[t] for t in query) + unmatched_weight
+        best, best_score = None, 0.0
+        for alias_idx, common in scores.items():
+            a_weight = sum(self.idf[t] for t in self.alias_tokens[alias_idx])
+            score = 2 * common / (q_weight + a_weight)
+            if score > best_score:
+                best, best_score = alias_idx, score
+        if best is None or best_score < MIN_FUZZY_SCORE:
+            return None
+        return self._result(self.alias_entries[best], "fuzzy", round(best_score, 3))
+
+    @staticmethod
+    def _result(entry: tuple, method: str, score: float) -> dict:
+        return {"condition_id": entry[0], "condition": entry[1], "method": method, "score": score}
+
+    def resolve(self, text: str) -> Optional[dict]:
+        """Resolve one condition string to {condition_id, condition, method, score} or None."""
+        if not text or not text.strip() or is_null_condition(text):
+            return None
+        key = text.strip().lower()
+        if key in self._cache:
+            return self._cache[key]
+
+        result = None
+        if key in self.exact:
+            result = self._result(self.exact[key], "exact", 1.0)
+        else:
+            norm = normalize(key)
+            compact = norm.replace(" ", "")
+            if norm in self.normalized:
+                result = self._result(self.normalized[norm], "normalized", 1.0)
+            elif compact in self.abbreviations:
+                result = self._result(self.abbreviations[compact], "abbreviation", 1.0)
+            elif norm:
+                result = self._fuzzy(norm.split())
+
+        if len(self._cache) >= CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
+
+    def resolve_many(self, names: List[str]) -> List[dict]:
+        return [{"input": n, **(self.resolve(n) or {"condition_id": None})} for n in names]
+
+
+# ─── Lazy Singleton ─────────────────────────────
+_index = None
+
+def get_condition_index() -> ConditionIndex:
+    global _index
+    if _index is None:
+        _index = ConditionIndex.from_csv(PDI_CONDITIONS_CSV)
+        print(f"✅ Condition index built ({len(_index.names_by_id)} conditions, {len(_index.alias_tokens)} aliases).")
+    return _index
+
+def resolve_conditions(names: List[str]) -> List[dict]:
+    return get_condition_index().resolve_many(names)
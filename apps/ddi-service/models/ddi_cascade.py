@@ -0,0 +1,42 @@
+# models/ddi_cascade.py
+# Two-stage DDI prediction: the fingerprint-based hybrid binary model screens
+# every pair, and only pairs at or above the threshold go through the
+# ChemBERTa encoder and the 86-class type head.
+
+from typing import List, Tuple
+
+from models.DLTypeClassificationInference import predict_ddi_batch
+from models.hybrid_binary_ddi_inference import predict_hybrid_binary_ddi_batch
+
+BINARY_STAGE = "binary"
+TYPE_STAGE = "type"
+
+
+def predict_cascade(pairs: List[Tuple[str, str]], threshold: float, top_k: int = 3, mode: str = "full"):
+    """Per-pair dicts with label, probability, classes [(class, confidence)]
+    and the stages that ran, plus a summary of the work done and the
+    versions of both models. Invalid SMILES raise ValueError from the
+    binary stage."""
+    binary, binary_version = predict_hybrid_binary_ddi_batch(pairs, return_version=True)
+    hot = [i for i, (_, prob) in enumerate(binary) if prob >= threshold]
+    classes, type_version = (predict_ddi_batch([pairs[i] for i in hot], top_k=top_k, mode=mode, return_version=True)
+                             if hot else ([], None))
+    by_index = dict(zip(hot, classes))
+
+    results = [
+        {
+            "label": int(label),
+            "probability": prob,
+            "classes": by_index.get(i, []),
+            "stages": [BINARY_STAGE, TYPE_STAGE] if i in by_index else [BINARY_STAGE],
+        }
+        for i, (label, prob) in enumerate(binary)
+    ]
+    summary = {
+        "pairs": len(pairs),
+        "type_stage_pairs": len(hot),
+        "unique_smiles": len({s for pair in pairs for s in pair}),
+        "type_stage_smiles": len({s for i in hot for s in pairs[i]}),
+        "model_version": {"hybrid_binary": binary_version, "ddi_type": type_version},
+    }
+    return results, summary
@@ -0,0 +1,22 @@
+# models/ddi_classifier.py
+# 86-class DDI type head over concatenated ChemBERTa embeddings (emb1 ⊕ emb2).
+# Kept free of transformers imports so training scripts can use it without
+# loading the encoder.
+
+import torch.nn as nn
+
+NUM_CLASSES = 86
+
+
+class DDIClassifier(nn.Module):
+    def __init__(self, input_dim=1536, num_classes=NUM_CLASSES):
+        super(DDIClassifier, self).__init__()
+        self.fc = nn.Sequential(
+            nn.Linear(input_dim, 512),
+            nn.ReLU(),
+            nn.Dropout(0.3),
+            nn.Linear(512, num_classes)
+        )
+
+    def forward(self, x):
+        return self.fc(x)
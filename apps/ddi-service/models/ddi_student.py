@@ -0,0 +1,110 @@
+# models/ddi_student.py
+# Fingerprint-only student of the ChemBERTa DDI type classifier, trained by
+# training/distill_type_student.py and served as mode="fast".
+#
+# Network: [fp1 ⊕ fp2] (2 × 1191 Morgan+MACCS bits) → 256 → 256 → 86.
+# The first layer is linear in the concatenation, so it splits into one
+# projection per drug and side (fp @ W1[:1191], fp @ W1[1191:]). Those
+# projections are cached per SMILES, leaving two small dense layers per pair.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+from config2 import DDI_STUDENT_PATH
+from metrics import observe_inference
+from models.fingerprints import generate_fingerprint
+from models.hybrid_binary_model import FP_DIM
+from models.result_cache import register_model
+
+NPZ_KEYS = ("w1", "b1", "w2", "b2", "w3", "b3")
+PROJECTION_CACHE_SIZE = 8192
+
+
+class StudentModel:
+    def __init__(self, weights: dict):
+        for key in NPZ_KEYS:
+            setattr(self, key, np.ascontiguousarray(weights[key], dtype=np.float32))
+        self.w1_left = np.ascontiguousarray(self.w1[:FP_DIM])
+        self.w1_right = np.ascontiguousarray(self.w1[FP_DIM:])
+
+    @classmethod
+    def load(cls, path: str) -> "StudentModel":
+        with np.load(path) as f:
+            return cls({k: f[k] for k in NPZ_KEYS})
+
+    def project(self, fps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """First-layer contributions of [N, FP_DIM] fingerprints as drug a and as drug b."""
+        fps = np.asarray(fps, dtype=np.float32)
+        return fps @ self.w1_left, fps @ self.w1_right
+
+    def probs_from_projections(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        h = np.maximum(left + right + self.b1, 0)
+        h = np.maximum(h @ self.w2 + self.b2, 0)
+        logits = h @ self.w3 + self.b3
+        logits -= logits.max(axis=1, keepdims=True)
+        e = np.exp(logits)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, fp1: np.ndarray, fp2: np.ndarray) -> np.ndarray:
+        """[N, 86] class probabilities for fingerprint batches."""
+        return self.probs_from_projections(self.project(fp1)[0], self.project(fp2)[1])
+
+
+# ─── Serving ────────────────────────────────────
+_student = None
+_load_lock = threading.Lock()
+_projections = OrderedDict()  # smiles → (as drug a, as drug b)
+_cache_lock = threading.Lock()
+
+def is_available() -> bool:
+    return _student is not None or os.path.exists(DDI_STUDENT_PATH)
+
+def _load():
+    global _student
+    with _load_lock:
+        if _student is None:
+            if not os.path.exists(DDI_STUDENT_PATH):
+                raise ValueError(f"Fast mode is not available: no student at {DDI_STUDENT_PATH}")
+            _student = StudentModel.load(DDI_STUDENT_PATH)
+            register_model("ddi_type_fast", DDI_STUDENT_PATH)
+            print(f"✅ DDI student loaded from {DDI_STUDENT_PATH}.")
+    return _student
+
+def _projections_for(student, smiles_list):
+    found, missing = {}, []
+    with _cache_lock:
+        for s in dict.fromkeys(smiles_list):
+            if s in _projections:
+                _projections.move_to_end(s)
+                found[s] = _projections[s]
+            else:
+                missing.append(s)
+    if missing:
+        left, right = student.project(np.stack([generate_fingerprint(s) for s in missing]))
+        with _cache_lock:
+            for i, s in enumerate(missing):
+                found[s] = _projections[s] = (left[i], right[i])
+            while len(_projections) > PROJECTION_CACHE_SIZE:
+                _projections.popitem(last=False)
+    return found
+
+def predict_student_batch(pairs: List[Tuple[str, str]], top_k: int = 3):
+    """Top-k (1-based class, probability) per pair, like predict_ddi_batch.
+    Invalid SMILES raise ValueError."""
+    if not pairs:
+        return []
+    student = _load()
+    proj = _projections_for(student, [s for pair in pairs for s in pair])
+    left = np.stack([proj[a][0] for a, _ in pairs])
+    right = np.stack([proj[b][1] for _, b in pairs])
+    start = time.perf_counter()
+    probs = student.probs_from_projections(left, right)
+    observe_inference("ddi_type_fast", len(pairs), start)
+
+    top = np.argsort(-probs, axis=1)[:, :top_k]
+    return [[(int(c) + 1, float(row[c])) for c in cls] for cls, row in zip(top, probs)]
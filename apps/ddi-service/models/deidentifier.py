@@ -1,26 +1,42 @@
 # models/deidentifier.py
 
 import re
+import time
 from typing import Dict, List
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+from config2 import DEID_MODEL
+from metrics import observe_inference
+from models.weights import module_hash
 
 # ─── Load DeID model lazily to avoid startup crashes ───────────────────────────────
-model_name = "StanfordAIMI/stanford-deidentifier-base"
+model_name = DEID_MODEL
 tokenizer = None
 model = None
 nlp_pipeline = None
+_active = None  # (pipeline, version), swapped as one reference
+
+def load_pipeline(name: str = model_name):
+    """(version, NER pipeline) for `name` without making it the serving one."""
+    tok = AutoTokenizer.from_pretrained(name)
+    ner = AutoModelForTokenClassification.from_pretrained(name)
+    return module_hash(ner)[:12], pipeline("ner", model=ner, tokenizer=tok, aggregation_strategy="simple")
+
+def activate_pipeline(version: str, ner_pipeline):
+    """Serves `ner_pipeline`; running requests finish on the previous one."""
+    global tokenizer, model, nlp_pipeline, _active
+    tokenizer, model, nlp_pipeline = ner_pipeline.tokenizer, ner_pipeline.model, ner_pipeline
+    _active = (ner_pipeline, version)
 
 def _load_model():
-    global tokenizer, model, nlp_pipeline
-    if nlp_pipeline is None:
+    global nlp_pipeline, _active
+    if _active is None:
         try:
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForTokenClassification.from_pretrained(model_name)
-            nlp_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+            activate_pipeline(*load_pipeline())
         except Exception as e:
             print(f"Warning: Could not load deidentifier model: {e}")
             # Return a dummy pipeline that just returns empty results
             nlp_pipeline = lambda x: []
+            _active = (nlp_pipeline, "unavailable")
 
 # ─── Regex patterns ───────────────────────────────────────────
 regex_patterns = {
@@ -44,9 +60,12 @@ ENTITY_REMAP = {
 # ─── Main function to expose ──────────────────────────────────
 def deidentify_text(text: str) -> Dict:
     _load_model()  # Load model on first use
-    
+    ner_pipeline, version = _active
+
     try:
-        ner_entities = nlp_pipeline(text) if nlp_pipeline else []
+        start = time.perf_counter()
+        ner_entities = ner_pipeline(text) if ner_pipeline else []
+        observe_inference("deidentifier", 1, start)
     except Exception as e:
         print(f"Warning: NER pipeline failed: {e}")
         ner_entities = []
@@ -83,5 +102,6 @@ def deidentify_text(text: str) -> Dict:
     return {
         "input_text": text,
         "deidentified_text": redacted_text,
-        "entities": list(reversed(extracted_info))
+        "entities": list(reversed(extracted_info)),
+        "model_version": version
     }
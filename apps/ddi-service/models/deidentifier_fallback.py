@@ -50,5 +50,6 @@ def deidentify_text(text: str) -> Dict:
     return {
         "input_text": text,
         "deidentified_text": redacted_text,
-        "entities": list(reversed(extracted_info))
+        "entities": list(reversed(extracted_info)),
+        "model_version": "regex"
     }
\ No newline at end of file
@@ -0,0 +1,101 @@
+# models/embedding_store.py
+# On-disk store of precomputed ChemBERTa SMILES embeddings.
+#
+# Layout of a store directory:
+#   embeddings.npy   float32 [N, dim], opened memory-mapped
+#   index.json       {"model": ..., "layer": ..., "dim": ..., "smiles": [N SMILES]}
+#   pairs.npy        optional int32 [M, 2] row indices of (Drug1, Drug2)
+#   labels.npy       optional int64 [M] 0-based class labels
+#
+# Written by training/build_embeddings.py; read by training scripts and by
+# the serving embedding cache.
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.json"
+PAIRS_FILE = "pairs.npy"
+LABELS_FILE = "labels.npy"
+
+
+class EmbeddingStore:
+    def __init__(self, path: str, embeddings: np.ndarray, meta: dict):
+        self.path = path
+        self.embeddings = embeddings
+        self.meta = meta
+        self.smiles: List[str] = meta["smiles"]
+        self.row: Dict[str, int] = {s: i for i, s in enumerate(self.smiles)}
+
+    # ─── Open / Create ──────────────────────────
+    @classmethod
+    def open(cls, path: str) -> "EmbeddingStore":
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        return cls(path, embeddings, meta)
+
+    @classmethod
+    def open_if_exists(cls, path: Optional[str]) -> Optional["EmbeddingStore"]:
+        if path and os.path.exists(os.path.join(path, INDEX_FILE)):
+            try:
+                store = cls.open(path)
+                print(f"✅ Embedding store loaded: {len(store)} SMILES from {path}")
+                return store
+            except Exception as e:
+                print(f"Warning: Could not open embedding store {path}: {e}")
+        return None
+
+    @staticmethod
+    def create(path: str, smiles: List[str], dim: int, model: str, layer: int = -1) -> np.ndarray:
+        """Writes the index and returns a writable memmap to fill row by row."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({"model": model, "layer": layer, "dim": dim, "smiles": list(smiles)}, f)
+        return np.lib.format.open_memmap(
+            os.path.join(path, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(len(smiles), dim)
+        )
+
+    # ─── Lookups ────────────────────────────────
+    def __len__(self):
+        return len(self.smiles)
+
+    def __contains__(self, smiles: str):
+        return smiles in self.row
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    @property
+    def layer(self) -> int:
+        return self.meta.get("layer", -1)
+
+    def get(self, smiles: str) -> Optional[np.ndarray]:
+        i = self.row.get(smiles)
+        return None if i is None else np.asarray(self.embeddings[i])
+
+    def rows(self, smiles_list: Iterable[str]) -> np.ndarray:
+        """Row indices for SMILES; raises KeyError for unknown SMILES."""
+        return np.fromiter((self.row[s] for s in smiles_list), dtype=np.int64)
+
+    # ─── Pair Features ──────────────────────────
+    def pair_features(self, pair_rows: np.ndarray) -> np.ndarray:
+        """[M, 2*dim] features (emb1 ⊕ emb2) gathered from row-index pairs."""
+        pair_rows = np.asarray(pair_rows)
+        return np.concatenate(
+            (self.embeddings[pair_rows[:, 0]], self.embeddings[pair_rows[:, 1]]), axis=1
+        )
+
+    def load_pairs(self):
+        """(pairs [M, 2], labels [M]) written alongside the embeddings."""
+        pairs = np.load(os.path.join(self.path, PAIRS_FILE), mmap_mode="r")
+        labels = np.load(os.path.join(self.path, LABELS_FILE), mmap_mode="r")
+        return pairs, labels
+
+    def save_pairs(self, pairs: np.ndarray, labels: np.ndarray):
+        np.save(os.path.join(self.path, PAIRS_FILE), np.asarray(pairs, dtype=np.int32))
+        np.save(os.path.join(self.path, LABELS_FILE), np.asarray(labels, dtype=np.int64))
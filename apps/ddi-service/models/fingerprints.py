@@ -0,0 +1,38 @@
+# models/fingerprints.py
+# Morgan + MACCS fingerprints, the input of the hybrid binary model and the
+# DDI student. Kept apart from hybrid_binary_ddi_inference.py, which loads
+# the serving model on import, so training code, tests and the student can
+# fingerprint drugs without loading any model.
+
+from functools import lru_cache
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem, MACCSkeys
+from rdkit.DataStructs import ConvertToNumpyArray
+
+from models.hybrid_binary_model import MORGAN_BITS, FP_DIM
+
+FINGERPRINT_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def generate_fingerprint(smiles: str) -> np.ndarray:
+    """Morgan+MACCS bits for `smiles`, cached per SMILES. The returned array
+    is shared between callers and therefore read-only."""
+    fp = _compute_fingerprint(smiles)
+    fp.setflags(write=False)
+    return fp
+
+def _compute_fingerprint(smiles: str) -> np.ndarray:
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        raise ValueError(f"❌ Invalid SMILES: {smiles}")
+
+    morgan_fp = AllChem.GetMorganFingerprintAsBitVect(mol, radius=2, nBits=MORGAN_BITS)
+    maccs_fp = MACCSkeys.GenMACCSKeys(mol)
+
+    fp = np.zeros((FP_DIM,), dtype=np.float32)
+    ConvertToNumpyArray(morgan_fp, fp[:MORGAN_BITS])
+    ConvertToNumpyArray(maccs_fp, fp[MORGAN_BITS:])
+    return fp
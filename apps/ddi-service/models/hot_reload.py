@@ -0,0 +1,170 @@
+# models/hot_reload.py
+# Zero-downtime model reload for the ddi-service (POST /admin/reload).
+#
+# A reload runs in a background thread, one model at a time:
+#   1. load the new weights next to the serving ones,
+#   2. warm them up on SMOKE_PAIRS / SMOKE_TEXT and check the outputs
+#      (finite probabilities, expected shape),
+#   3. compare top-1 predictions with the serving version and reject the
+#      new weights if agreement is below `min_agreement` (state "rejected"),
+#   4. swap the serving reference in one assignment.
+# Requests that already read the old reference finish on it. The old model
+# is freed when the last of them returns; status() reports this through a
+# weak reference. If the worker pool is running, its workers are replaced
+# once all models are swapped (see worker_pool.restart()).
+
+import gc
+import math
+import threading
+import time
+import weakref
+from typing import Dict, List
+
+from models import worker_pool
+
+RELOADABLE = ("ddi_type", "hybrid_binary", "deidentifier")
+
+SMOKE_PAIRS = [
+    ("CC(=O)OC1=CC=CC=C1C(=O)O", "CN1C=NC2=C1C(=O)N(C(=O)N2C)C"),          # aspirin, caffeine
+    ("CC(C)CC1=CC=C(C=C1)C(C)C(=O)O", "CC(=O)NC1=CC=C(O)C=C1"),              # ibuprofen, paracetamol
+    ("CN1CCC23C4C1CC5=C2C(=C(C=C5)O)OC3C(C=C4)O", "CC(C)NCC(O)COC1=CC=CC2=CC=CC=C21"),  # morphine, propranolol
+    ("CC1=C(C(=O)OC1)C2=CC=CC=C2", "C1=CC=C(C=C1)C(=O)O"),
+]
+SMOKE_TEXT = "Patient John Smith (MRN 12345678) was seen at 12 Main Street on 01/02/2024; call 5551234567."
+
+_reload_lock = threading.Lock()
+_status: Dict[str, dict] = {}
+_retired: Dict[str, weakref.ref] = {}
+
+
+class Rejected(ValueError):
+    """New weights loaded fine but disagree too much with the serving ones."""
+    def __init__(self, name: str, agreement: float, min_agreement: float):
+        super().__init__(f"{name} smoke agreement {agreement:.2f} is below {min_agreement:.2f}")
+        self.agreement = agreement
+        self.min_agreement = min_agreement
+
+
+def _check_probabilities(values: List[float], name: str):
+    if not values or any(not math.isfinite(p) or p < 0 or p > 1 for p in values):
+        raise ValueError(f"{name} smoke test failed: probabilities out of range")
+
+def _agreement(new: list, old: list) -> float:
+    return sum(a == b for a, b in zip(new, old)) / max(len(new), 1)
+
+
+# ─── Per-Model Reloads ──────────────────────────
+# Each returns (new version, old version, agreement, old model).
+
+def _reload_ddi_type(min_agreement: float):
+    from models import DLTypeClassificationInference as type_inference
+    old, _ = type_inference._full
+    candidate = type_inference.load_full_head()
+    if candidate.version == old.version:
+        return old.version, old.version, 1.0, None
+
+    new_top = type_inference._predict_live(candidate, SMOKE_PAIRS, 3)
+    _check_probabilities([p for row in new_top for _, p in row], "ddi_type")
+    old_top = type_inference._predict_live(old, SMOKE_PAIRS, 3)
+    agreement = _agreement([row[0][0] for row in new_top], [row[0][0] for row in old_top])
+    if agreement < min_agreement:
+        raise Rejected("ddi_type", agreement, min_agreement)
+    type_inference.activate_full_head(candidate)
+    return candidate.version, old.version, agreement, old.module
+
+def _reload_hybrid_binary(min_agreement: float):
+    import numpy as np
+    from models import hybrid_binary_ddi_inference as hybrid
+    old = hybrid._active
+    candidate = hybrid.load_model()
+    if candidate[1] == old[1]:
+        return old[1], old[1], 1.0, None
+
+    x1 = np.stack([hybrid.generate_fingerprint(a) for a, _ in SMOKE_PAIRS])
+    x2 = np.stack([hybrid.generate_fingerprint(b) for _, b in SMOKE_PAIRS])
+    new_probs = [float(p) for p in hybrid._predict_probs(candidate[2], x1, x2)]
+    _check_probabilities(new_probs, "hybrid_binary")
+    old_probs = hybrid._predict_probs(old[2], x1, x2)
+    agreement = _agreement([p >= 0.5 for p in new_probs], [p >= 0.5 for p in old_probs])
+    if agreement < min_agreement:
+        raise Rejected("hybrid_binary", agreement, min_agreement)
+    hybrid.activate_model(candidate)
+    return candidate[1], old[1], agreement, old[2]
+
+def _reload_deidentifier(min_agreement: float):
+    from models import deidentifier
+    deidentifier._load_model()
+    old_pipeline, old_version = deidentifier._active
+    version, candidate = deidentifier.load_pipeline()
+    if version == old_version:
+        return version, old_version, 1.0, None
+
+    spans = lambda entities: {(e["start"], e["end"], e["entity_group"]) for e in entities}
+    new = spans(candidate(SMOKE_TEXT))
+    agreement = 1.0
+    if old_version != "unavailable":
+        old = spans(old_pipeline(SMOKE_TEXT))
+        agreement = len(new & old) / max(len(new | old), 1)
+    if agreement < min_agreement:
+        raise Rejected("deidentifier", agreement, min_agreement)
+    deidentifier.activate_pipeline(version, candidate)
+    return version, old_version, agreement, old_pipeline
+
+_RELOADERS = {
+    "ddi_type": _reload_ddi_type,
+    "hybrid_binary": _reload_hybrid_binary,
+    "deidentifier": _reload_deidentifier,
+}
+
+
+def _run(models: List[str], min_agreement: float):
+    try:
+        swapped = False
+        for name in models:
+            entry = _status[name] = {"state": "loading", "started": time.time()}
+            try:
+                version, previous, agreement, old = _RELOADERS[name](min_agreement)
+            except Rejected as e:
+                entry.update(state="rejected", error=str(e), agreement=e.agreement,
+                             min_agreement=e.min_agreement, finished=time.time())
+                print(f"Warning: reload of {name} rejected, keeping the current version: {e}")
+                continue
+            except Exception as e:
+                entry.update(state="failed", error=str(e), finished=time.time())
+                print(f"Warning: reload of {name} failed, keeping the current version: {e}")
+                continue
+            changed = old is not None
+            entry.update(state="swapped" if changed else "unchanged", version=version, previous=previous,
+                         agreement=agreement, min_agreement=min_agreement, finished=time.time())
+            if changed:
+                _retired[name] = weakref.ref(old)
+                swapped = True
+                print(f"✅ {name} reloaded: {previous} → {version} (smoke agreement {agreement:.2f})")
+            del old
+        if swapped:
+            worker_pool.restart()
+    finally:
+        _reload_lock.release()
+
+
+def start_reload(models: List[str], min_agreement: float) -> dict:
+    unknown = [m for m in models if m not in _RELOADERS]
+    if unknown:
+        return {"error": f"Unknown model(s): {unknown}; reloadable: {list(RELOADABLE)}"}
+    if not _reload_lock.acquire(blocking=False):
+        return {"error": "A reload is already running"}
+    for name in models:
+        _status[name] = {"state": "queued"}
+    threading.Thread(target=_run, args=(list(models), min_agreement), daemon=True).start()
+    return {"status": "started", "models": list(models)}
+
+
+def status() -> dict:
+    gc.collect()
+    report = {"running": _reload_lock.locked(), "models": {}}
+    for name, entry in _status.items():
+        entry = dict(entry)
+        if name in _retired:
+            entry["previous_released"] = _retired[name]() is None
+        report["models"][name] = entry
+    return report
@@ -1,67 +1,78 @@
 # hybrid_binary_ddi_inference.py
+import os
+import time
 import numpy as np
-from rdkit import Chem
-from rdkit.Chem import AllChem, MACCSkeys
-from rdkit.DataStructs import ConvertToNumpyArray
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization, Concatenate
+from config2 import HYBRID_BINARY_NPZ_PATH
+from metrics import observe_inference
+from models.hybrid_binary_model import NumpyHybridModel, build_hybrid_ddi_model
+from models.fingerprints import generate_fingerprint
+from models.result_cache import register_model
+from models.weights import weights_hash
 
 # ─── Constants ───────────────────────────────────────────────
-MORGAN_BITS = 1024
-MACCS_BITS = 167
-FP_DIM = MORGAN_BITS + MACCS_BITS
 MODEL_WEIGHTS_PATH = "models/model_Files/hybrid_ddi_model_final.h5"
 
-# ─── Rebuild the Original Training Architecture ─────────────
-def build_hybrid_ddi_model(input_dim=FP_DIM):
-    inp1 = Input(shape=(input_dim,), name='drug1_fp')
-    inp2 = Input(shape=(input_dim,), name='drug2_fp')
+# ─── Load Model ─────────────────────────────────────────────
+# The NumPy export (training/convert_hybrid_binary.py) avoids importing
+# TensorFlow; the Keras model is only built if there is no export, or if the
+# .h5 is newer than the export (it has not been re-converted yet).
+def load_model(npz_path: str = HYBRID_BINARY_NPZ_PATH, h5_path: str = MODEL_WEIGHTS_PATH):
+    """(weights path, version, model) without making it the serving model."""
+    if os.path.exists(npz_path) and not (
+            os.path.exists(h5_path) and os.path.getmtime(h5_path) > os.path.getmtime(npz_path)):
+        loaded, path = NumpyHybridModel.load(npz_path), npz_path
+        print(f"✅ Hybrid binary DDI model loaded from {npz_path} (NumPy).")
+    else:
+        if os.path.exists(npz_path):
+            print(f"Warning: {h5_path} is newer than {npz_path}; loading it with TensorFlow")
+        loaded, path = build_hybrid_ddi_model(), h5_path
+        loaded.load_weights(h5_path)
+        print("✅ Hybrid binary DDI model weights loaded.")
+    return path, weights_hash(path)[:12], loaded
 
-    def subnet(x):
-        x = Dense(256, activation='relu')(x)
-        x = BatchNormalization()(x)
-        x = Dropout(0.3)(x)
-        x = Dense(128, activation='relu')(x)
-        x = BatchNormalization()(x)
-        return x
+def activate_model(candidate):
+    """Serves `candidate` from load_model(); running requests keep the old one."""
+    global _active
+    _active = candidate
+    register_model("hybrid_binary", candidate[0])
 
-    x1 = subnet(inp1)
-    x2 = subnet(inp2)
-    x = Concatenate()([x1, x2])
-    x = Dense(64, activation='relu')(x)
-    x = Dropout(0.3)(x)
-    out = Dense(1, activation='sigmoid')(x)
+activate_model(load_model())
 
-    return Model(inputs=[inp1, inp2], outputs=out)
-
-# ─── Load Model Weights ─────────────────────────────────────
-model = build_hybrid_ddi_model()
-model.load_weights(MODEL_WEIGHTS_PATH)
-print("✅ Hybrid binary DDI model weights loaded.")
-
-# ─── Fingerprint Generator ──────────────────────────────────
-def generate_fingerprint(smiles: str) -> np.ndarray:
-    mol = Chem.MolFromSmiles(smiles)
-    if mol is None:
-        raise ValueError(f"❌ Invalid SMILES: {smiles}")
-
-    morgan_fp = AllChem.GetMorganFingerprintAsBitVect(mol, radius=2, nBits=MORGAN_BITS)
-    maccs_fp = MACCSkeys.GenMACCSKeys(mol)
-
-    fp = np.zeros((FP_DIM,), dtype=np.float32)
-    ConvertToNumpyArray(morgan_fp, fp[:MORGAN_BITS])
-    ConvertToNumpyArray(maccs_fp, fp[MORGAN_BITS:])
-    return fp
+def _predict_probs(model, input1: np.ndarray, input2: np.ndarray) -> np.ndarray:
+    start = time.perf_counter()
+    if isinstance(model, NumpyHybridModel):
+        probs = model.predict(input1, input2)
+    else:
+        probs = model.predict([input1, input2], verbose=0, batch_size=len(input1))[:, 0]
+    observe_inference("hybrid_binary", len(input1), start)
+    return probs
 
 # ─── Inference Function ─────────────────────────────────────
-def predict_hybrid_binary_ddi(smiles1: str, smiles2: str):
+def predict_hybrid_binary_ddi(smiles1: str, smiles2: str, return_version: bool = False):
+    _, version, model = _active
     fp1 = generate_fingerprint(smiles1)
     fp2 = generate_fingerprint(smiles2)
 
     input1 = np.expand_dims(fp1, axis=0)
     input2 = np.expand_dims(fp2, axis=0)
 
-    prob = float(model.predict([input1, input2], verbose=0)[0][0])
+    prob = float(_predict_probs(model, input1, input2)[0])
     label = 1 if prob >= 0.5 else 0
 
-    return label, prob
\ No newline at end of file
+    return ((label, prob), version) if return_version else (label, prob)
+
+# ─── Batched Inference ──────────────────────────────────────
+def predict_hybrid_binary_ddi_batch(pairs, return_version: bool = False):
+    """(label, probability) for many (smiles1, smiles2) pairs in one
+    model call. Invalid SMILES raise ValueError like the single-pair path.
+    With return_version, returns (results, version of the weights used)."""
+    _, version, model = _active
+    if not pairs:
+        return ([], version) if return_version else []
+    fps = {s: generate_fingerprint(s) for pair in pairs for s in pair}
+    input1 = np.stack([fps[s1] for s1, _ in pairs])
+    input2 = np.stack([fps[s2] for _, s2 in pairs])
+
+    probs = _predict_probs(model, input1, input2)
+    results = [(1 if p >= 0.5 else 0, float(p)) for p in probs]
+    return (results, version) if return_version else results
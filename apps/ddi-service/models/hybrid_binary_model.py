@@ -0,0 +1,112 @@
+# models/hybrid_binary_model.py
+# Hybrid binary DDI network: the original Keras architecture (used only for
+# conversion and as a fallback) and a pure-NumPy forward pass over weights
+# exported by training/convert_hybrid_binary.py.
+#
+# Every BatchNormalization in the network sits after a ReLU, so it is folded
+# into the *next* Dense layer: BN(h) = a*h + c, hence
+#   Dense(BN(h)) = h @ (a[:, None] * W) + (c @ W + b)
+# Dropout is the identity at inference time.
+
+import numpy as np
+
+MORGAN_BITS = 1024
+MACCS_BITS = 167
+FP_DIM = MORGAN_BITS + MACCS_BITS
+
+NPZ_KEYS = ("w1", "b1", "w2", "b2", "w3", "b3", "w4", "b4")
+
+
+# ─── Keras Architecture ─────────────────────────────────────
+def build_hybrid_ddi_model(input_dim=FP_DIM, record=None):
+    """Rebuilds the original training architecture. Layers are created in the
+    same order as before, so legacy .h5 weights load unchanged. If `record`
+    is a dict, it receives the layer objects needed for conversion."""
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization, Concatenate
+
+    inp1 = Input(shape=(input_dim,), name='drug1_fp')
+    inp2 = Input(shape=(input_dim,), name='drug2_fp')
+    towers = []
+
+    def subnet(x):
+        layers = [Dense(256, activation='relu'), BatchNormalization(), Dropout(0.3),
+                  Dense(128, activation='relu'), BatchNormalization()]
+        for layer in layers:
+            x = layer(x)
+        towers.append([l for l in layers if not isinstance(l, Dropout)])
+        return x
+
+    x1 = subnet(inp1)
+    x2 = subnet(inp2)
+    x = Concatenate()([x1, x2])
+    head = Dense(64, activation='relu')
+    x = head(x)
+    x = Dropout(0.3)(x)
+    out_layer = Dense(1, activation='sigmoid')
+    out = out_layer(x)
+
+    if record is not None:
+        record.update(tower1=towers[0], tower2=towers[1], head=head, out=out_layer)
+    return Model(inputs=[inp1, inp2], outputs=out)
+
+
+# ─── BatchNorm Folding ──────────────────────────────────────
+def bn_affine(gamma, beta, mean, var, eps):
+    """BN(h) = a*h + c at inference time."""
+    a = gamma / np.sqrt(var + eps)
+    return a, beta - a * mean
+
+def fold_into_next(a, c, w, b):
+    """Folds a preceding BN affine (a, c) into Dense weights (w, b)."""
+    return a[:, None] * w, b + c @ w
+
+def fold_keras_layers(record) -> dict:
+    """Folded float32 weights from layers recorded by build_hybrid_ddi_model().
+    The two towers share no weights, so each gets its own w1/b1/w2/b2; they are
+    stacked along a leading axis of size 2."""
+    def bn(layer):
+        gamma, beta, mean, var = layer.get_weights()
+        return bn_affine(gamma, beta, mean, var, layer.epsilon)
+
+    w1, b1, w2, b2, tails = [], [], [], [], []
+    for dense1, bn1, dense2, bn2 in (record["tower1"], record["tower2"]):
+        wa, ba = dense1.get_weights()
+        wb, bb = fold_into_next(*bn(bn1), *dense2.get_weights())
+        w1.append(wa); b1.append(ba); w2.append(wb); b2.append(bb)
+        tails.append(bn(bn2))
+
+    # BN2 of both towers is folded into the 64-unit head across the concat.
+    a = np.concatenate([tails[0][0], tails[1][0]])
+    c = np.concatenate([tails[0][1], tails[1][1]])
+    w3, b3 = fold_into_next(a, c, *record["head"].get_weights())
+    w4, b4 = record["out"].get_weights()
+
+    weights = dict(w1=np.stack(w1), b1=np.stack(b1), w2=np.stack(w2), b2=np.stack(b2),
+                   w3=w3, b3=b3, w4=w4, b4=b4)
+    return {k: v.astype(np.float32) for k, v in weights.items()}
+
+
+# ─── NumPy Forward Pass ─────────────────────────────────────
+class NumpyHybridModel:
+    def __init__(self, weights: dict):
+        for key in NPZ_KEYS:
+            setattr(self, key, np.ascontiguousarray(weights[key], dtype=np.float32))
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyHybridModel":
+        with np.load(path) as f:
+            return cls({k: f[k] for k in NPZ_KEYS})
+
+    def _tower(self, k: int, x: np.ndarray) -> np.ndarray:
+        h = np.maximum(x @ self.w1[k] + self.b1[k], 0)
+        return np.maximum(h @ self.w2[k] + self.b2[k], 0)
+
+    def predict(self, x1: np.ndarray, x2: np.ndarray) -> np.ndarray:
+        """[N] interaction probabilities for [N, FP_DIM] fingerprint batches."""
+        x1 = np.asarray(x1, dtype=np.float32)
+        x2 = np.asarray(x2, dtype=np.float32)
+        z = np.concatenate((self._tower(0, x1), self._tower(1, x2)), axis=1)
+        h = np.maximum(z @ self.w3 + self.b3, 0)
+        logit = (h @ self.w4 + self.b4)[:, 0]
+        return 1.0 / (1.0 + np.exp(-logit))
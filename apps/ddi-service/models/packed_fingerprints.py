@@ -0,0 +1,57 @@
+# models/packed_fingerprints.py
+# Bit fingerprints packed into uint64 words with vectorized popcount
+# Tanimoto similarity. Used by dataset building and similarity search.
+
+import numpy as np
+
+# ─── Popcount ───────────────────────────────────
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    def popcount(words: np.ndarray) -> np.ndarray:
+        """Per-row number of set bits of a [..., W] uint64 array."""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words: np.ndarray) -> np.ndarray:
+        as_bytes = np.ascontiguousarray(words).view(np.uint8)
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int32)
+
+
+# ─── Packing ────────────────────────────────────
+def pack_bits(bits: np.ndarray) -> np.ndarray:
+    """[N, B] 0/1 array → [N, ceil(B/64)] uint64."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    n, b = bits.shape
+    pad = (-b) % 64
+    if pad:
+        bits = np.concatenate((bits, np.zeros((n, pad), dtype=np.uint8)), axis=1)
+    packed = np.packbits(bits, axis=1, bitorder="little")
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+def pack_bitvects(fps, n_bits: int) -> np.ndarray:
+    """RDKit ExplicitBitVects → packed [N, ceil(n_bits/64)] uint64."""
+    from rdkit.DataStructs import ConvertToNumpyArray
+    bits = np.zeros((len(fps), n_bits), dtype=np.uint8)
+    row = np.zeros((n_bits,), dtype=np.uint8)
+    for i, fp in enumerate(fps):
+        ConvertToNumpyArray(fp, row)
+        bits[i] = row
+    return pack_bits(bits)
+
+
+# ─── Tanimoto ───────────────────────────────────
+def tanimoto_pairs(packed: np.ndarray, i: np.ndarray, j: np.ndarray, counts: np.ndarray = None) -> np.ndarray:
+    """Tanimoto similarity of rows i[k] and j[k] for every k."""
+    if counts is None:
+        counts = popcount(packed)
+    common = popcount(packed[i] & packed[j])
+    union = counts[i] + counts[j] - common
+    return np.where(union > 0, common / np.maximum(union, 1), 0.0)
+
+def tanimoto_one_to_many(query: np.ndarray, packed: np.ndarray, counts: np.ndarray = None) -> np.ndarray:
+    """Tanimoto similarity of one packed fingerprint against every row of `packed`."""
+    if counts is None:
+        counts = popcount(packed)
+    common = popcount(packed & query[None, :])
+    union = counts + int(popcount(query[None, :])[0]) - common
+    return np.where(union > 0, common / np.maximum(union, 1), 0.0)
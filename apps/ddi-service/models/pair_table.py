@@ -0,0 +1,83 @@
+# models/pair_table.py
+# Precomputed DDI type predictions for every ordered pair of catalog drugs.
+#
+# Layout of a table directory (written by training/materialize_pairs.py):
+#   index.json    {"model", "weights_hash", "top_k", "drug_ids", "names", "smiles"}
+#   classes.npy   int16   [N, N, top_k] 1-based class ids, best first
+#   probs.npy     float16 [N, N, top_k] matching probabilities
+#
+# Row i / column j is drug i as "Drug a" and drug j as "Drug b". Both arrays
+# are opened memory-mapped, so serving only touches the pages it reads.
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.weights import weights_hash
+
+INDEX_FILE = "index.json"
+CLASSES_FILE = "classes.npy"
+PROBS_FILE = "probs.npy"
+
+
+class PairTable:
+    def __init__(self, path: str, meta: dict, classes: np.ndarray, probs: np.ndarray):
+        self.path = path
+        self.meta = meta
+        self.classes = classes
+        self.probs = probs
+        self.top_k = meta["top_k"]
+        self.row = {s: i for i, s in enumerate(meta["smiles"])}
+
+    def __len__(self):
+        return len(self.row)
+
+    # ─── Open / Create ──────────────────────────
+    @classmethod
+    def open(cls, path: str) -> "PairTable":
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        classes = np.load(os.path.join(path, CLASSES_FILE), mmap_mode="r")
+        probs = np.load(os.path.join(path, PROBS_FILE), mmap_mode="r")
+        return cls(path, meta, classes, probs)
+
+    @classmethod
+    def open_if_current(cls, path: Optional[str], model_path: str) -> Optional["PairTable"]:
+        """The table at `path` if it was built from the weights at `model_path`."""
+        if not path or not os.path.exists(os.path.join(path, INDEX_FILE)):
+            return None
+        try:
+            table = cls.open(path)
+        except Exception as e:
+            print(f"Warning: Could not open pair table {path}: {e}")
+            return None
+        if table.meta.get("weights_hash") != weights_hash(model_path):
+            print(f"Warning: pair table {path} was built from different weights; ignoring it")
+            return None
+        print(f"✅ Pair table loaded: {len(table)} drugs, top-{table.top_k} from {path}")
+        return table
+
+    @staticmethod
+    def create(path: str, meta: dict, n: int, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Writes the index and returns writable (classes, probs) memmaps."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({**meta, "top_k": top_k}, f)
+        classes = np.lib.format.open_memmap(os.path.join(path, CLASSES_FILE), mode="w+",
+                                            dtype=np.int16, shape=(n, n, top_k))
+        probs = np.lib.format.open_memmap(os.path.join(path, PROBS_FILE), mode="w+",
+                                          dtype=np.float16, shape=(n, n, top_k))
+        return classes, probs
+
+    # ─── Lookups ────────────────────────────────
+    def lookup(self, smiles1: str, smiles2: str, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """[(class, probability)] for a catalog pair, or None if either SMILES
+        is unknown or more classes are requested than were stored."""
+        if top_k > self.top_k:
+            return None
+        i, j = self.row.get(smiles1), self.row.get(smiles2)
+        if i is None or j is None:
+            return None
+        return [(int(c), float(p)) for c, p in zip(self.classes[i, j, :top_k], self.probs[i, j, :top_k])]
@@ -0,0 +1,151 @@
+# models/pdi_inference.py
+# Inference for the patient-condition / drug (PDI) contraindication model
+# trained in docs/ml-models/Patientcondition_drug_interaction_model.
+
+import os
+import time
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from transformers import AutoConfig, AutoModel, AutoTokenizer
+from config2 import PDI_MODEL_DIR
+from metrics import observe_inference
+from models.chemberta_encoder import (
+    ChemBERTaEncoder, get_base_encoder, get_encoder, get_head, register_head, share_parameters
+)
+from models.weights import weights_hash
+
+# ─── Config ─────────────────────────────────────
+DEVICE = torch.device("cpu")  # Force CPU
+MAX_LENGTH = 256  # same truncation as training
+ENCODER_PREFIX = "smiles_encoder."
+
+# ─── Model Definition ───────────────────────────
+class PDIHead(nn.Module):
+    """Head of the notebook's ChemPDIPredictor: a learned condition embedding
+    and a linear classifier over [drug CLS ⊕ condition]. The drug encoder is
+    a shared ChemBERTaEncoder (models/chemberta_encoder.py)."""
+    def __init__(self, hidden_size: int, num_conditions: int):
+        super().__init__()
+        self.cond_embedding = nn.Embedding(num_conditions, hidden_size)
+        self.classifier = nn.Linear(hidden_size * 2, 2)
+
+    def grid_logits(self, drug_emb, condition_ids):
+        """Logits for every (drug, condition) pair, shape [D, K, 2].
+
+        The classifier is linear over [drug ⊕ condition], so it splits into
+        a drug term and a condition term that are broadcast-added instead of
+        materialising D*K concatenated feature rows."""
+        hidden = drug_emb.shape[1]
+        w_drug = self.classifier.weight[:, :hidden]
+        w_cond = self.classifier.weight[:, hidden:]
+        cond_emb = self.cond_embedding(condition_ids)            # [K, hidden]
+        drug_term = drug_emb @ w_drug.T                           # [D, 2]
+        cond_term = cond_emb @ w_cond.T + self.classifier.bias    # [K, 2]
+        return drug_term[:, None, :] + cond_term[None, :, :]
+
+# ─── Lazy Loading ───────────────────────────────
+encoder = None
+model = None
+
+def _weights_file(model_dir: str) -> str:
+    safetensors_path = os.path.join(model_dir, "model.safetensors")
+    return safetensors_path if os.path.exists(safetensors_path) else os.path.join(model_dir, "pytorch_model.bin")
+
+def _load_state_dict(model_dir: str):
+    path = _weights_file(model_dir)
+    if path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+        return load_file(path, device="cpu")
+    return torch.load(path, map_location=DEVICE)
+
+def _same_weights(module: nn.Module, state: dict) -> bool:
+    """True if `state` holds every parameter of `module` with identical values."""
+    own = dict(module.named_parameters())
+    return all(k in state and state[k].shape == v.shape and torch.equal(v.detach(), state[k].to(v.dtype))
+               for k, v in own.items())
+
+def _resolve_encoder(encoder_state: dict) -> ChemBERTaEncoder:
+    """The shared base encoder if the checkpoint kept ChemBERTa frozen, else
+    an encoder for the fine-tuned weights (registered once per model dir)
+    that shares the base tokenizer and unchanged parameters."""
+    base = get_base_encoder()
+    if _same_weights(base.model, encoder_state):
+        return base
+
+    def load():
+        config = AutoConfig.from_pretrained(PDI_MODEL_DIR)
+        transformer = AutoModel.from_config(config)
+        missing, _ = transformer.load_state_dict(encoder_state, strict=False)
+        if missing:
+            print(f"Warning: PDI checkpoint is missing {len(missing)} encoder weight(s), e.g. {missing[:3]}")
+        shared = share_parameters(transformer, base.model)
+        total = sum(p.numel() for p in transformer.parameters())
+        print(f"Warning: PDI checkpoint fine-tuned ChemBERTa; loading a second encoder "
+              f"({shared / max(total, 1):.0%} of its weights shared with the base encoder)")
+        tokenizer = AutoTokenizer.from_pretrained(PDI_MODEL_DIR)
+        if type(tokenizer) is type(base.tokenizer) and tokenizer.get_vocab() == base.tokenizer.get_vocab():
+            tokenizer = base.tokenizer
+        return ChemBERTaEncoder(f"pdi:{PDI_MODEL_DIR}", tokenizer, transformer, max_length=MAX_LENGTH)
+    return get_encoder(f"pdi:{PDI_MODEL_DIR}", load)
+
+def _load_model():
+    global encoder, model
+    if model is not None:
+        return
+    state = _load_state_dict(PDI_MODEL_DIR)
+    encoder_state = {k[len(ENCODER_PREFIX):]: v for k, v in state.items() if k.startswith(ENCODER_PREFIX)}
+    head_state = {k: v for k, v in state.items() if not k.startswith(ENCODER_PREFIX)}
+
+    pdi_encoder = _resolve_encoder(encoder_state)
+    num_conditions = head_state["cond_embedding.weight"].shape[0]
+    pdi = PDIHead(pdi_encoder.hidden_size, num_conditions)
+    pdi.load_state_dict(head_state)
+    pdi.to(DEVICE).eval()
+
+    register_head("pdi", pdi_encoder, pooling="cls", module=pdi,
+                  version=weights_hash(_weights_file(PDI_MODEL_DIR))[:12])
+    encoder, model = pdi_encoder, pdi
+    print(f"✅ PDI model loaded ({num_conditions} conditions, encoder: {pdi_encoder.key}).")
+
+def is_available() -> bool:
+    try:
+        _load_model()
+        return True
+    except Exception as e:
+        print(f"Warning: Could not load PDI model: {e}")
+        return False
+
+def model_version() -> str:
+    _load_model()
+    return get_head("pdi").version
+
+def num_conditions() -> int:
+    _load_model()
+    return model.cond_embedding.num_embeddings
+
+# ─── Drug Embeddings ────────────────────────────
+def smiles_to_cls_embeddings(smiles_list):
+    """CLS embeddings for all drugs, from the shared encoder's cache where possible."""
+    _load_model()
+    return encoder.encode(list(smiles_list), pooling="cls")
+
+# ─── Main Inference Function ────────────────────
+def predict_pdi_grid(smiles_list, condition_ids):
+    """Contraindication probability for every drug × condition.
+    Returns a [len(smiles_list), len(condition_ids)] tensor of P(label=1)."""
+    _load_model()
+    if not smiles_list or not condition_ids:
+        return torch.zeros((len(smiles_list), len(condition_ids)))
+
+    bad = [c for c in condition_ids if c < 0 or c >= model.cond_embedding.num_embeddings]
+    if bad:
+        raise ValueError(f"Unknown condition_id(s): {bad}")
+
+    drug_emb = smiles_to_cls_embeddings(smiles_list)
+    ids = torch.tensor(condition_ids, dtype=torch.long, device=DEVICE)
+    start = time.perf_counter()
+    with torch.no_grad():
+        probs = F.softmax(model.grid_logits(drug_emb, ids), dim=-1)
+    observe_inference("pdi", len(smiles_list) * len(condition_ids), start)
+    return probs[..., 1].cpu()
@@ -0,0 +1,147 @@
+# models/result_cache.py
+# Cache of single-pair prediction results, shared by the /predict-* endpoints.
+#
+# Keys are (model id, weights hash, canonical SMILES 1, canonical SMILES 2,
+# top_k). The weights hash is the sha256 of the weight file the model was
+# loaded from (models/weights.py), so results of different weights never
+# mix. If the file on disk changes while the old weights are still loaded,
+# that model's entries are dropped and its results are no longer cached
+# until it is loaded again.
+#
+# Concurrent requests for the same key are coalesced: the first caller
+# computes, the others wait for its result (or its exception).
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, Tuple
+
+from rdkit import Chem, RDLogger
+
+from config2 import RESULT_CACHE_SIZE
+from models.weights import weights_hash
+
+RDLogger.DisableLog('rdApp.*')
+
+
+@lru_cache(maxsize=16384)
+def canonical_smiles(smiles: str) -> str:
+    """RDKit canonical SMILES, or the input unchanged if it does not parse
+    (the model call then reports the invalid SMILES)."""
+    mol = Chem.MolFromSmiles(smiles)
+    return Chem.MolToSmiles(mol) if mol is not None else smiles
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None:
+                    self._entries[key] = flight.result
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return flight.result
+
+    def invalidate(self, model_id: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == model_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE_SIZE)
+
+# ─── Model Versions ─────────────────────────────
+# model id → (weights path, hash of the weights that are loaded)
+_models: Dict[str, Tuple[str, str]] = {}
+_stale = set()
+
+def register_model(model_id: str, path: str) -> str:
+    """Records the weights a model was just loaded from; call after loading."""
+    version = weights_hash(path)
+    _models[model_id] = (path, version)
+    _stale.discard(model_id)
+    result_cache.invalidate(model_id)
+    return version
+
+def model_version(model_id: str) -> str:
+    return _models.get(model_id, ("", ""))[1]
+
+def cached_prediction(model_id: str, smiles1: str, smiles2: str, top_k: int, compute: Callable):
+    """compute() through the cache. Models that were never registered, or
+    whose weight file changed since loading, are not cached."""
+    if model_id not in _models:
+        return compute()
+    path, version = _models[model_id]
+    if weights_hash(path) != version:
+        if model_id not in _stale:
+            _stale.add(model_id)
+            result_cache.invalidate(model_id)
+            print(f"Warning: {path} changed since {model_id} was loaded; its results are not cached until it is reloaded")
+        return compute()
+    _stale.discard(model_id)
+    key = (model_id, version, canonical_smiles(smiles1), canonical_smiles(smiles2), top_k)
+    return result_cache.get_or_compute(key, compute)
+
+def cache_stats() -> dict:
+    stats = result_cache.stats()
+    stats["models"] = {m: {"path": path, "weights_hash": version, "stale": m in _stale}
+                       for m, (path, version) in _models.items()}
+    return stats
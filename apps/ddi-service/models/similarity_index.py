@@ -0,0 +1,177 @@
+# models/similarity_index.py
+# Structural similarity search over the drug catalog.
+#
+# Morgan fingerprints (radius 2) of every catalog drug with a SMILES are
+# stored as packed uint64 words, sorted by popcount. Queries compute
+# Tanimoto similarity with vectorized popcount. With a similarity threshold
+# t, only rows whose bit count lies in [t*|q|, |q|/t] can qualify
+# (Tanimoto(A, B) <= min(|A|, |B|) / max(|A|, |B|)), so the scan is limited
+# to that slice of the sorted table.
+#
+# The index is built from MongoDB on first use and persisted to
+# SIMILARITY_INDEX_PATH; rebuild it after catalog updates with
+#   python -m models.similarity_index --rebuild
+
+import argparse
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from rdkit import Chem, RDLogger
+from rdkit.Chem import AllChem
+from rdkit.DataStructs import ConvertToNumpyArray
+
+from models.packed_fingerprints import pack_bits, popcount
+
+RDLogger.DisableLog('rdApp.*')
+
+# ─── Config ─────────────────────────────────────
+FP_BITS = 2048
+FP_RADIUS = 2
+
+
+def morgan_bits(smiles: str) -> Optional[np.ndarray]:
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    bits = np.zeros((FP_BITS,), dtype=np.uint8)
+    ConvertToNumpyArray(AllChem.GetMorganFingerprintAsBitVect(mol, radius=FP_RADIUS, nBits=FP_BITS), bits)
+    return bits
+
+
+class SimilarityIndex:
+    def __init__(self, names: List[str], smiles: List[str], packed: np.ndarray):
+        counts = popcount(packed)
+        order = np.argsort(counts, kind="stable")
+        self.names = [names[i] for i in order]
+        self.smiles = [smiles[i] for i in order]
+        self.packed = np.ascontiguousarray(packed[order])
+        self.counts = counts[order]
+        self.rows_by_name = {}
+        for i, name in enumerate(self.names):
+            self.rows_by_name.setdefault(name.lower(), []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    # ─── Build / Persist ────────────────────────
+    @classmethod
+    def from_records(cls, records) -> "SimilarityIndex":
+        """Index of (name, smiles) records; unparseable SMILES are skipped."""
+        names, smiles, bits = [], [], []
+        for name, smi in records:
+            fp = morgan_bits(smi) if smi else None
+            if fp is None:
+                continue
+            names.append(name)
+            smiles.append(smi)
+            bits.append(fp)
+        packed = pack_bits(np.stack(bits)) if bits else np.zeros((0, FP_BITS // 64), dtype=np.uint64)
+        return cls(names, smiles, packed)
+
+    @classmethod
+    def from_catalog(cls, drugdb) -> "SimilarityIndex":
+        docs = drugdb.find({"smiles": {"$nin": [None, ""]}}, {"_id": 0, "name": 1, "smiles": 1})
+        return cls.from_records((d.get("name", ""), d["smiles"]) for d in docs)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, names=np.array(self.names, dtype=str),
+                 smiles=np.array(self.smiles, dtype=str), packed=self.packed)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        with np.load(path) as f:
+            return cls(f["names"].tolist(), f["smiles"].tolist(), f["packed"])
+
+    # ─── Queries ────────────────────────────────
+    def _candidate_slice(self, query_count: int, threshold: float) -> slice:
+        if not threshold or threshold <= 0:
+            return slice(0, len(self))
+        # Small slack so float rounding never prunes a row exactly at the bound.
+        lo = np.searchsorted(self.counts, int(np.ceil(threshold * query_count - 1e-9)), side="left")
+        hi = np.searchsorted(self.counts, int(np.floor(query_count / threshold + 1e-9)), side="right")
+        return slice(lo, hi)
+
+    def search_packed(self, query: np.ndarray, k: int = 10, threshold: float = 0.0, exclude=()):
+        """[(row, similarity)] of the k most similar rows with similarity >= threshold."""
+        query_count = int(popcount(query[None, :])[0])
+        rows = self._candidate_slice(query_count, threshold)
+        packed, counts = self.packed[rows], self.counts[rows]
+        if len(counts) == 0:
+            return []
+
+        common = popcount(packed & query[None, :])
+        union = counts + query_count - common
+        sims = np.where(union > 0, common / np.maximum(union, 1), 0.0)
+        if exclude:
+            offset = rows.start
+            for row in exclude:
+                if offset <= row < offset + len(sims):
+                    sims[row - offset] = -1.0
+
+        keep = np.flatnonzero(sims >= max(threshold, 0.0))
+        if len(keep) > k:
+            keep = keep[np.argpartition(-sims[keep], k - 1)[:k]]
+        keep = keep[np.argsort(-sims[keep], kind="stable")]
+        return [(int(i) + rows.start, float(sims[i])) for i in keep]
+
+    def search(self, smiles: str, k: int = 10, threshold: float = 0.0, exclude_names=()):
+        """Nearest catalog drugs to `smiles` as dicts with name, smiles and
+        similarity. Raises ValueError for invalid SMILES."""
+        bits = morgan_bits(smiles)
+        if bits is None:
+            raise ValueError(f"Invalid SMILES: {smiles}")
+        exclude = [i for n in exclude_names for i in self.rows_by_name.get(n.lower(), [])]
+        hits = self.search_packed(pack_bits(bits[None, :])[0], k, threshold, exclude)
+        return [{"name": self.names[i], "smiles": self.smiles[i], "similarity": round(sim, 4)} for i, sim in hits]
+
+    def smiles_for(self, name: str) -> Optional[str]:
+        rows = self.rows_by_name.get(name.lower())
+        return self.smiles[rows[0]] if rows else None
+
+
+# ─── Singleton ──────────────────────────────────
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+def get_similarity_index(drugdb, path: str) -> SimilarityIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            if os.path.exists(path):
+                _index = SimilarityIndex.load(path)
+            else:
+                _index = SimilarityIndex.from_catalog(drugdb)
+                _index.save(path)
+            print(f"✅ Similarity index ready ({len(_index)} drugs).")
+    return _index
+
+
+if __name__ == "__main__":
+    import time
+    from pymongo import MongoClient
+    from config2 import MONGO_URI, DB_NAME, COLLECTION_NAME, SIMILARITY_INDEX_PATH
+
+    parser = argparse.ArgumentParser(description="Build or query the drug similarity index")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index from the catalog")
+    parser.add_argument("--query", default=None, help="SMILES to search for")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.0)
+    args = parser.parse_args()
+
+    drugdb = MongoClient(MONGO_URI)[DB_NAME][COLLECTION_NAME]
+    if args.rebuild:
+        index = SimilarityIndex.from_catalog(drugdb)
+        index.save(SIMILARITY_INDEX_PATH)
+        print(f"✅ Indexed {len(index)} drugs → {SIMILARITY_INDEX_PATH}")
+    if args.query:
+        index = get_similarity_index(drugdb, SIMILARITY_INDEX_PATH)
+        t0 = time.perf_counter()
+        hits = index.search(args.query, args.k, args.threshold)
+        print(f"{(time.perf_counter() - t0) * 1e3:.2f} ms")
+        for hit in hits:
+            print(f"  {hit['similarity']:.3f}  {hit['name']}")
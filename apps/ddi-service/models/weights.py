@@ -0,0 +1,43 @@
+# models/weights.py
+# Content hashes of model weight files, used to tie derived artifacts
+# (precomputed tables, cached results) to the exact weights they came from.
+
+import hashlib
+import os
+import threading
+
+_hashes = {}  # path → ((mtime_ns, size), sha256)
+_lock = threading.Lock()
+
+
+def weights_hash(path: str) -> str:
+    """sha256 of the file at `path`, recomputed only when its mtime or size
+    changes. Returns "" if the file does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _hashes.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _lock:
+        _hashes[path] = (stamp, digest)
+    return digest
+
+
+def module_hash(module) -> str:
+    """sha256 over a torch module's state_dict, for models that are not
+    loaded from a single weight file."""
+    h = hashlib.sha256()
+    for name, tensor in module.state_dict().items():
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
@@ -0,0 +1,167 @@
+# models/worker_pool.py
+# Optional pool of model worker processes (DDI_MODEL_WORKERS > 0).
+#
+# The server process loads every model first, moves the torch weights into
+# shared memory and only then forks the workers. Weights, the memory-mapped
+# embedding store and pair table, and the NumPy weight arrays are therefore
+# shared pages, not per-worker copies. Endpoints stay in the front process
+# and hand model calls to the pool with run(). RDKit fingerprinting,
+# tokenization, forward passes and NER post-processing then run in
+# parallel, outside the front process's GIL.
+#
+# Each worker keeps its own embedding/fingerprint LRUs; the result cache
+# (models/result_cache.py) lives in the front process and is shared.
+# Forking is only safe at startup, before the server runs request threads
+# whose locks (encoder locks, caches, metric registries) a child could
+# inherit in a held state. Replacement workers after a hot reload are
+# therefore spawned instead: each starts a fresh interpreter and loads the
+# current weights itself. That is slower and the weights are no longer
+# shared between workers until the next server restart.
+#
+# Metrics recorded during a call in a worker are sent back with its result
+# and recorded in the front process, which serves /metrics. Likewise the
+# caller's trace context goes to the worker and the spans it finished come
+# back to be exported by the front process.
+
+import multiprocessing
+import os
+import threading
+from typing import Callable, List
+
+import metrics
+import tracing
+
+_pool = None
+_workers = 0
+
+# How long spawned replacement workers may take to load the models.
+RESTART_TIMEOUT = 300
+
+
+def share_weights() -> int:
+    """Moves the parameters of every loaded encoder and head into shared
+    memory. Returns the number of modules shared."""
+    from models.chemberta_encoder import loaded_encoders, registered_heads
+    modules = {id(m): m for m in [e.model for e in loaded_encoders().values()]
+               + [h.module for h in registered_heads().values()]}
+    for module in modules.values():
+        module.share_memory()
+    return len(modules)
+
+def preload_models():
+    """Loads the lazily loaded models so the workers inherit them instead of
+    each loading a private copy. Missing optional models are skipped."""
+    from models import ddi_student, pdi_inference
+    from models.DLTypeClassificationInference import _load_shallow_head
+    pdi_inference.is_available()
+    for load in (_load_shallow_head, ddi_student._load):
+        try:
+            load()
+        except ValueError:
+            pass
+    try:
+        from models.deidentifier import _load_model
+        _load_model()
+    except Exception:
+        pass
+
+
+def _init_worker(threads: int):
+    import torch
+    torch.set_num_threads(threads)
+
+def _init_spawned_worker(threads: int):
+    _init_worker(threads)
+    preload_models()
+
+def _ready() -> int:
+    return os.getpid()
+
+def _call_instrumented(fn: Callable, args, kwargs, trace_parent):
+    metrics.begin_capture()
+    tracing.begin_capture(trace_parent)
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        samples = metrics.end_capture()
+        spans = tracing.end_capture()
+    return result, samples, spans
+
+
+def start(workers: int):
+    """Loads and shares all models, then forks `workers` model processes.
+    Call at startup, before the server starts handling requests."""
+    global _pool, _workers
+    if _pool is not None:
+        return
+    preload_models()
+    _workers = workers
+    _pool = _fork_pool(workers)
+
+def _threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def _fork_pool(workers: int):
+    shared = share_weights()
+    # Forked workers must not reuse the parent's tokenizer thread pool.
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    threads = _threads_per_worker(workers)
+    pool = multiprocessing.get_context("fork").Pool(workers, initializer=_init_worker, initargs=(threads,))
+    print(f"✅ Model worker pool started: {workers} workers × {threads} threads, {shared} modules in shared memory.")
+    return pool
+
+def _spawn_pool(workers: int):
+    threads = _threads_per_worker(workers)
+    pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_spawned_worker, initargs=(threads,))
+    try:
+        pool.apply_async(_ready).get(RESTART_TIMEOUT)
+    except BaseException:
+        pool.terminate()
+        raise
+    print(f"✅ Model worker pool replaced: {workers} spawned workers × {threads} threads, weights loaded per worker.")
+    return pool
+
+def restart():
+    """Replaces the workers with spawned ones that load the models as they
+    are now on disk (after a hot reload). The old pool keeps serving until
+    the new one is ready; calls already queued on it finish there and its
+    workers exit afterwards. If the new workers fail to start, the old
+    pool is kept."""
+    global _pool
+    old = _pool
+    if old is None:
+        return
+    try:
+        new = _spawn_pool(_workers)
+    except Exception as e:
+        print(f"Warning: replacement model workers failed to start, keeping the old ones: {e}")
+        return
+    _pool = new
+    old.close()
+    threading.Thread(target=old.join, daemon=True).start()
+
+def stop():
+    global _pool, _workers
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+        _workers = 0
+_workers = 0
+
+# How long spawned replacement workers may take to load the models.
+RESTART_TIMEOUT = 300
+
+def run(fn: Callable, *args, **kwargs):
+    """fn(*args, **kwargs) in a worker process, or in this process when the
+    pool is not running. `fn` must be a module-level function; exceptions
+    are re-raised here."""
+    if _pool is None:
+        return fn(*args, **kwargs)
+    result, samples, spans = _pool.apply(_call_instrumented, (fn, args, kwargs, tracing.current_context()))
+    metrics.replay(samples)
+    tracing.replay(spans)
+    return result
+
+def worker_pids() -> List[int]:
+    return [p.pid for p in _pool._pool] if _pool is not None else []
@@ -0,0 +1,17 @@
+# profiling.py
+# Opt-in sampling profiler for production requests, off unless PROFILE_DIR is set.
+#
+# The profiler is shared with the ml-service in the observability package
+# (packages/observability); this module configures it for the ddi-service.
+# ProfilingMiddleware profiles a request sent with "X-Profile: 1" and a
+# valid X-Admin-Token, or one request in every PROFILE_SAMPLE_EVERY, and
+# keeps the samples of threads running its endpoint function. Work an async
+# endpoint hands to run_in_threadpool is not attributed to the request, and
+# neither is inference in pool workers; use a whole-process profile
+# (profile_process, POST /admin/profile) for those.
+
+from config2 import PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, ADMIN_TOKEN
+from observability import profiling as _profiling
+from observability.profiling import ProfilingMiddleware, enabled, list_profiles, profile_process, read_profile
+
+_profiling.configure(PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, ADMIN_TOKEN)
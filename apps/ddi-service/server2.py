@@ -1,5 +1,6 @@
 from fastapi import FastAPI
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List
 from fastapi.middleware.cors import CORSMiddleware
 try:
     from models.deidentifier import deidentify_text
@@ -8,12 +9,25 @@ except Exception as e:
     print(f"Could not load ML deidentifier: {e}")
     print("Falling back to regex-based deidentifier")
     from models.deidentifier_fallback import deidentify_text 
-from models.DLTypeClassificationInference import predict_ddi, label_map
-from models.hybrid_binary_ddi_inference import predict_hybrid_binary_ddi
-from fastapi import FastAPI, Query
+from models.DLTypeClassificationInference import predict_ddi, predict_ddi_batch, label_map
+from models.hybrid_binary_ddi_inference import predict_hybrid_binary_ddi, predict_hybrid_binary_ddi_batch, generate_fingerprint
+from models import pdi_inference
+from models.condition_resolver import resolve_conditions
+from models.ddi_cascade import predict_cascade
+from models.similarity_index import get_similarity_index
+from models.result_cache import cached_prediction, cache_stats
+from models import worker_pool, hot_reload
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from pymongo import MongoClient
-from config2 import MONGO_URI, COLLECTION_NAME, DB_NAME
+from config2 import MONGO_URI, COLLECTION_NAME, DB_NAME, CASCADE_THRESHOLD, SIMILARITY_INDEX_PATH, DDI_MODEL_WORKERS, ADMIN_TOKEN, RELOAD_MIN_AGREEMENT
+import hmac
+import re
 import os
+import metrics
+import tracing
+import profiling
 
 app = FastAPI()
 
@@ -25,8 +39,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
+if profiling.enabled():
+    app.add_middleware(profiling.ProfilingMiddleware)
 
-mongo_client = MongoClient(MONGO_URI)
+# Fork the model workers before any other threads (e.g. MongoDB monitors) start.
+if DDI_MODEL_WORKERS > 0:
+    worker_pool.start(DDI_MODEL_WORKERS)
+
+mongo_client = MongoClient(MONGO_URI, event_listeners=[metrics.mongo_listener(), tracing.mongo_listener()])
 drugdb = mongo_client[DB_NAME][COLLECTION_NAME]
 
 # ─── HEALTH CHECK ─────────────────────────────────────────────────────
@@ -54,27 +76,73 @@ class DeIDRequest(BaseModel):
 class ChembertaDDIRequest(BaseModel):
     smiles1: str
     smiles2: str
+    mode: str = "full"  # "shallow": earlier-layer features; "fast": fingerprint student
 
 # ─── Binary DDI Classifier Request (optional) ──
 class BinaryDDIRequest(BaseModel):
     smiles1: str
     smiles2: str
 
+# ─── Batched Pair Request ──────────────────────
+class DDIPair(BaseModel):
+    smiles1: str
+    smiles2: str
+
+class BatchDDIRequest(BaseModel):
+    pairs: List[DDIPair]
+    top_k: int = 3
+    mode: str = "full"
+
+class CascadeDDIRequest(BaseModel):
+    pairs: List[DDIPair]
+    top_k: int = 3
+    threshold: float = CASCADE_THRESHOLD
+    mode: str = "full"
+
+# ─── PDI (drug × condition) Request ────────────
+class PDIDrug(BaseModel):
+    name: str = ""
+    smiles: str
+
+class PDIGridRequest(BaseModel):
+    drugs: List[PDIDrug]
+    condition_ids: List[int] = []
+    conditions: List[str] = []  # free-text names, resolved to condition ids
+    threshold: float = 0.5
+
+class ConditionResolveRequest(BaseModel):
+    conditions: List[str]
+
+# ─── Structural Similarity Request ─────────────
+class SimilarDrugsRequest(BaseModel):
+    smiles: str = ""
+    name: str = ""                # catalog drug name, used if smiles is empty
+    k: int = Field(5, ge=1, le=100)
+    threshold: float = 0.0        # minimum Tanimoto similarity
+    interacting_with: str = ""    # only return interactions with this drug
+    max_interactions: int = 20
+
+# ─── Admin Reload Request ──────────────────────
+class ReloadRequest(BaseModel):
+    models: List[str] = list(hot_reload.RELOADABLE)
+    # reject new weights whose smoke-test top-1 agreement is lower
+    min_agreement: float = Field(RELOAD_MIN_AGREEMENT, ge=0.0, le=1.0)
+
 # ─── Warm-up Endpoint ────────────────────────────────────────────
 @app.get("/ping")
 async def ping():
-    _ = deidentify_text("Warmup input")
+    _ = await run_in_threadpool(worker_pool.run, deidentify_text, "Warmup input")
     # Dummy SMILES for warm-up
     smiles1 = "CC(=O)OC1=CC=CC=C1C(=O)O"  # Aspirin
     smiles2 = "CCN(CC)CCCC(C)NC1=NC=NC2=CN=CN=C12"  # Caffeine
-    _ = predict_ddi(smiles1, smiles2)
+    _ = await run_in_threadpool(worker_pool.run, predict_ddi, smiles1, smiles2)
 
     return {"message": "All models warmed up and ready"}
 
 # ─── Deidentifier Endpoint ───────────────────────────────────────
 @app.post("/deidentify")
 async def deidentify(request: DeIDRequest):
-    result = deidentify_text(request.text)
+    result = await run_in_threadpool(worker_pool.run, deidentify_text, request.text)
     return result
 
 # ─── Autocomplete Drug Names ──────────────────────────────────────
@@ -98,7 +166,10 @@ def predict_chemberta_ddi(request: ChembertaDDIRequest):
         return {"error": "Both SMILES strings are required."}
 
     try:
-        results = predict_ddi(request.smiles1, request.smiles2)
+        model_id = "ddi_type" if request.mode == "full" else f"ddi_type_{request.mode}"
+        results, version = cached_prediction(
+            model_id, request.smiles1, request.smiles2, 3,
+            lambda: worker_pool.run(predict_ddi, request.smiles1, request.smiles2, mode=request.mode, return_version=True))
         return {
             "results": [
                 {
@@ -107,7 +178,8 @@ def predict_chemberta_ddi(request: ChembertaDDIRequest):
                     "description": label_map.get(cls, f"Class {cls}")
                 }
                 for cls, conf in results
-            ]
+            ],
+            "model_version": version
         }
     except Exception as e:
         return {"error": f"Prediction failed: {str(e)}"}
@@ -115,15 +187,262 @@ def predict_chemberta_ddi(request: ChembertaDDIRequest):
 @app.post("/predict-hybrid-binary-ddi")
 def predict_hybrid_binary(request: ChembertaDDIRequest):  # reusing same pydantic model
     try:
-        label, prob = predict_hybrid_binary_ddi(request.smiles1, request.smiles2)
+        (label, prob), version = cached_prediction(
+            "hybrid_binary", request.smiles1, request.smiles2, 1,
+            lambda: worker_pool.run(predict_hybrid_binary_ddi, request.smiles1, request.smiles2, return_version=True))
         return {
             "label": int(label),
-            "probability": round(prob, 4)
+            "probability": round(prob, 4),
+            "model_version": version
         }
     except ValueError as e:
         return {"error": str(e)}
 
 
+# ─── Batched Pair Screening ──────────────────────────────────────
+@app.post("/predict-ddi-batch")
+def predict_ddi_batch_endpoint(request: BatchDDIRequest):
+    """Binary probability and top-k interaction classes for many pairs
+    in one call; used by the ml-service medication screening."""
+    pairs = [(p.smiles1, p.smiles2) for p in request.pairs]
+    if not pairs:
+        return {"results": []}
+
+    try:
+        binary, binary_version = worker_pool.run(predict_hybrid_binary_ddi_batch, pairs, return_version=True)
+        classes, type_version = worker_pool.run(predict_ddi_batch, pairs, top_k=request.top_k, mode=request.mode,
+                                                return_version=True)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}
+
+    return {
+        "results": [
+            {
+                "label": int(label),
+                "probability": round(prob, 4),
+                "classes": [
+                    {
+                        "class": cls,
+                        "confidence": f"{conf:.4f}",
+                        "description": label_map.get(cls, f"Class {cls}")
+                    }
+                    for cls, conf in top
+                ]
+            }
+            for (label, prob), top in zip(binary, classes)
+        ],
+        "model_version": {"hybrid_binary": binary_version, "ddi_type": type_version}
+    }
+
+
+# ─── Cascaded Binary → Type Prediction ───────────────────────────
+@app.post("/predict-ddi")
+def predict_ddi_cascade(request: CascadeDDIRequest):
+    """Hybrid binary screen for every pair; ChemBERTa type classes only for
+    pairs whose probability reaches `threshold`. Each result lists the
+    stages that ran."""
+    pairs = [(p.smiles1, p.smiles2) for p in request.pairs]
+    if not pairs:
+        return {"results": [], "summary": {"pairs": 0, "type_stage_pairs": 0}}
+
+    try:
+        results, summary = worker_pool.run(predict_cascade, pairs, request.threshold,
+                                           top_k=request.top_k, mode=request.mode)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}
+
+    return {
+        "results": [
+            {
+                "label": r["label"],
+                "probability": round(r["probability"], 4),
+                "stages": r["stages"],
+                "classes": [
+                    {
+                        "class": cls,
+                        "confidence": f"{conf:.4f}",
+                        "description": label_map.get(cls, f"Class {cls}")
+                    }
+                    for cls, conf in r["classes"]
+                ]
+            }
+            for r in results
+        ],
+        "summary": summary,
+        "model_version": summary.pop("model_version")
+    }
+
+
+# ─── PDI Contraindication Grid ───────────────────────────────────
+@app.post("/predict-pdi")
+def predict_pdi(request: PDIGridRequest):
+    """Scores every drug × condition pair for one patient in one call.
+    Each drug is encoded once; conditions are combined in a vectorized head."""
+    condition_ids = list(request.condition_ids)
+    condition_names = {cid: None for cid in condition_ids}
+    unresolved = []
+    for match in resolve_conditions(request.conditions) if request.conditions else []:
+        if match["condition_id"] is None:
+            unresolved.append(match["input"])
+        elif match["condition_id"] not in condition_names:
+            condition_ids.append(match["condition_id"])
+            condition_names[match["condition_id"]] = match["input"]
+
+    if not request.drugs or not condition_ids:
+        return {"results": [], "unresolved_conditions": unresolved}
+    if not pdi_inference.is_available():
+        return {"error": "PDI model not available"}
+
+    try:
+        probs = worker_pool.run(pdi_inference.predict_pdi_grid, [d.smiles for d in request.drugs], condition_ids)
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}
+
+    return {
+        "results": [
+            {
+                "drug": drug.name or drug.smiles,
+                "condition_id": cond_id,
+                "condition": condition_names[cond_id],
+                "probability": round(float(probs[i, j]), 4),
+                "label": int(probs[i, j] >= request.threshold)
+            }
+            for i, drug in enumerate(request.drugs)
+            for j, cond_id in enumerate(condition_ids)
+        ],
+        "unresolved_conditions": unresolved,
+        "model_version": pdi_inference.model_version()
+    }
+
+# ─── Condition Name Resolution ───────────────────────────────────
+@app.post("/resolve-conditions")
+def resolve_condition_names(request: ConditionResolveRequest):
+    """Maps free-text condition names to PDI condition ids locally."""
+    return {"results": resolve_conditions(request.conditions)}
+
+
+# ─── Structurally Similar Drugs ──────────────────────────────────
+@app.post("/similar-drugs")
+def similar_drugs(request: SimilarDrugsRequest):
+    """Nearest catalog drugs by Morgan-fingerprint Tanimoto similarity, with
+    their curated interactions. Useful when a drug has no curated data."""
+    index = get_similarity_index(drugdb, SIMILARITY_INDEX_PATH)
+    smiles = request.smiles
+    if not smiles and request.name:
+        smiles = index.smiles_for(request.name)
+        if not smiles:
+            drug = drugdb.find_one({"name": {"$regex": f"^{re.escape(request.name)}$", "$options": "i"}},
+                                   {"_id": 0, "smiles": 1})
+            smiles = (drug or {}).get("smiles")
+    if not smiles:
+        return {"error": "A SMILES string or a catalog drug name with a SMILES is required."}
+
+    try:
+        neighbours = index.search(smiles, k=request.k, threshold=request.threshold,
+                                  exclude_names=[request.name] if request.name else ())
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # One catalog query for the interactions of every neighbour.
+    docs = drugdb.find({"name": {"$in": [n["name"] for n in neighbours]}},
+                       {"_id": 0, "name": 1, "interactions.name": 1, "interactions.description": 1})
+    interactions = {d["name"]: d.get("interactions", []) for d in docs}
+    other = request.interacting_with.lower()
+    for n in neighbours:
+        found = [i for i in interactions.get(n["name"], []) if not other or i.get("name", "").lower() == other]
+        n["interactions"] = [{"name": i.get("name"), "description": i.get("description")}
+                             for i in found[:request.max_interactions]]
+
+    return {"query": {"name": request.name or None, "smiles": smiles}, "neighbours": neighbours}
+
+
+# ─── Prediction Result Cache ─────────────────────────────────────
+@app.get("/cache-stats")
+def result_cache_stats():
+    """Hit rate and size of the single-pair result cache and the weights
+    each cached model was loaded from."""
+    return cache_stats()
+
+
+# ─── Prometheus Metrics ──────────────────────────────────────────
+def _cache_metrics():
+    """Hit/miss counters of the result, embedding and fingerprint caches,
+    read at scrape time. In worker-pool mode the embedding and fingerprint
+    caches reported are the front process's."""
+    from models.chemberta_encoder import loaded_encoders
+    stats = cache_stats()
+    caches = {"result": (stats["hits"] + stats["coalesced"], stats["misses"])}
+    for key, encoder in loaded_encoders().items():
+        info = encoder.cache_info()
+        caches[f"embedding:{key}"] = (info["hits"], info["misses"])
+    fp = generate_fingerprint.cache_info()
+    caches["fingerprint"] = (fp.hits, fp.misses)
+
+    yield ("cache_requests_total", "counter", "Cache lookups by cache and result",
+           [({"cache": c, "result": r}, n) for c, (hits, misses) in caches.items()
+            for r, n in (("hit", hits), ("miss", misses))])
+    yield ("cache_hit_ratio", "gauge", "Fraction of cache lookups served from the cache",
+           [({"cache": c}, hits / (hits + misses) if hits + misses else 0.0) for c, (hits, misses) in caches.items()])
+
+metrics.register_collector(_cache_metrics)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# ─── Admin: Model Hot Reload ─────────────────────────────────────
+def _admin_allowed(token: str) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.post("/admin/reload")
+def admin_reload(request: ReloadRequest, x_admin_token: str = Header("")):
+    """Loads, smoke-tests and swaps in new weights for the given models in
+    the background; poll GET /admin/reload for the outcome."""
+    if not _admin_allowed(x_admin_token):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+    return hot_reload.start_reload(request.models, request.min_agreement)
+
+@app.get("/admin/reload")
+def admin_reload_status(x_admin_token: str = Header("")):
+    if not _admin_allowed(x_admin_token):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+    return hot_reload.status()
+
+
+# ─── Admin: Profiling ────────────────────────────────────────────
+@app.post("/admin/profile")
+def admin_profile(seconds: float = Query(10, gt=0, le=120), x_admin_token: str = Header("")):
+    """Samples every busy thread of the process for `seconds`, stores the
+    collapsed stacks in the profile ring and returns the file name."""
+    if not _admin_allowed(x_admin_token):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+    if not profiling.enabled():
+        raise HTTPException(404, "Profiling is disabled (PROFILE_DIR is not set)")
+    return profiling.profile_process(seconds)
+
+@app.get("/admin/profiles")
+def admin_profiles(x_admin_token: str = Header("")):
+    if not _admin_allowed(x_admin_token):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+    return {"profiles": profiling.list_profiles()}
+
+@app.get("/admin/profiles/{name}")
+def admin_profile_file(name: str, x_admin_token: str = Header("")):
+    if not _admin_allowed(x_admin_token):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+    collapsed = profiling.read_profile(name)
+    if collapsed is None:
+        raise HTTPException(404, f"No profile named {name}")
+    return PlainTextResponse(collapsed)
+
+
 @app.get("/")
 def index():
     return {"message": "DrugNexusAI API is running."}
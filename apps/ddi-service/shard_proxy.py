@@ -0,0 +1,215 @@
+# shard_proxy.py
+# Cache-affine router in front of several ddi-service replicas.
+#
+# Requests are consistent-hashed to replicas by their molecules, so every
+# replica's embedding and result caches warm on its own share of the
+# catalog instead of all replicas warming on the same molecules:
+#   smiles1/smiles2 requests   → the canonical (smiles1, smiles2) pair
+#   pairs / drugs requests     → the sorted set of canonical SMILES (a regimen)
+#   smiles requests            → the canonical SMILES
+#   anything else              → path, query and body
+# Each replica owns SHARD_VNODES points on the ring, so a replica joining or
+# leaving only remaps the keys next to its own points (~1/N of the keyspace).
+# If a replica is unreachable the request fails over to the next one on the ring.
+#
+#   DDI_REPLICAS=http://localhost:9001,http://localhost:9002 uvicorn shard_proxy:app --port 9000
+#
+# GET /shards reports per-replica traffic and result-cache hit rates;
+# POST /shards/join?url=... and /shards/leave?url=... change membership and
+# need the X-Admin-Token header, like the replicas' /admin endpoints.
+
+import bisect
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+from typing import Dict, List
+
+import requests
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from requests.adapters import HTTPAdapter
+
+from config2 import DDI_REPLICAS, SHARD_STRATEGY, SHARD_VNODES, ADMIN_TOKEN
+from models.result_cache import canonical_smiles
+
+FORWARD_TIMEOUT = 60
+STATS_TIMEOUT = 5
+# Request headers passed on to the replica: trace context, and the admin
+# token and X-Profile flag for the replicas' /admin endpoints and profiler
+FORWARD_HEADERS = ("content-type", "traceparent", "x-admin-token", "x-profile")
+# Response headers passed back to the client
+RETURN_HEADERS = ("x-profile-id",)
+
+
+class HashRing:
+    """Consistent-hash ring. Membership changes replace the point arrays as
+    a whole, so lookups need no lock."""
+
+    def __init__(self, nodes=(), vnodes: int = SHARD_VNODES):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners))
+
+    def _rebuild(self, nodes):
+        ring = sorted((self._hash(f"{node}#{i}"), node) for node in nodes for i in range(self.vnodes))
+        self._points, self._owners = [p for p, _ in ring], [n for _, n in ring]
+
+    def add(self, node: str):
+        with self._lock:
+            if node not in self._owners:
+                self._rebuild(set(self._owners) | {node})
+
+    def remove(self, node: str):
+        with self._lock:
+            self._rebuild(set(self._owners) - {node})
+
+    def nodes_for(self, key: str, n: int = 1) -> List[str]:
+        """The owner of `key` followed by the next distinct nodes clockwise."""
+        points, owners = self._points, self._owners
+        if not points:
+            return []
+        start = bisect.bisect(points, self._hash(key))
+        found = []
+        for i in range(len(points)):
+            node = owners[(start + i) % len(points)]
+            if node not in found:
+                found.append(node)
+                if len(found) == n:
+                    break
+        return found
+
+    def shares(self) -> Dict[str, float]:
+        """Fraction of the hash space each node owns."""
+        points, owners = self._points, self._owners
+        shares = dict.fromkeys(owners, 0.0)
+        for i, node in enumerate(owners):
+            gap = points[i] - points[i - 1] if i else points[0] + (1 << 64) - points[-1]
+            shares[node] += gap / (1 << 64)
+        return shares
+
+
+def routing_key(path: str, query: str, body: bytes) -> str:
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        try:
+            if payload.get("smiles1") and payload.get("smiles2"):
+                return canonical_smiles(payload["smiles1"]) + ">" + canonical_smiles(payload["smiles2"])
+            if payload.get("pairs"):
+                smiles = {s for p in payload["pairs"] for s in (p["smiles1"], p["smiles2"])}
+                return "|".join(sorted(canonical_smiles(s) for s in smiles))
+            if payload.get("drugs"):
+                return "|".join(sorted({canonical_smiles(d["smiles"]) for d in payload["drugs"]}))
+            if payload.get("smiles"):
+                return canonical_smiles(payload["smiles"])
+        except (KeyError, TypeError):
+            pass
+    return f"{path}?{query}#{hashlib.blake2b(body, digest_size=8).hexdigest()}"
+
+
+# ─── Router State ───────────────────────────────
+ring = HashRing(DDI_REPLICAS)
+_round_robin = itertools.count()
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+
+def _count(replica: str, field: str):
+    with _stats_lock:
+        counters = _stats.setdefault(replica, {"requests": 0, "errors": 0, "failovers": 0})
+        counters[field] += 1
+
+def _targets(path: str, query: str, body: bytes) -> List[str]:
+    nodes = ring.nodes
+    if SHARD_STRATEGY == "round_robin":
+        start = next(_round_robin)
+        return [nodes[(start + i) % len(nodes)] for i in range(len(nodes))]
+    return ring.nodes_for(routing_key(path, query, body), n=len(nodes))
+
+def _forward(method: str, path: str, query: str, body: bytes, headers: dict):
+    targets = _targets(path, query, body)
+    if not targets:
+        return Response(json.dumps({"error": "No ddi-service replicas available"}), 503,
+                        media_type="application/json")
+    for attempt, replica in enumerate(targets):
+        try:
+            res = session.request(method, f"{replica}/{path}", params=query or None, data=body,
+                                  headers=headers, timeout=FORWARD_TIMEOUT)
+        except requests.ConnectionError:
+            _count(replica, "errors")
+            continue
+        _count(replica, "requests")
+        if attempt:
+            _count(replica, "failovers")
+        return Response(res.content, res.status_code, media_type=res.headers.get("content-type"),
+                        headers={h: res.headers[h] for h in RETURN_HEADERS if h in res.headers})
+    return Response(json.dumps({"error": "All ddi-service replicas are unreachable"}), 502,
+                    media_type="application/json")
+
+
+app = FastAPI()
+
+# ─── Shard Admin ────────────────────────────────
+@app.get("/shards")
+def shard_stats():
+    """Per-replica keyspace share, forwarded requests and result-cache hit
+    rate, plus the hit rate over all replicas."""
+    shares = ring.shares()
+    combined = {"hits": 0, "misses": 0, "coalesced": 0}
+    replicas = []
+    for replica in ring.nodes:
+        with _stats_lock:
+            entry = {"url": replica, "keyspace": round(shares.get(replica, 0.0), 4),
+                     **_stats.get(replica, {"requests": 0, "errors": 0, "failovers": 0})}
+        try:
+            cache = session.get(f"{replica}/cache-stats", timeout=STATS_TIMEOUT).json()
+            entry["cache"] = {k: cache[k] for k in ("entries", "hits", "misses", "coalesced", "hit_rate")}
+            for k in combined:
+                combined[k] += cache[k]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            entry["cache"] = {"error": str(e)}
+        replicas.append(entry)
+    lookups = sum(combined.values())
+    combined["hit_rate"] = (combined["hits"] + combined["coalesced"]) / lookups if lookups else 0.0
+    return {"strategy": SHARD_STRATEGY, "replicas": replicas, "combined": combined}
+
+def _require_admin(token: str):
+    if not (ADMIN_TOKEN and hmac.compare_digest(token, ADMIN_TOKEN)):
+        raise HTTPException(403, "Admin API is disabled or the admin token is wrong")
+
+@app.post("/shards/join")
+def join_shard(url: str, x_admin_token: str = Header("")):
+    _require_admin(x_admin_token)
+    ring.add(url.rstrip("/"))
+    return {"replicas": ring.nodes}
+
+@app.post("/shards/leave")
+def leave_shard(url: str, x_admin_token: str = Header("")):
+    _require_admin(x_admin_token)
+    ring.remove(url.rstrip("/"))
+    return {"replicas": ring.nodes}
+
+# ─── Forwarding ─────────────────────────────────
+@app.api_route("/{path:path}", methods=["GET", "POST"])
+async def proxy(path: str, request: Request):
+    body = await request.body()
+    headers = {h: request.headers[h] for h in FORWARD_HEADERS if h in request.headers}
+    headers.setdefault("content-type", "application/json")
+    return await run_in_threadpool(_forward, request.method, path, request.url.query, body, headers)
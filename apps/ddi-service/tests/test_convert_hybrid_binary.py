@@ -0,0 +1,93 @@
+# tests/test_convert_hybrid_binary.py
+# Parity of the NumPy hybrid binary model with the Keras model it is
+# converted from. Needs TensorFlow, so it is skipped where only the NumPy
+# serving path is installed; tests/test_hybrid_binary_model.py checks the
+# folding itself without it.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("rdkit")
+
+from config2 import PDI_CONDITIONS_CSV
+from models.fingerprints import generate_fingerprint
+from models.hybrid_binary_model import NumpyHybridModel, build_hybrid_ddi_model
+from training.convert_hybrid_binary import PARITY_TOLERANCE, convert, parity_check
+
+N_DRUGS = 48
+
+
+def _randomize_batchnorm(record, rng):
+    """Non-trivial BN statistics, so folding them into the next Dense layer
+    is actually exercised (fresh layers are the identity)."""
+    for tower in (record["tower1"], record["tower2"]):
+        for layer in (tower[1], tower[3]):
+            units = layer.get_weights()[0].shape[0]
+            layer.set_weights([rng.uniform(0.5, 1.5, units), rng.normal(0, 0.2, units),
+                               rng.uniform(0, 0.5, units), rng.uniform(0.2, 2.0, units)])
+
+
+@pytest.fixture(scope="module")
+def converted(tmp_path_factory):
+    """A Keras model with random weights, saved as .h5 and converted to .npz."""
+    tmp = tmp_path_factory.mktemp("hybrid")
+    rng = np.random.default_rng(0)
+    record = {}
+    model = build_hybrid_ddi_model(record=record)
+    _randomize_batchnorm(record, rng)
+    h5_path, npz_path = str(tmp / "hybrid.weights.h5"), str(tmp / "hybrid.npz")
+    model.save_weights(h5_path)
+    keras_model, numpy_model = convert(h5_path, npz_path)
+    return keras_model, numpy_model, npz_path
+
+
+@pytest.fixture(scope="module")
+def fingerprints():
+    """Fingerprints of real drugs from the serving generate_fingerprint."""
+    import pandas as pd
+    smiles = pd.read_csv(PDI_CONDITIONS_CSV, usecols=["smiles"]).dropna()["smiles"].drop_duplicates()
+    fps = []
+    for smi in smiles:
+        try:
+            fps.append(generate_fingerprint(smi))
+        except ValueError:
+            continue
+        if len(fps) == N_DRUGS:
+            break
+    return np.stack(fps)
+
+
+def _pairs(fps):
+    i, j = np.triu_indices(len(fps), k=1)
+    return fps[i], fps[j]
+
+
+def test_numpy_matches_keras_on_real_fingerprints(converted, fingerprints):
+    keras_model, numpy_model, _ = converted
+    x1, x2 = _pairs(fingerprints)
+    ref = keras_model.predict([x1, x2], verbose=0, batch_size=len(x1))[:, 0]
+    out = numpy_model.predict(x1, x2)
+
+    assert ref.std() > 1e-3  # not saturated, so the comparison means something
+    np.testing.assert_allclose(out, ref, atol=PARITY_TOLERANCE)
+    assert parity_check(keras_model, numpy_model, 0, inputs=(x1, x2)) <= PARITY_TOLERANCE
+
+
+def test_concat_keeps_tower_order(converted, fingerprints):
+    """Each input goes through its own tower and the BN folded across the
+    concat keeps the halves in order, so swapping the drugs changes the
+    output exactly as in Keras."""
+    keras_model, numpy_model, _ = converted
+    x1, x2 = _pairs(fingerprints)
+    ref = keras_model.predict([x2, x1], verbose=0, batch_size=len(x1))[:, 0]
+    out = numpy_model.predict(x2, x1)
+
+    np.testing.assert_allclose(out, ref, atol=PARITY_TOLERANCE)
+    assert np.abs(out - numpy_model.predict(x1, x2)).max() > 1e-3
+
+
+def test_npz_roundtrip(converted, fingerprints):
+    _, numpy_model, npz_path = converted
+    x1, x2 = _pairs(fingerprints[:8])
+    np.testing.assert_array_equal(NumpyHybridModel.load(npz_path).predict(x1, x2), numpy_model.predict(x1, x2))
@@ -0,0 +1,79 @@
+# tests/test_hybrid_binary_model.py
+# BatchNorm folding of the hybrid binary model against an unfolded NumPy
+# reference of the Keras network. Runs without TensorFlow: the layers
+# recorded by build_hybrid_ddi_model() are replaced by stand-ins that only
+# provide get_weights() and epsilon.
+
+import numpy as np
+
+from models.hybrid_binary_model import (
+    FP_DIM, NumpyHybridModel, bn_affine, fold_into_next, fold_keras_layers
+)
+
+EPS = 1e-3  # Keras BatchNormalization default
+
+
+class _Layer:
+    def __init__(self, *weights, epsilon=None):
+        self._weights = list(weights)
+        self.epsilon = epsilon
+
+    def get_weights(self):
+        return self._weights
+
+
+def _dense(rng, n_in, n_out):
+    return _Layer(rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)), rng.normal(0, 0.1, n_out))
+
+def _bn(rng, units):
+    return _Layer(rng.uniform(0.5, 1.5, units), rng.normal(0, 0.2, units),
+                  rng.uniform(0, 0.5, units), rng.uniform(0.2, 2.0, units), epsilon=EPS)
+
+
+def _record(seed=0):
+    rng = np.random.default_rng(seed)
+    tower = lambda: [_dense(rng, FP_DIM, 256), _bn(rng, 256), _dense(rng, 256, 128), _bn(rng, 128)]
+    return dict(tower1=tower(), tower2=tower(), head=_dense(rng, 256, 64), out=_dense(rng, 64, 1))
+
+
+def _reference(record, x1, x2):
+    """The Keras forward pass at inference time, BN applied explicitly."""
+    relu = lambda v: np.maximum(v, 0)
+    dense = lambda layer, h: h @ layer.get_weights()[0] + layer.get_weights()[1]
+
+    def bn(layer, h):
+        gamma, beta, mean, var = layer.get_weights()
+        return gamma * (h - mean) / np.sqrt(var + layer.epsilon) + beta
+
+    def tower(layers, x):
+        dense1, bn1, dense2, bn2 = layers
+        return bn(bn2, relu(dense(dense2, bn(bn1, relu(dense(dense1, x))))))
+
+    z = np.concatenate([tower(record["tower1"], x1), tower(record["tower2"], x2)], axis=1)
+    logit = dense(record["out"], relu(dense(record["head"], z)))[:, 0]
+    return 1 / (1 + np.exp(-logit))
+
+
+def test_bn_affine_and_fold_by_hand():
+    a, c = bn_affine(np.array([2.0]), np.array([1.0]), np.array([3.0]), np.array([3.0]), 1.0)
+    np.testing.assert_allclose((a, c), ([1.0], [-2.0]))  # 2 * (h - 3) / 2 + 1 = h - 2
+
+    w, b = fold_into_next(np.array([2.0, 0.5]), np.array([1.0, -1.0]),
+                          np.array([[1.0, 2.0], [3.0, 4.0]]), np.array([0.5, 0.0]))
+    np.testing.assert_allclose(w, [[2.0, 4.0], [1.5, 2.0]])
+    np.testing.assert_allclose(b, [0.5 + 1 - 3, 2 - 4])
+
+
+def test_folded_model_matches_unfolded_reference():
+    record = _record()
+    rng = np.random.default_rng(1)
+    x1, x2 = (rng.integers(0, 2, (32, FP_DIM)).astype(np.float32) for _ in range(2))
+
+    ref = _reference(record, x1, x2)
+    out = NumpyHybridModel(fold_keras_layers(record)).predict(x1, x2)
+
+    assert ref.std() > 1e-3
+    np.testing.assert_allclose(out, ref, atol=1e-5)
+    # the towers are not interchangeable, so input order must be preserved
+    np.testing.assert_allclose(NumpyHybridModel(fold_keras_layers(record)).predict(x2, x1),
+                               _reference(record, x2, x1), atol=1e-5)
@@ -0,0 +1,62 @@
+# tests/test_shard_proxy.py
+# Unit tests for the consistent-hash ring behind shard_proxy.py.
+
+import pytest
+
+pytest.importorskip("rdkit")
+
+from shard_proxy import HashRing
+
+KEYS = [f"key{i}" for i in range(20000)]
+
+
+def _owners(ring: HashRing):
+    return [ring.nodes_for(k)[0] for k in KEYS]
+
+
+def test_join_remaps_only_keys_taken_by_the_new_node():
+    ring = HashRing([f"replica{i}" for i in range(4)])
+    before = _owners(ring)
+    ring.add("replica4")
+    after = _owners(ring)
+
+    moved = [(b, a) for b, a in zip(before, after) if b != a]
+    assert all(a == "replica4" for _, a in moved)
+    # ~1/5 of the keyspace; 128 vnodes keep the share within a few points
+    assert 0.12 < len(moved) / len(KEYS) < 0.28
+    assert len(moved) / len(KEYS) == pytest.approx(ring.shares()["replica4"], abs=0.02)
+
+
+def test_leave_remaps_only_keys_of_the_leaving_node():
+    ring = HashRing([f"replica{i}" for i in range(5)])
+    before = _owners(ring)
+    share = ring.shares()["replica2"]
+    ring.remove("replica2")
+    after = _owners(ring)
+
+    moved = [(b, a) for b, a in zip(before, after) if b != a]
+    assert all(b == "replica2" for b, _ in moved)
+    assert sum(b == "replica2" for b in before) == len(moved)
+    assert len(moved) / len(KEYS) == pytest.approx(share, abs=0.02)
+
+
+def test_failover_order_is_the_next_owner_after_removal():
+    nodes = [f"replica{i}" for i in range(4)]
+    ring = HashRing(nodes)
+    for key in KEYS[:500]:
+        order = ring.nodes_for(key, n=len(nodes))
+        assert sorted(order) == nodes
+        assert order[:2] == ring.nodes_for(key, n=2)
+
+        # without its owner, a key goes to the node that was its first failover
+        smaller = HashRing([n for n in nodes if n != order[0]])
+        assert smaller.nodes_for(key, n=len(nodes) - 1) == order[1:]
+
+
+def test_membership_is_idempotent_and_shares_cover_the_ring():
+    ring = HashRing(["a", "b"])
+    ring.add("a")
+    ring.remove("c")
+    assert ring.nodes == ["a", "b"]
+    assert sum(ring.shares().values()) == pytest.approx(1.0)
+    assert HashRing().nodes_for("key") == []
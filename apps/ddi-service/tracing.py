@@ -0,0 +1,26 @@
+# tracing.py
+# Request tracing for the ddi-service with W3C trace context (traceparent).
+#
+# The implementation is shared with the ml-service in the observability
+# package (packages/observability); this module configures it for the
+# ddi-service. TracingMiddleware continues the trace of an incoming
+# traceparent header (the ml-service sends one with every /predict-ddi and
+# /predict-pdi call) or starts a new one. Model forward passes are recorded
+# by metrics.observe_inference() through record() and Mongo commands by
+# mongo_listener(). In worker-pool mode the pool passes the current context
+# to the worker and replays the spans it finished.
+#
+# Spans go to TRACE_EXPORT (a file or an OTLP/HTTP URL); with it unset no
+# spans are created. Break a trace file down per request with
+#   python -m observability.tracing /tmp/traces.jsonl --slowest 5
+
+from config2 import TRACE_EXPORT, TRACE_SAMPLE_RATE
+from observability import tracing as _tracing
+from observability.tracing import (
+    SpanContext, TracingMiddleware, begin_capture, current_context, enabled, end_capture, format_traceparent,
+    inject, mongo_listener, parse_traceparent, record, replay, span,
+)
+
+SERVICE_NAME = "ddi-service"
+
+_tracing.configure(SERVICE_NAME, TRACE_EXPORT, TRACE_SAMPLE_RATE)
@@ -0,0 +1,214 @@
+# training/build_binary_dataset.py
+# Builds the hybrid binary DDI training set (positives + dissimilar random
+# negatives) without the quadratic cost of prepare_dataset() in
+# docs/ml-models/DL_Based_Binary_Classification_DDI_Model/customdlbinaryclassificationddi.py:
+#
+#   • positives are a hashed set of unordered pair keys (no list scans)
+#   • RDKit fingerprints are computed once per unique SMILES
+#   • candidate negatives are drawn in batches and filtered with packed-bit
+#     popcount Tanimoto similarity, fully vectorized
+#   • Morgan+MACCS features are built in a process pool
+#   • output is written as memory-mapped .npy shards
+#
+# Usage (from apps/ddi-service):
+#   python -m training.build_binary_dataset --data drugbank_ddi_dataset.xlsx --out model_Files/binary_dataset
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from rdkit import Chem, RDLogger
+from rdkit.Chem import AllChem, MACCSkeys
+from rdkit.DataStructs import ConvertToNumpyArray
+
+from models.packed_fingerprints import pack_bits, popcount, tanimoto_pairs
+
+RDLogger.DisableLog('rdApp.*')
+
+MORGAN_BITS = 1024
+MACCS_BITS = 167
+FP_DIM = MORGAN_BITS + MACCS_BITS
+RDK_BITS = 2048  # Chem.RDKFingerprint default size
+
+
+def load_data(path: str) -> pd.DataFrame:
+    cols = ['Drug1', 'Drug2', 'Y']
+    if path.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(path, usecols=cols, dtype=str)
+    else:
+        df = pd.read_csv(path, usecols=cols, dtype=str)
+    df = df.dropna().reset_index(drop=True)
+    df['Y'] = df['Y'].astype(int)
+    return df
+
+
+# ─── Per-SMILES Fingerprints (process pool) ─────
+def _features_chunk(smiles_chunk):
+    """Morgan+MACCS bits (uint8) and RDKit path fingerprint for each SMILES."""
+    feats = np.zeros((len(smiles_chunk), FP_DIM), dtype=np.uint8)
+    rdk_bits = np.zeros((len(smiles_chunk), RDK_BITS), dtype=np.uint8)
+    valid = np.zeros(len(smiles_chunk), dtype=bool)
+    for i, smi in enumerate(smiles_chunk):
+        mol = Chem.MolFromSmiles(smi)
+        if mol is None:
+            continue
+        valid[i] = True
+        ConvertToNumpyArray(AllChem.GetMorganFingerprintAsBitVect(mol, radius=2, nBits=MORGAN_BITS), feats[i, :MORGAN_BITS])
+        ConvertToNumpyArray(MACCSkeys.GenMACCSKeys(mol), feats[i, MORGAN_BITS:])
+        ConvertToNumpyArray(Chem.RDKFingerprint(mol), rdk_bits[i])
+    return feats, rdk_bits, valid
+
+def compute_fingerprints(smiles, workers=None, chunk_size=512):
+    chunks = [smiles[i:i + chunk_size] for i in range(0, len(smiles), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_features_chunk, chunks))
+    feats = np.concatenate([r[0] for r in results])
+    rdk_bits = np.concatenate([r[1] for r in results])
+    valid = np.concatenate([r[2] for r in results])
+    return feats, rdk_bits, valid
+
+
+# ─── Sampling ───────────────────────────────────
+def _pair_keys(i: np.ndarray, j: np.ndarray, n: int) -> np.ndarray:
+    """Order-independent int64 key for each pair of row ids."""
+    lo, hi = np.minimum(i, j), np.maximum(i, j)
+    return lo.astype(np.int64) * n + hi
+
+def sample_negatives(n_unique, positive_keys, rdk_packed, count, sim_threshold=0.3,
+                     batch_size=200_000, rng=None, max_rounds=100, patience=3):
+    """Up to `count` unique random pairs that are not positives and have
+    RDKit Tanimoto similarity below `sim_threshold`. Stops early, with a
+    warning, after `max_rounds` batches or `patience` batches in a row that
+    add nothing (the dissimilar pool is exhausted), so fewer pairs may be
+    returned."""
+    rng = rng or np.random.default_rng(42)
+    rdk_counts = popcount(rdk_packed)
+    positive_keys = np.unique(positive_keys)
+    taken = np.empty(0, dtype=np.int64)
+    out_i, out_j = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    have = 0
+
+    pool = n_unique * (n_unique - 1) // 2 - len(positive_keys)
+    if count > pool:
+        print(f"Warning: {count} negatives requested but only {pool} non-positive pairs exist")
+        count = pool
+
+    rounds = idle = 0
+    while have < count and rounds < max_rounds and idle < patience:
+        rounds += 1
+        i = rng.integers(0, n_unique, size=batch_size)
+        j = rng.integers(0, n_unique, size=batch_size)
+        keep = i != j
+        i, j = i[keep], j[keep]
+        keys = _pair_keys(i, j, n_unique)
+
+        # Drop positives, already-taken negatives and duplicates within the batch.
+        keep = ~np.isin(keys, positive_keys) & ~np.isin(keys, taken)
+        i, j, keys = i[keep], j[keep], keys[keep]
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        i, j, keys = i[first], j[first], keys[first]
+
+        sim = tanimoto_pairs(rdk_packed, i, j, rdk_counts)
+        keep = sim < sim_threshold
+        i, j, keys = i[keep][:count - have], j[keep][:count - have], keys[keep][:count - have]
+
+        out_i.append(i)
+        out_j.append(j)
+        taken = np.union1d(taken, keys)
+        have += len(i)
+        idle = 0 if len(i) else idle + 1
+
+    if have < count:
+        print(f"Warning: only {have} of {count} negatives with similarity < {sim_threshold} "
+              f"found after {rounds} rounds; returning those")
+    return np.concatenate(out_i), np.concatenate(out_j)
+
+
+# ─── Shards ─────────────────────────────────────
+def write_shards(out_dir, feats, left, right, labels, shard_size):
+    os.makedirs(out_dir, exist_ok=True)
+    shards = []
+    for n, start in enumerate(range(0, len(labels), shard_size)):
+        stop = min(start + shard_size, len(labels))
+        names = {k: f"{k}_{n:03d}.npy" for k in ("X1", "X2", "y")}
+        for key, rows in (("X1", left), ("X2", right)):
+            mm = np.lib.format.open_memmap(os.path.join(out_dir, names[key]), mode="w+",
+                                           dtype=np.uint8, shape=(stop - start, FP_DIM))
+            mm[:] = feats[rows[start:stop]]
+            mm.flush()
+        np.save(os.path.join(out_dir, names["y"]), labels[start:stop].astype(np.int8))
+        shards.append({**names, "rows": stop - start})
+    return shards
+
+def load_shards(out_dir):
+    """Memory-mapped (X1, X2, y) per shard, as written by this script.
+    X1/X2 are uint8 bits; cast to float32 per batch for training."""
+    with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        yield tuple(np.load(os.path.join(out_dir, shard[k]), mmap_mode="r") for k in ("X1", "X2", "y"))
+
+
+def build(df, out_dir, sim_threshold=0.3, total_limit=190000, positive_label=1,
+          shard_size=50_000, workers=None, seed=42):
+    rng = np.random.default_rng(seed)
+    t0 = time.perf_counter()
+
+    unique = list(dict.fromkeys(pd.concat([df['Drug1'], df['Drug2']]).tolist()))
+    feats, rdk_bits, valid = compute_fingerprints(unique, workers=workers)
+    unique = [s for s, ok in zip(unique, valid) if ok]
+    feats, rdk_bits = feats[valid], rdk_bits[valid]
+    row = {s: i for i, s in enumerate(unique)}
+    rdk_packed = pack_bits(rdk_bits)
+    print(f"{len(unique)} valid unique SMILES fingerprinted in {time.perf_counter() - t0:.1f}s")
+
+    pos = df[(df['Y'] == positive_label) & df['Drug1'].isin(row) & df['Drug2'].isin(row)]
+    pos_i = pos['Drug1'].map(row).to_numpy()
+    pos_j = pos['Drug2'].map(row).to_numpy()
+    pos_limit = min(total_limit // 2, len(pos_i))
+    if len(pos_i) > pos_limit:
+        pick = rng.choice(len(pos_i), size=pos_limit, replace=False)
+        pos_i, pos_j = pos_i[pick], pos_j[pick]
+
+    # All positives are excluded from negatives, not just the sampled ones.
+    all_keys = _pair_keys(pos['Drug1'].map(row).to_numpy(), pos['Drug2'].map(row).to_numpy(), len(unique))
+    t1 = time.perf_counter()
+    neg_i, neg_j = sample_negatives(len(unique), all_keys, rdk_packed, pos_limit, sim_threshold, rng=rng)
+    print(f"{len(neg_i)} negatives sampled in {time.perf_counter() - t1:.1f}s")
+
+    left = np.concatenate((pos_i, neg_i))
+    right = np.concatenate((pos_j, neg_j))
+    labels = np.concatenate((np.ones(pos_limit), np.zeros(len(neg_i))))
+    order = rng.permutation(len(labels))
+    shards = write_shards(out_dir, feats, left[order], right[order], labels[order], shard_size)
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"fp_dim": FP_DIM, "sim_threshold": sim_threshold, "positives": int(pos_limit),
+                   "negatives": int(len(neg_i)), "shards": shards}, f, indent=2)
+    print(f"✅ {len(labels)} rows in {len(shards)} shard(s) written to {out_dir} "
+          f"({time.perf_counter() - t0:.1f}s total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hybrid binary DDI training set")
+    parser.add_argument("--data", required=True, help="xlsx/csv with Drug1, Drug2, Y columns")
+    parser.add_argument("--out", default="models/model_Files/binary_dataset")
+    parser.add_argument("--sim-threshold", type=float, default=0.3)
+    parser.add_argument("--total-limit", type=int, default=190000)
+    parser.add_argument("--positive-label", type=int, default=1)
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    build(load_data(args.data), args.out, args.sim_threshold, args.total_limit,
+          args.positive_label, args.shard_size, args.workers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# training/build_embeddings.py
+# Builds a deduplicated ChemBERTa embedding store for DDI type-classifier
+# training, replacing the per-row smiles_to_embedding loop in
+# docs/ml-models/DL_Based_Type_Classification_DDI_Model/dl_ddiclassification.py.
+#
+# Every unique SMILES is encoded once, in length-sorted batches; pair
+# features are later gathered from the embedding matrix by row index.
+#
+# Usage (from apps/ddi-service):
+#   python -m training.build_embeddings --csv drugbank_ddi_dataset.csv --out model_Files/embedding_store
+#   python -m training.build_embeddings --csv drugbank_ddi_dataset.csv --compare 500
+#   python -m training.build_embeddings --csv drugbank_ddi_dataset.csv --layer 3 --out model_Files/embedding_store_l3
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from config2 import CHEMBERTA_MODEL
+from models.chemberta_encoder import truncate_layers
+from models.embedding_store import EmbeddingStore
+
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def load_pairs(csv_path: str, limit: int = None) -> pd.DataFrame:
+    df = pd.read_csv(csv_path, usecols=["Drug1", "Drug2", "Y"]).dropna()
+    df["Y"] = df["Y"].astype(int)
+    if limit:
+        df = df.sample(n=min(limit, len(df)), random_state=42)
+    return df.reset_index(drop=True)
+
+
+# ─── Encoding ───────────────────────────────────
+def encode_unique(smiles, tokenizer, chemberta, batch_size=64, max_length=512):
+    """Masked mean-pooled embeddings for `smiles`, encoded in length-sorted
+    batches so each batch pads to similar lengths. Returns rows in input order."""
+    lengths = [len(ids) for ids in tokenizer(list(smiles), truncation=True, max_length=max_length)["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+    out = np.zeros((len(smiles), chemberta.config.hidden_size), dtype=np.float32)
+
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        inputs = tokenizer([smiles[i] for i in idx], return_tensors="pt", padding=True,
+                           truncation=True, max_length=max_length)
+        inputs = {k: v.to(DEVICE) for k, v in inputs.items()}
+        with torch.no_grad():
+            hidden = chemberta(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            out[idx] = ((hidden * mask).sum(dim=1) / mask.sum(dim=1)).cpu().numpy()
+    return out
+
+
+def build_store(df, out_dir, tokenizer, chemberta, batch_size=64, layer=-1):
+    unique = list(dict.fromkeys(pd.concat([df["Drug1"], df["Drug2"]]).tolist()))
+    print(f"{len(df)} pairs → {len(unique)} unique SMILES")
+
+    matrix = EmbeddingStore.create(out_dir, unique, chemberta.config.hidden_size, CHEMBERTA_MODEL, layer=layer)
+    t0 = time.perf_counter()
+    matrix[:] = encode_unique(unique, tokenizer, chemberta, batch_size=batch_size)
+    matrix.flush()
+    print(f"Encoded {len(unique)} SMILES in {time.perf_counter() - t0:.1f}s")
+
+    store = EmbeddingStore.open(out_dir)
+    pairs = np.stack([store.rows(df["Drug1"]), store.rows(df["Drug2"])], axis=1)
+    store.save_pairs(pairs, df["Y"].to_numpy() - 1)  # shift to 0-based classes
+    print(f"✅ Store written to {out_dir}")
+    return store
+
+
+# ─── Timing Comparison ──────────────────────────
+def compare(df, tokenizer, chemberta, batch_size=64):
+    """Times the notebook's per-row loop against dedup + batched encoding."""
+    def smiles_to_embedding(smiles):
+        inputs = tokenizer(smiles, return_tensors="pt", padding=True, truncation=True)
+        inputs = {k: v.to(DEVICE) for k, v in inputs.items()}
+        with torch.no_grad():
+            return chemberta(**inputs).last_hidden_state.mean(dim=1).squeeze(0).cpu()
+
+    t0 = time.perf_counter()
+    loop_x = [torch.cat((smiles_to_embedding(r.Drug1), smiles_to_embedding(r.Drug2))) for r in df.itertuples()]
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    unique = list(dict.fromkeys(pd.concat([df["Drug1"], df["Drug2"]]).tolist()))
+    emb = encode_unique(unique, tokenizer, chemberta, batch_size=batch_size)
+    row = {s: i for i, s in enumerate(unique)}
+    feats = np.concatenate((emb[[row[s] for s in df["Drug1"]]], emb[[row[s] for s in df["Drug2"]]]), axis=1)
+    batched_s = time.perf_counter() - t0
+
+    max_diff = float(np.abs(torch.stack(loop_x).numpy() - feats).max())
+    print(f"Sample: {len(df)} pairs, {len(unique)} unique SMILES ({2 * len(df) / len(unique):.1f}x reuse)")
+    print(f"  per-row loop : {loop_s:8.2f}s  ({len(df) / loop_s:8.1f} pairs/s)")
+    print(f"  dedup+batched: {batched_s:8.2f}s  ({len(df) / batched_s:8.1f} pairs/s)")
+    print(f"  speedup      : {loop_s / batched_s:8.1f}x   max |Δ| = {max_diff:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a deduplicated ChemBERTa embedding store")
+    parser.add_argument("--csv", required=True, help="DrugBank DDI CSV with Drug1, Drug2, Y columns")
+    parser.add_argument("--out", default="models/model_Files/embedding_store")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--layer", type=int, default=-1,
+                        help="mean-pool the output of this layer instead of the last one")
+    parser.add_argument("--limit", type=int, default=None, help="only use a random sample of N pairs")
+    parser.add_argument("--compare", type=int, default=None, metavar="N",
+                        help="time the per-row loop against batched encoding on N sampled pairs and exit")
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(CHEMBERTA_MODEL)
+    chemberta = AutoModel.from_pretrained(CHEMBERTA_MODEL).to(DEVICE).eval()
+    if args.layer > 0:
+        chemberta = truncate_layers(chemberta, args.layer)
+
+    if args.compare:
+        compare(load_pairs(args.csv, args.compare), tokenizer, chemberta, args.batch_size)
+        return
+    build_store(load_pairs(args.csv, args.limit), args.out, tokenizer, chemberta, args.batch_size, args.layer)
+
+
+if __name__ == "__main__":
+    main()
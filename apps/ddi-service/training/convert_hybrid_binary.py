@@ -0,0 +1,86 @@
+# training/convert_hybrid_binary.py
+# Converts hybrid_ddi_model_final.h5 into a compact .npz with BatchNorm
+# folded into the dense weights, then checks the NumPy forward pass against
+# Keras. The ddi-service loads the .npz without importing TensorFlow.
+#
+# Usage (from apps/ddi-service):
+#   python -m training.convert_hybrid_binary
+#   python -m training.convert_hybrid_binary --h5 path/to/model.h5 --out path/to/model.npz --check 2000
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from config2 import HYBRID_BINARY_NPZ_PATH
+from models.hybrid_binary_model import FP_DIM, NumpyHybridModel, build_hybrid_ddi_model, fold_keras_layers
+
+H5_PATH = "models/model_Files/hybrid_ddi_model_final.h5"
+PARITY_TOLERANCE = 1e-4
+
+
+def convert(h5_path: str, out_path: str):
+    record = {}
+    model = build_hybrid_ddi_model(record=record)
+    model.load_weights(h5_path)
+    weights = fold_keras_layers(record)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    np.savez(out_path, **weights)
+    size_kb = os.path.getsize(out_path) / 1024
+    print(f"✅ Folded weights saved to {out_path} ({size_kb:.0f} KB)")
+    return model, NumpyHybridModel(weights)
+
+
+def parity_check(keras_model, numpy_model, n: int, seed: int = 42, inputs=None) -> float:
+    """Max |Δprob| between Keras and NumPy, plus timing for both. Compares on
+    `inputs` ([N, FP_DIM] x1 and x2) if given, else on n random sparse bit
+    vectors with a fingerprint-like bit density."""
+    if inputs is None:
+        rng = np.random.default_rng(seed)
+        x1 = (rng.random((n, FP_DIM)) < 0.05).astype(np.float32)
+        x2 = (rng.random((n, FP_DIM)) < 0.05).astype(np.float32)
+    else:
+        x1, x2 = (np.asarray(x, dtype=np.float32) for x in inputs)
+        n = len(x1)
+
+    t0 = time.perf_counter()
+    ref = keras_model.predict([x1, x2], verbose=0, batch_size=n)[:, 0]
+    keras_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    out = numpy_model.predict(x1, x2)
+    numpy_s = time.perf_counter() - t0
+
+    m = min(n, 100)
+    t0 = time.perf_counter()
+    for i in range(m):
+        numpy_model.predict(x1[i:i + 1], x2[i:i + 1])
+    single_s = (time.perf_counter() - t0) / m
+
+    max_diff = float(np.abs(ref - out).max())
+    print(f"Parity on {n} pairs: max |Δprob| = {max_diff:.2e}, "
+          f"label agreement = {np.mean((ref >= 0.5) == (out >= 0.5)):.4f}")
+    print(f"  keras batch : {keras_s * 1e3:8.1f} ms")
+    print(f"  numpy batch : {numpy_s * 1e3:8.1f} ms")
+    print(f"  numpy single: {single_s * 1e6:8.1f} µs/pair")
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the hybrid binary DDI model to NumPy")
+    parser.add_argument("--h5", default=H5_PATH)
+    parser.add_argument("--out", default=HYBRID_BINARY_NPZ_PATH)
+    parser.add_argument("--check", type=int, default=1000, metavar="N",
+                        help="compare against Keras on N random pairs (0 to skip)")
+    args = parser.parse_args()
+
+    keras_model, numpy_model = convert(args.h5, args.out)
+    if args.check:
+        max_diff = parity_check(keras_model, numpy_model, args.check)
+        if max_diff > PARITY_TOLERANCE:
+            raise SystemExit(f"❌ Parity check failed: {max_diff:.2e} > {PARITY_TOLERANCE:.0e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# training/distill_type_student.py
+# Distills the ChemBERTa DDIClassifier (teacher) into a fingerprint-only MLP
+# (student, models/ddi_student.py) so the 86-class prediction can be served
+# without any transformer pass.
+#
+# Teacher soft targets come from the cached embeddings in an embedding store
+# (training/build_embeddings.py); student inputs are the same Morgan+MACCS
+# fingerprints the hybrid binary model uses. Loss is temperature-scaled KL to
+# the teacher plus a small cross-entropy term on the true labels.
+#
+# Usage (from apps/ddi-service):
+#   python -m training.distill_type_student --store models/model_Files/embedding_store
+#   python -m training.distill_type_student --store ... --teacher-latency 50
+
+import argparse
+import copy
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, TensorDataset
+
+from config2 import DDI_CLASSIFIER_PATH, DDI_STUDENT_PATH
+from models.ddi_classifier import DDIClassifier, NUM_CLASSES
+from models.ddi_student import StudentModel
+from models.embedding_store import EmbeddingStore
+from models.hybrid_binary_model import FP_DIM
+from training.build_binary_dataset import compute_fingerprints
+from training.train_type_head import split
+
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+HIDDEN = 256
+
+
+def build_student() -> nn.Sequential:
+    # Layer layout must match export() and models/ddi_student.py.
+    return nn.Sequential(
+        nn.Linear(2 * FP_DIM, HIDDEN), nn.ReLU(), nn.Dropout(0.2),
+        nn.Linear(HIDDEN, HIDDEN), nn.ReLU(),
+        nn.Linear(HIDDEN, NUM_CLASSES),
+    )
+
+def export(student: nn.Sequential) -> dict:
+    linears = [m for m in student if isinstance(m, nn.Linear)]
+    weights = {}
+    for n, layer in enumerate(linears, start=1):
+        weights[f"w{n}"] = layer.weight.detach().cpu().numpy().T
+        weights[f"b{n}"] = layer.bias.detach().cpu().numpy()
+    return {k: v.astype(np.float32) for k, v in weights.items()}
+
+
+def _batch(embeddings, fps, pair_rows):
+    a, b = pair_rows[:, 0], pair_rows[:, 1]
+    teacher_x = torch.cat((embeddings[a], embeddings[b]), dim=1).to(DEVICE)
+    student_x = torch.cat((fps[a], fps[b]), dim=1).float().to(DEVICE)
+    return teacher_x, student_x
+
+
+def distill_loss(student_logits, teacher_logits, labels, temperature, alpha):
+    soft = F.kl_div(F.log_softmax(student_logits / temperature, dim=1),
+                    F.softmax(teacher_logits / temperature, dim=1),
+                    reduction="batchmean") * temperature ** 2
+    return alpha * soft + (1 - alpha) * F.cross_entropy(student_logits, labels)
+
+
+def predict(teacher, student, embeddings, fps, loader):
+    """Teacher and student probabilities plus labels over a loader."""
+    student.eval()
+    t_all, s_all, y_all = [], [], []
+    with torch.no_grad():
+        for pair_rows, y in loader:
+            teacher_x, student_x = _batch(embeddings, fps, pair_rows)
+            t_all.append(F.softmax(teacher(teacher_x), dim=1).cpu())
+            s_all.append(F.softmax(student(student_x), dim=1).cpu())
+            y_all.append(y)
+    return torch.cat(t_all).numpy(), torch.cat(s_all).numpy(), torch.cat(y_all).numpy()
+
+
+def agreement_report(t_probs, s_probs, labels) -> dict:
+    t_top = np.argsort(-t_probs, axis=1)[:, :3]
+    s_top = np.argsort(-s_probs, axis=1)[:, :3]
+    return {
+        "pairs": int(len(labels)),
+        "top1_agreement": float(np.mean(s_top[:, 0] == t_top[:, 0])),
+        "top3_agreement": float(np.mean((s_top == t_top[:, :1]).any(axis=1))),
+        "teacher_accuracy": float(np.mean(t_top[:, 0] == labels)),
+        "student_accuracy": float(np.mean(s_top[:, 0] == labels)),
+    }
+
+
+def student_latency(model: StudentModel, fps: np.ndarray, n: int = 1000) -> dict:
+    """Per-pair latency of the NumPy student: cold (projections computed) and
+    warm (projections cached, as in serving)."""
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, len(fps), size=(n, 2))
+    x = fps.astype(np.float32)
+
+    t0 = time.perf_counter()
+    for a, b in idx:
+        model.predict_proba(x[a:a + 1], x[b:b + 1])
+    cold = (time.perf_counter() - t0) / n
+
+    left, right = model.project(x)
+    t0 = time.perf_counter()
+    for a, b in idx:
+        model.probs_from_projections(left[a:a + 1], right[b:b + 1])
+    warm = (time.perf_counter() - t0) / n
+    return {"student_cold_us_per_pair": cold * 1e6, "student_warm_us_per_pair": warm * 1e6}
+
+
+def teacher_latency(store, teacher_path: str, n: int) -> dict:
+    """Per-pair latency of ChemBERTa + teacher head with a cold embedding
+    cache, on the CPU like the serving path."""
+    from models.chemberta_encoder import get_base_encoder
+    encoder = get_base_encoder()
+    encoder.store = None
+    teacher = DDIClassifier(input_dim=2 * encoder.hidden_size)
+    teacher.load_state_dict(torch.load(teacher_path, map_location="cpu"))
+    teacher.eval()
+    rng = np.random.default_rng(0)
+    times = []
+    for a, b in rng.integers(0, len(store), size=(n, 2)):
+        encoder.clear_cache()
+        t0 = time.perf_counter()
+        embs = encoder.encode([store.smiles[a], store.smiles[b]])
+        with torch.no_grad():
+            F.softmax(teacher(embs.reshape(1, -1)), dim=1)
+        times.append(time.perf_counter() - t0)
+    return {"teacher_ms_per_pair_p50": float(np.median(times)) * 1e3}
+
+
+def train(store, teacher_path, out_path, batch_size=512, lr=1e-3, max_epochs=100, patience=8,
+          temperature=2.0, alpha=0.9, val_fraction=0.1, seed=42, workers=None):
+    torch.manual_seed(seed)
+    pairs, labels = store.load_pairs()
+    pairs, labels = np.asarray(pairs), np.asarray(labels)
+
+    feats, _, valid = compute_fingerprints(store.smiles, workers=workers)
+    keep = valid[pairs[:, 0]] & valid[pairs[:, 1]]
+    pairs, labels = pairs[keep], labels[keep]
+    print(f"{len(labels)} pairs with valid fingerprints ({int((~keep).sum())} dropped)")
+
+    embeddings = torch.from_numpy(np.array(store.embeddings, dtype=np.float32))
+    fps = torch.from_numpy(feats)
+    teacher = DDIClassifier(input_dim=2 * store.dim).to(DEVICE)
+    teacher.load_state_dict(torch.load(teacher_path, map_location=DEVICE))
+    teacher.eval()
+
+    train_idx, val_idx = split(len(labels), val_fraction, seed)
+    def loader(idx, shuffle):
+        ds = TensorDataset(torch.from_numpy(pairs[idx].astype(np.int64)), torch.from_numpy(labels[idx].astype(np.int64)))
+        return DataLoader(ds, batch_size=batch_size, shuffle=shuffle)
+    train_loader, val_loader = loader(train_idx, True), loader(val_idx, False)
+
+    student = build_student().to(DEVICE)
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    best_loss, best_state, trigger_times = float("inf"), None, 0
+    t0 = time.perf_counter()
+    for epoch in range(max_epochs):
+        student.train()
+        total, n = 0.0, 0
+        for pair_rows, y in train_loader:
+            teacher_x, student_x = _batch(embeddings, fps, pair_rows)
+            y = y.to(DEVICE)
+            with torch.no_grad():
+                teacher_logits = teacher(teacher_x)
+            optimizer.zero_grad()
+            loss = distill_loss(student(student_x), teacher_logits, y, temperature, alpha)
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(y)
+            n += len(y)
+
+        t_probs, s_probs, _ = predict(teacher, student, embeddings, fps, val_loader)
+        val_kl = float(np.mean(np.sum(t_probs * (np.log(t_probs + 1e-9) - np.log(s_probs + 1e-9)), axis=1)))
+        print(f"Epoch {epoch+1}/{max_epochs} - Train Loss: {total / n:.4f} - Val KL: {val_kl:.4f} - "
+              f"{time.perf_counter() - t0:.0f}s")
+
+        # Early stopping
+        if val_kl < best_loss:
+            best_loss, best_state, trigger_times = val_kl, copy.deepcopy(student.state_dict()), 0
+        else:
+            trigger_times += 1
+            if trigger_times >= patience:
+                print(f"⛔ Early stopping at epoch {epoch+1} (no val KL improvement in {patience} epochs)")
+                break
+
+    student.load_state_dict(best_state)
+    weights = export(student)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp.npz"
+    np.savez(tmp_path, **weights)
+    os.replace(tmp_path, out_path)
+
+    report = agreement_report(*predict(teacher, student, embeddings, fps, val_loader))
+    report.update(student_latency(StudentModel(weights), feats[valid]))
+    report["val_kl"] = best_loss
+    print(f"✅ Student saved to {out_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the DDI type classifier into a fingerprint MLP")
+    parser.add_argument("--store", required=True, help="embedding store directory with pairs/labels")
+    parser.add_argument("--teacher", default=DDI_CLASSIFIER_PATH)
+    parser.add_argument("--out", default=DDI_STUDENT_PATH)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--max-epochs", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=8)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.9, help="weight of the distillation term")
+    parser.add_argument("--workers", type=int, default=None, help="fingerprint worker processes")
+    parser.add_argument("--teacher-latency", type=int, default=0, metavar="N",
+                        help="also time ChemBERTa + teacher on N cold pairs")
+    args = parser.parse_args()
+
+    store = EmbeddingStore.open(args.store)
+    report = train(store, args.teacher, args.out, args.batch_size, args.lr, args.max_epochs, args.patience,
+                   args.temperature, args.alpha, workers=args.workers)
+    if args.teacher_latency:
+        report.update(teacher_latency(store, args.teacher, args.teacher_latency))
+
+    report_path = os.path.splitext(args.out)[0] + "_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
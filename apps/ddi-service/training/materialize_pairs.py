@@ -0,0 +1,100 @@
+# training/materialize_pairs.py
+# Scores every ordered pair of catalog drugs with the DDI type classifier and
+# writes the top-k classes into a memory-mapped PairTable (models/pair_table.py)
+# that the ddi-service serves before falling back to live inference.
+#
+# Drug embeddings come from the shared encoder (precomputed store rows where
+# available). The classifier's first layer is linear in [emb_a ⊕ emb_b], so
+# it is split into per-drug projections A = E·W_a and B = E·W_b; each block
+# of rows then only needs relu(A[block, None] + B[None]) and the output layer.
+#
+# Usage (from apps/ddi-service):
+#   python -m training.materialize_pairs                     # drugs from the MongoDB catalog
+#   python -m training.materialize_pairs --csv drugs.csv     # drug_name,smiles[,drug_id] columns
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+
+from config2 import DDI_CLASSIFIER_PATH, PAIR_TABLE_DIR
+from models.chemberta_encoder import CHEMBERTA_NAME, get_base_encoder
+from models.ddi_classifier import DDIClassifier
+from models.pair_table import PairTable
+from models.weights import weights_hash
+
+
+def load_catalog_drugs():
+    from pymongo import MongoClient
+    from config2 import MONGO_URI, DB_NAME, COLLECTION_NAME
+    drugdb = MongoClient(MONGO_URI)[DB_NAME][COLLECTION_NAME]
+    docs = drugdb.find({"smiles": {"$nin": [None, ""]}}, {"name": 1, "smiles": 1})
+    return [(str(d["_id"]), d.get("name", ""), d["smiles"]) for d in docs]
+
+def load_csv_drugs(path: str):
+    df = pd.read_csv(path).dropna(subset=["smiles"]).drop_duplicates("smiles")
+    ids = df["drug_id"].astype(str) if "drug_id" in df else df.index.astype(str)
+    return list(zip(ids, df["drug_name"].fillna(""), df["smiles"]))
+
+
+def encode_drugs(encoder, smiles, chunk: int = 512) -> torch.Tensor:
+    return torch.cat([encoder.encode(smiles[i:i + chunk]) for i in range(0, len(smiles), chunk)])
+
+
+def materialize(drugs, out_dir, model_path=DDI_CLASSIFIER_PATH, top_k=3, block_mb=256):
+    encoder = get_base_encoder()
+    ids, names, smiles = (list(col) for col in zip(*drugs))
+    n = len(smiles)
+
+    t0 = time.perf_counter()
+    emb = encode_drugs(encoder, smiles)
+    print(f"{n} drugs embedded in {time.perf_counter() - t0:.1f}s")
+
+    model = DDIClassifier(input_dim=2 * encoder.hidden_size)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    model.eval()
+    first, last = model.fc[0], model.fc[3]
+    hidden = encoder.hidden_size
+    with torch.no_grad():
+        left = emb @ first.weight[:, :hidden].T                    # [N, 512]
+        right = emb @ first.weight[:, hidden:].T + first.bias      # [N, 512]
+
+    meta = {"model": CHEMBERTA_NAME, "weights_hash": weights_hash(model_path),
+            "drug_ids": ids, "names": names, "smiles": smiles}
+    classes, probs = PairTable.create(out_dir, meta, n, top_k)
+
+    block = max(1, (block_mb << 20) // (n * left.shape[1] * 4))
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            h = F.relu(left[start:stop, None, :] + right[None, :, :])   # [B, N, 512]
+            p = F.softmax(h @ last.weight.T + last.bias, dim=-1)        # [B, N, 86]
+            top_p, top_c = torch.topk(p, k=top_k, dim=-1)
+            classes[start:stop] = (top_c + 1).numpy().astype(np.int16)
+            probs[start:stop] = top_p.numpy().astype(np.float16)
+    classes.flush()
+    probs.flush()
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {n * n} ordered pairs scored in {elapsed:.1f}s ({n * n / max(elapsed, 1e-9):.0f} pairs/s) → {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute DDI top-k classes for all catalog drug pairs")
+    parser.add_argument("--csv", default=None, help="drug_name,smiles[,drug_id] CSV instead of the MongoDB catalog")
+    parser.add_argument("--out", default=PAIR_TABLE_DIR)
+    parser.add_argument("--model", default=DDI_CLASSIFIER_PATH)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--block-mb", type=int, default=256, help="memory budget per block of rows")
+    args = parser.parse_args()
+
+    drugs = load_csv_drugs(args.csv) if args.csv else load_catalog_drugs()
+    materialize(drugs, args.out, args.model, args.top_k, args.block_mb)
+
+
+if __name__ == "__main__":
+    main()
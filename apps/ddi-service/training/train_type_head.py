@@ -0,0 +1,163 @@
+# training/train_type_head.py
+# Retrains the 86-class DDIClassifier head from a precomputed embedding
+# store (training/build_embeddings.py) instead of re-running ChemBERTa.
+#
+# Pair features are gathered from the in-memory embedding matrix per
+# mini-batch, so only [N_unique, 768] floats are held, not [M, 1536].
+# The best state_dict by validation loss is written in the format
+# models/DLTypeClassificationInference.py loads, to the candidate path
+# (DDI_CLASSIFIER_CANDIDATE_PATH), not the serving one. Promote it with
+# --promote, which replaces DDI_CLASSIFIER_PATH, then POST /admin/reload
+# {"models": ["ddi_type"]} to smoke-test and swap it in without a restart.
+#
+# Usage (from apps/ddi-service):
+#   python -m training.train_type_head --store models/model_Files/embedding_store
+#   python -m training.train_type_head --store ... --promote
+
+import argparse
+import copy
+import os
+import shutil
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from config2 import DDI_CLASSIFIER_PATH, DDI_CLASSIFIER_CANDIDATE_PATH
+from models.ddi_classifier import DDIClassifier, NUM_CLASSES
+from models.embedding_store import EmbeddingStore
+
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def split(n: int, val_fraction: float, seed: int):
+    perm = np.random.default_rng(seed).permutation(n)
+    n_val = int(n * val_fraction)
+    return perm[n_val:], perm[:n_val]
+
+
+def _loader(pairs, labels, idx, batch_size, shuffle):
+    ds = TensorDataset(torch.from_numpy(np.asarray(pairs[idx], dtype=np.int64)),
+                       torch.from_numpy(np.asarray(labels[idx], dtype=np.int64)))
+    return DataLoader(ds, batch_size=batch_size, shuffle=shuffle)
+
+
+def _features(embeddings, pair_rows):
+    return torch.cat((embeddings[pair_rows[:, 0]], embeddings[pair_rows[:, 1]]), dim=1).to(DEVICE)
+
+
+def evaluate(model, embeddings, loader, criterion):
+    model.eval()
+    total_loss, correct, n = 0.0, 0, 0
+    with torch.no_grad():
+        for pair_rows, y in loader:
+            y = y.to(DEVICE)
+            logits = model(_features(embeddings, pair_rows))
+            total_loss += criterion(logits, y).item() * len(y)
+            correct += (logits.argmax(dim=1) == y).sum().item()
+            n += len(y)
+    return total_loss / max(n, 1), correct / max(n, 1)
+
+
+def train(store, out_path, batch_size=256, lr=1e-3, weight_decay=1e-5, max_epochs=200,
+          patience=10, val_fraction=0.2, seed=42):
+    torch.manual_seed(seed)
+    pairs, labels = store.load_pairs()
+    if labels.max() >= NUM_CLASSES or labels.min() < 0:
+        raise ValueError(f"labels must be 0-based classes below {NUM_CLASSES}")
+
+    # The unique-SMILES matrix is small; gather pair features from it per batch.
+    embeddings = torch.from_numpy(np.array(store.embeddings, dtype=np.float32))
+    train_idx, val_idx = split(len(labels), val_fraction, seed)
+    if not len(val_idx) or not len(train_idx):
+        raise ValueError(f"val_fraction {val_fraction} leaves no validation or no training pairs")
+    train_loader = _loader(pairs, labels, train_idx, batch_size, shuffle=True)
+    val_loader = _loader(pairs, labels, val_idx, batch_size * 4, shuffle=False)
+    print(f"{len(train_idx)} train / {len(val_idx)} val pairs over {len(store)} unique SMILES")
+
+    model = DDIClassifier(input_dim=2 * store.dim).to(DEVICE)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr, weight_decay=weight_decay)
+
+    best_loss, best_state, trigger_times = float("inf"), None, 0
+    t0 = time.perf_counter()
+    for epoch in range(max_epochs):
+        model.train()
+        train_loss, n = 0.0, 0
+        for pair_rows, y in train_loader:
+            y = y.to(DEVICE)
+            optimizer.zero_grad()
+            loss = criterion(model(_features(embeddings, pair_rows)), y)
+            loss.backward()
+            optimizer.step()
+            train_loss += loss.item() * len(y)
+            n += len(y)
+
+        val_loss, val_acc = evaluate(model, embeddings, val_loader, criterion)
+        print(f"Epoch {epoch+1}/{max_epochs} - Train Loss: {train_loss / n:.4f} - "
+              f"Val Loss: {val_loss:.4f} - Val Acc: {val_acc:.4f} - {time.perf_counter() - t0:.0f}s")
+
+        # Early stopping
+        if val_loss < best_loss:
+            best_loss, best_state, trigger_times = val_loss, copy.deepcopy(model.state_dict()), 0
+        else:
+            trigger_times += 1
+            if trigger_times >= patience:
+                print(f"⛔ Early stopping at epoch {epoch+1} (no val loss improvement in {patience} epochs)")
+                break
+
+    if best_state is None:
+        raise ValueError("validation loss was never finite; not writing the head")
+
+    # Write to a temp file first so a running service never sees a partial file.
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    torch.save({k: v.cpu() for k, v in best_state.items()}, tmp_path)
+    os.replace(tmp_path, out_path)
+    print(f"✅ Best head (val loss {best_loss:.4f}) saved to {out_path}")
+
+
+def promote(candidate_path: str, live_path: str = DDI_CLASSIFIER_PATH):
+    """Replaces the serving weights file with the candidate in one rename;
+    the running service keeps its head until POST /admin/reload."""
+    tmp_path = live_path + ".tmp"
+    shutil.copyfile(candidate_path, tmp_path)
+    os.replace(tmp_path, live_path)
+    print(f"✅ Promoted {candidate_path} to {live_path}; "
+          f"POST /admin/reload {{\"models\": [\"ddi_type\"]}} to serve it")
+
+
+def _fraction(value: str) -> float:
+    fraction = float(value)
+    if not 0 < fraction < 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1 (exclusive), got {value}")
+    return fraction
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the DDI type head from cached embeddings")
+    parser.add_argument("--store", required=True, help="embedding store directory with pairs/labels")
+    parser.add_argument("--out", default=DDI_CLASSIFIER_CANDIDATE_PATH,
+                        help="where to write the weights (default: the candidate path, not the serving one)")
+    parser.add_argument("--promote", action="store_true",
+                        help=f"then copy them over the serving weights at {DDI_CLASSIFIER_PATH}")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--weight-decay", type=float, default=1e-5)
+    parser.add_argument("--max-epochs", type=int, default=200)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--val-fraction", type=_fraction, default=0.2,
+                        help="held-out pairs that pick the best epoch and drive early stopping")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    train(EmbeddingStore.open(args.store), args.out, args.batch_size, args.lr, args.weight_decay,
+          args.max_epochs, args.patience, args.val_fraction, args.seed)
+    if args.promote and os.path.abspath(args.out) != os.path.abspath(DDI_CLASSIFIER_PATH):
+        promote(args.out)
+
+
+if __name__ == "__main__":
+    main()
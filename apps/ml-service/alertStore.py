@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Materialized patient alerts.
+
+Alerts only change when a patient's active medications, conditions or
+allergies change, so they are computed once after each write and stored
+next to a fingerprint of the inputs they were built from.  Reads compare
+the fingerprint of the current inputs with the stored one and only
+recompute when it is stale.
+
+Alerts computed while the ddi-service or the LLM was unavailable are
+stored with `complete: False` and a `retryAfter` time.  Reads keep serving
+them (flagged incomplete) and hand the retry to a background refresh once
+`retryAfter` has passed, backing off exponentially while the outage lasts,
+so neither the read path nor the paid LLM is hammered during an outage.
+
+Backfill existing patients with:
+    python alertStore.py --backfill [--force] [--limit N]
+"""
+from __future__ import annotations
+import re, json, hashlib, argparse
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from pymongo import MongoClient
+
+import metrics
+import tracing
+from config import (MONGO_URI, DB_NAME, MEDS_DB, ALERTS_DB,
+                    ALERTS_RETRY_BASE_SECONDS, ALERTS_RETRY_MAX_SECONDS)
+from openrouter_config import call_llm
+from ddiScreening import screen_medications, screen_conditions
+
+mongo_client = MongoClient(MONGO_URI, event_listeners=[metrics.mongo_listener(), tracing.mongo_listener()])
+prescriptions_collection = mongo_client[DB_NAME][MEDS_DB]
+alerts_collection = mongo_client[DB_NAME][ALERTS_DB]
+
+# Bump when the alert prompt or parsing changes so stored alerts are rebuilt.
+ALERTS_VERSION = 3
+
+# Drug-drug interactions come from the screening engine and drug-condition
+# contraindications from the PDI model; the LLM is only asked about allergies
+# and conditions the PDI model cannot resolve.
+PDI_ALERTS_PROMPT = '''
+    Analyze the following medical data and return structured risks:
+
+    - Current Medications: {medications}
+    - Current Conditions: {cond_current}
+    - Past Conditions: {cond_past}
+    - Allergies: {allergies}
+
+    Task:
+    Identify any drug-condition or drug-allergy contradictions (PDI).
+
+    Return in the format:
+    [pdi_alerts:
+    - Drug + Condition/Allergy: Reason
+    - ...
+    ]
+    '''
+
+
+# ─── Inputs & fingerprint ─────────────────────────────────────────────────
+def load_alert_inputs(patient_id: str) -> Optional[dict]:
+    """Active drugs, conditions and allergies the alerts are computed from."""
+    pres = prescriptions_collection.find_one(
+        {"patient": patient_id, "source": "notes"},
+        projection={"consultationNotes": 1, "medicines": 1},
+        sort=[("createdAt", -1)]
+    )
+    if not pres or not pres.get("consultationNotes"):
+        return None
+
+    latest_note = sorted(pres["consultationNotes"], key=lambda n: n["createdAt"], reverse=True)[0]
+    structured = latest_note.get("structured", {}) or {}
+    conditions = structured.get("conditions", {}) or {}
+
+    return {
+        "active_drugs": [m["name"] for m in pres.get("medicines", [])
+                         if m.get("status", "active").lower() == "active"],
+        "cond_current": conditions.get("current", []) or [],
+        "cond_past": conditions.get("past", []) or [],
+        "allergies": structured.get("allergies", []) or [],
+    }
+
+
+def fingerprint(inputs: Optional[dict]) -> str:
+    """Order- and case-insensitive hash of the alert inputs."""
+    if inputs is None:
+        return ""
+    canonical = {k: sorted({str(v).strip().lower() for v in vals}) for k, vals in inputs.items()}
+    canonical["version"] = ALERTS_VERSION
+    blob = json.dumps(canonical, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+# ─── Computation ──────────────────────────────────────────────────────────
+def compute_alerts(inputs: dict) -> dict:
+    with tracing.span("alerts.compute", drugs=len(inputs["active_drugs"])):
+        return _compute_alerts(inputs)
+
+def _compute_alerts(inputs: dict) -> dict:
+    """
+    {"ddi": [...], "pdi": [...], "complete": bool}. `complete` is False when
+    a step was skipped because the DDI/PDI models or the LLM were unavailable.
+    """
+    screening = screen_medications(inputs["active_drugs"])
+    complete = screening["modelsUsed"]
+    ddi_alerts = [f"{f['drugs'][0]} + {f['drugs'][1]}: {f['description']}" for f in screening["flagged"]]
+
+    pdi_alerts = []
+    conditions = inputs["cond_current"] + inputs["cond_past"]
+    llm_conditions = conditions
+    if conditions and screening["smiles"]:
+        pdi = screen_conditions(screening["smiles"], conditions)
+        if pdi is None:
+            complete = False
+        else:
+            pdi_alerts = [f"{f['drug']} + {f['condition']}: Predicted contraindication (probability {f['probability']:.2f})"
+                          for f in pdi["flagged"]]
+            # Drugs without SMILES were not scored, so they still need every condition checked.
+            llm_conditions = conditions if screening["unresolved"] else pdi["unresolved"]
+
+    if inputs["active_drugs"] and (llm_conditions or inputs["allergies"]):
+        router_out = call_llm(PDI_ALERTS_PROMPT.format(
+            medications=", ".join(inputs["active_drugs"]),
+            cond_current=", ".join(c for c in inputs["cond_current"] if c in llm_conditions) or "None",
+            cond_past=", ".join(c for c in inputs["cond_past"] if c in llm_conditions) or "None",
+            allergies=", ".join(inputs["allergies"]) or "None",
+        ), "alerts")
+        complete = complete and bool(router_out)
+        m = re.search(r"\[pdi_alerts:(.*?)\]", router_out, re.DOTALL)
+        pdi_alerts += re.findall(r"-\s*(.*?)$", m.group(1).strip() if m else "", re.MULTILINE)
+
+    return {"ddi": ddi_alerts, "pdi": pdi_alerts, "complete": complete}
+
+
+def _retry_delay(retries: int) -> timedelta:
+    return timedelta(seconds=min(ALERTS_RETRY_BASE_SECONDS * 2 ** retries, ALERTS_RETRY_MAX_SECONDS))
+
+
+def _store(patient_id: str, fp: str, alerts: dict, retries: int = 0) -> dict:
+    now = datetime.utcnow()
+    doc = {
+        "patient": patient_id,
+        "fingerprint": fp,
+        "ddi": alerts["ddi"],
+        "pdi": alerts["pdi"],
+        "complete": alerts["complete"],
+        "computedAt": now.isoformat(),
+    }
+    if alerts["complete"]:
+        update = {"$set": doc, "$unset": {"retries": "", "retryAfter": ""}}
+    else:
+        doc["retries"] = retries
+        doc["retryAfter"] = now + _retry_delay(retries)
+        update = {"$set": doc}
+    alerts_collection.update_one({"patient": patient_id}, update, upsert=True)
+    return doc
+
+
+def refresh_alerts(patient_id: str, force: bool = False) -> dict:
+    """
+    Recompute and store a patient's alerts if their inputs changed, or if
+    the stored alerts are incomplete and their `retryAfter` has passed.
+    Called as a background task after every history write and by
+    `get_alerts` to retry incomplete alerts.  Returns a doc with an
+    `error` key when the refresh failed.
+    """
+    try:
+        inputs = load_alert_inputs(patient_id)
+        fp = fingerprint(inputs)
+        stored = alerts_collection.find_one({"patient": patient_id}, {"_id": 0})
+        same = bool(stored) and stored.get("fingerprint") == fp
+        if same and not force:
+            if stored.get("complete", True) or datetime.utcnow() < stored.get("retryAfter", datetime.min):
+                return stored
+        # Back off further only while the same inputs keep failing.
+        retries = stored.get("retries", 0) + 1 if same and not stored.get("complete", True) else 0
+        alerts = compute_alerts(inputs) if inputs else {"ddi": [], "pdi": [], "complete": True}
+        return _store(patient_id, fp, alerts, retries)
+    except Exception as e:
+        print(f"❌ Alert refresh failed for {patient_id}: {e}")
+        return {"patient": patient_id, "ddi": [], "pdi": [], "error": str(e)}
+
+
+def _claim_retry(patient_id: str, stored: dict) -> bool:
+    """Push `retryAfter` forward so only one reader schedules the retry."""
+    if datetime.utcnow() < stored.get("retryAfter", datetime.min):
+        return False
+    result = alerts_collection.update_one(
+        {"patient": patient_id, "retryAfter": stored.get("retryAfter")},
+        {"$set": {"retryAfter": datetime.utcnow() + _retry_delay(stored.get("retries", 0))}},
+    )
+    return result.modified_count == 1
+
+
+def get_alerts(patient_id: str, schedule: Optional[Callable] = None) -> dict:
+    """
+    Serve stored alerts, recomputing inline only when the fingerprint is
+    stale.  Incomplete stored alerts are served as they are; once their
+    `retryAfter` has passed a forced refresh is handed to `schedule`
+    (e.g. `BackgroundTasks.add_task`) instead of running on the read path.
+    """
+    inputs = load_alert_inputs(patient_id)
+    if inputs is None:
+        return {"ddi": [], "pdi": []}
+
+    fp = fingerprint(inputs)
+    stored = alerts_collection.find_one({"patient": patient_id}, {"_id": 0})
+    if stored and stored.get("fingerprint") == fp:
+        metrics.CACHE_REQUESTS.inc("alerts", "hit")
+        complete = stored.get("complete", True)
+        if not complete and schedule is not None and _claim_retry(patient_id, stored):
+            schedule(refresh_alerts, patient_id, True)
+        return {"ddi": stored["ddi"], "pdi": stored["pdi"], "complete": complete,
+                "computedAt": stored.get("computedAt"), "cached": True}
+
+    metrics.CACHE_REQUESTS.inc("alerts", "miss")
+    doc = _store(patient_id, fp, compute_alerts(inputs))
+    return {"ddi": doc["ddi"], "pdi": doc["pdi"], "complete": doc["complete"],
+            "computedAt": doc["computedAt"], "cached": False}
+
+
+# ─── Backfill CLI ─────────────────────────────────────────────────────────
+def backfill(force: bool = False, limit: Optional[int] = None) -> int:
+    patient_ids: List[str] = prescriptions_collection.distinct("patient", {"source": "notes"})
+    if limit:
+        patient_ids = patient_ids[:limit]
+
+    refreshed = 0
+    for i, pid in enumerate(patient_ids, 1):
+        before = alerts_collection.find_one({"patient": pid}, {"computedAt": 1})
+        doc = refresh_alerts(pid, force=force)
+        if "error" in doc:
+            print(f"[{i}/{len(patient_ids)}] {pid}: failed ({doc['error']})")
+            continue
+        if not before or before.get("computedAt") != doc.get("computedAt"):
+            refreshed += 1
+        print(f"[{i}/{len(patient_ids)}] {pid}: {len(doc.get('ddi', []))} DDI, {len(doc.get('pdi', []))} PDI")
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialized patient alert store")
+    parser.add_argument("--backfill", action="store_true", help="compute alerts for every patient with notes")
+    parser.add_argument("--force", action="store_true", help="recompute even if the fingerprint is fresh")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.backfill:
+        alerts_collection.create_index("patient", unique=True)
+        n = backfill(force=args.force, limit=args.limit)
+        print(f"✅ Backfill complete: {n} patient(s) recomputed")
+    else:
+        parser.print_help()
@@ -0,0 +1,237 @@
+"""
+OpenAI-compatible stand-in for OpenRouter, plus canned ddi-service
+endpoints, for load-testing the ml-service offline.
+
+POST /v1/chat/completions answers after a configurable delay with a canned
+reply for the prompt it recognises (router, paraphrase, structuring,
+alerts, DDI explanations, contraindications, PII filter, summary), shaped
+so the ml-service parsers take their normal paths. POST /predict-ddi and
+/predict-pdi return deterministic pseudo-predictions. GET /v1/models
+answers health checks. GET /stats reports calls per prompt kind.
+
+Run standalone with:
+    python -m benchmarks.llm_stub --port 8765 --latency-ms 800 --jitter-ms 200
+    OPENROUTER_API_URL=http://127.0.0.1:8765/v1/chat/completions DDI_SERVICE_URL=http://127.0.0.1:8765 ...
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import Body, FastAPI
+from starlette.responses import JSONResponse
+
+# (kind, marker that identifies the prompt), checked in order
+PROMPT_KINDS = [
+    ("router", "[history_check_summary:"),
+    ("paraphrase", "rephrase this for the user"),
+    ("structuring", "Consultation Notes (MOST RECENT FIRST)"),
+    ("alerts", "[pdi_alerts:"),
+    ("explain", "FLAGGED PAIRS"),
+    ("contraindications", "contraindications with their medical conditions"),
+    ("pii_filter", "[cleaned_history:"),
+    ("summary", "medical summariser"),
+]
+
+
+def classify(prompt: str) -> str:
+    for kind, marker in PROMPT_KINDS:
+        if marker in prompt:
+            return kind
+    return "other"
+
+
+def _quoted(prompt: str):
+    return re.findall(r'"""(.*?)"""', prompt, re.DOTALL)
+
+def _after(prompt: str, label: str) -> str:
+    m = re.search(rf"{re.escape(label)}\s*(.*)", prompt)
+    return m.group(1).strip() if m else ""
+
+
+# ─── Canned replies ───────────────────────────────────────────────────────
+def _router(prompt: str) -> str:
+    question = _after(prompt, "User question:")
+    ddi = "interact" in question.lower()
+    return (
+        "[is_safe: true]\n"
+        f"[type: {'ddi_check' if ddi else 'general'}]\n"
+        f"[ddi_prompts:\n{'- ' + question if ddi else ''}\n]\n"
+        "[active_drugs:\n]\n[past_drugs:\n]\n[current_conditions:\n]\n[past_conditions:\n]\n"
+        "[summarised_conditions: stable chronic conditions]\n"
+        "[history_check_summary: No patient history conflicts found.]\n"
+        f"[output: {'null' if ddi else 'Take medications as prescribed and review with your doctor.'}]"
+    )
+
+def _paraphrase(prompt: str) -> str:
+    quoted = _quoted(prompt)
+    return quoted[1].strip() if len(quoted) > 1 else "Here is what we found."
+
+def _structuring(prompt: str) -> str:
+    m = re.search(r"Current Medication List \(JSON\):\s*(\[.*\])", prompt, re.DOTALL)
+    try:
+        meds = json.loads(m.group(1)) if m else []
+    except json.JSONDecodeError:
+        meds = []
+    latest = prompt.split("Consultation Notes (MOST RECENT FIRST):", 1)[-1].strip().splitlines()
+    return json.dumps({
+        "summary": (latest[0] if latest else "")[:200],
+        "conditions": {"current": ["hypertension"], "past": ["asthma"]},
+        "medications": meds,
+        "allergies": ["penicillin"],
+    }, indent=2)
+
+def _alerts(prompt: str) -> str:
+    meds = [m.strip() for m in _after(prompt, "- Current Medications:").split(",") if m.strip()]
+    conditions = [c.strip() for c in _after(prompt, "- Current Conditions:").split(",") if c.strip() != "None"]
+    lines = [f"- {meds[0]} + {conditions[0]}: Use with caution"] if meds and conditions else []
+    return "[pdi_alerts:\n" + "\n".join(lines) + "\n]"
+
+def _explain(prompt: str) -> str:
+    pairs = re.findall(r"^\d+\.\s*(.+?) \+ (.+?) \(", prompt, re.MULTILINE)
+    return json.dumps({"interactions": [
+        {"drugs": [a, b], "message": f"{a} and {b} may interact.", "recommendation": "Monitor the patient."}
+        for a, b in pairs]})
+
+def _pii_filter(prompt: str) -> str:
+    quoted = _quoted(prompt)
+    text = quoted[-1] if quoted else ""
+    clinical = "\n".join(l for l in text.splitlines() if not re.match(r"\s*(Name|DOB|Phone):", l))
+    return f"[cleaned_history:\n{clinical.strip()}]\n\n[removed_personal:\n- name\n- phone]\n\n[is_safe: true]\n[note: ]"
+
+def _summary(prompt: str) -> str:
+    quoted = _quoted(prompt)
+    return "Summary: " + (quoted[-1].strip()[:300] if quoted else "")
+
+REPLIES = {
+    "router": _router,
+    "paraphrase": _paraphrase,
+    "structuring": _structuring,
+    "alerts": _alerts,
+    "explain": _explain,
+    "contraindications": lambda prompt: '{"interactions": []}',
+    "pii_filter": _pii_filter,
+    "summary": _summary,
+    "other": lambda prompt: "OK",
+}
+
+
+def _pseudo_probability(*parts: str) -> float:
+    digest = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def create_app(latency_ms: float = 800, jitter_ms: float = 200, kind_latency_ms: Optional[Dict[str, float]] = None,
+               ddi_latency_ms: float = 30, error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="OpenRouter / ddi-service stub")
+    rng = random.Random(seed)
+    kind_latency_ms = kind_latency_ms or {}
+    calls = Counter()
+
+    async def _delay(base_ms: float):
+        await asyncio.sleep(max(0.0, base_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    async def _completion(payload: dict = Body(...)):
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+        kind = classify(prompt)
+        calls[kind] += 1
+        await _delay(kind_latency_ms.get(kind, latency_ms))
+        if error_rate and rng.random() < error_rate:
+            calls["errors"] += 1
+            return JSONResponse({"error": {"message": "stub upstream error", "code": 503}}, status_code=503)
+        content = REPLIES[kind](prompt)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        return {
+            "id": f"stub-{calls[kind]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model") or "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    app.post("/v1/chat/completions")(_completion)
+    app.post("/api/v1/chat/completions")(_completion)
+    app.post("/chat/completions")(_completion)
+
+    async def _models():
+        calls["models"] += 1
+        return {"data": [{"id": "stub", "object": "model"}]}
+
+    app.get("/v1/models")(_models)
+    app.get("/api/v1/models")(_models)
+    app.get("/models")(_models)
+
+    @app.post("/predict-ddi")
+    async def predict_ddi(payload: dict = Body(...)):
+        calls["predict_ddi"] += 1
+        await _delay(ddi_latency_ms)
+        threshold = payload.get("threshold", 0.5)
+        results = []
+        for pair in payload.get("pairs", []):
+            p = _pseudo_probability(pair["smiles1"], pair["smiles2"])
+            classes = [{"class": 1, "probability": p, "description": "Drug a may increase the effects of Drug b."}]
+            results.append({"probability": p, "label": int(p >= threshold),
+                            "classes": classes if p >= threshold else []})
+        return {"results": results, "model_version": "stub"}
+
+    @app.post("/predict-pdi")
+    async def predict_pdi(payload: dict = Body(...)):
+        calls["predict_pdi"] += 1
+        await _delay(ddi_latency_ms)
+        results = []
+        for drug in payload.get("drugs", []):
+            for condition in payload.get("conditions", []):
+                p = _pseudo_probability(drug["smiles"], condition)
+                results.append({"drug": drug["name"], "condition": condition, "probability": p, "label": int(p >= 0.8)})
+        return {"results": results, "unresolved_conditions": []}
+
+    @app.get("/stats")
+    def stats():
+        return dict(calls)
+
+    @app.post("/stats/reset")
+    def reset():
+        calls.clear()
+        return {"success": True}
+
+    return app
+
+
+def parse_kind_latency(values) -> Dict[str, float]:
+    """['router=1200', 'structuring=2500'] → {'router': 1200.0, ...}"""
+    out = {}
+    for item in values or []:
+        kind, _, ms = item.partition("=")
+        out[kind] = float(ms)
+    return out
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenRouter / ddi-service stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800, help="mean LLM completion latency")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="uniform ± jitter on every delay")
+    parser.add_argument("--kind-latency", nargs="*", default=[], metavar="KIND=MS",
+                        help=f"per prompt kind override; kinds: {', '.join(REPLIES)}")
+    parser.add_argument("--ddi-latency-ms", type=float, default=30)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, parse_kind_latency(args.kind_latency),
+                     args.ddi_latency_ms, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
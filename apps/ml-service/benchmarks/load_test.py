@@ -0,0 +1,433 @@
+"""
+Offline load test for the ml-service.
+
+Starts three processes:
+  • benchmarks/llm_stub.py: OpenAI-compatible OpenRouter stand-in, plus
+    canned ddi-service endpoints, with configurable latency;
+  • the ml-service app (server.py) under uvicorn, on MongoDB seeded with
+    synthetic patients and notes (benchmarks/seed_data.py). This is an
+    in-memory mongomock store by default, or a real MongoDB with --mongo-uri.
+    The app is wrapped in a probe that counts Mongo operations and
+    LLM/ddi-service HTTP calls per request and measures event-loop lag;
+  • this driver. It sends concurrent requests to /chat,
+    /api/patient-history, /api/check-ddi, /api/check-alerts and
+    /history/upload in the configured mix.
+
+The report gives latency percentiles per endpoint and Mongo/LLM calls per
+request. Counts include background tasks started by the request, e.g. the
+alert refresh after a history write. It also gives event-loop blocking:
+the time the server's loop could not run because a handler blocked it.
+With --isolate, each endpoint also runs alone first, so blocking can be
+attributed to it.
+
+Usage (from apps/ml-service; in-memory mode needs `pip install mongomock`):
+    python -m benchmarks.load_test --clients 16 --requests 400 --llm-latency-ms 800 --out report.json
+    python -m benchmarks.load_test --mix chat=1,check_alerts=4 --isolate --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks import seed_data
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE_PREFIX = "/__loadtest"
+REQUEST_ID_HEADER = "x-loadtest-id"
+DB_NAME = "drugnexus_loadtest"
+COLLECTIONS = {"catalog": "drugs", "meds": "prescriptions", "chat": "chatHistory", "alerts": "patientAlerts"}
+DEFAULT_MIX = "chat=3,patient_history=1,check_ddi=2,check_alerts=3,history_upload=1"
+
+
+# ─── Server side: probe around the ml-service app ─────────────────────────
+_current: contextvars.ContextVar = contextvars.ContextVar("loadtest_counts", default=None)
+
+def _count(kind: str):
+    counts = _current.get()
+    if counts is not None:
+        counts[kind] += 1
+
+
+def _install_mongo(mongo_uri: Optional[str]):
+    """Counts Mongo operations per request. Without a URI, pymongo.MongoClient
+    is replaced by an in-memory mongomock client with one shared store, before
+    the ml-service modules create their clients."""
+    import pymongo
+    if mongo_uri:
+        from pymongo import monitoring
+
+        class _Listener(monitoring.CommandListener):
+            def started(self, event):
+                if event.command_name not in ("hello", "isMaster", "ismaster", "ping", "endSessions"):
+                    _count("mongo")
+            def succeeded(self, event):
+                pass
+            def failed(self, event):
+                pass
+
+        monitoring.register(_Listener())
+        return mongo_uri
+
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("In-memory mode needs mongomock (pip install mongomock), or pass --mongo-uri.")
+    from mongomock.collection import Collection
+    for name in ("find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "delete_one",
+                 "delete_many", "count_documents", "distinct", "aggregate", "find_one_and_update", "replace_one"):
+        original = getattr(Collection, name)
+        def counted(self, *args, _original=original, **kwargs):
+            _count("mongo")
+            return _original(self, *args, **kwargs)
+        setattr(Collection, name, counted)
+
+    store = mongomock.store.ServerStore()
+    class SharedMongoClient(mongomock.MongoClient):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("_store", store)
+            super().__init__(*args, **kwargs)
+    pymongo.MongoClient = SharedMongoClient
+    return "mongodb://loadtest-in-memory"
+
+
+def _install_http_counter(stub_url: str):
+    """Counts requests the ml-service makes to the stub: completions as LLM
+    calls, everything else as ddi-service calls."""
+    from requests.adapters import HTTPAdapter
+    original = HTTPAdapter.send
+    def send(self, request, *args, **kwargs):
+        if request.url.startswith(stub_url):
+            _count("llm" if request.url.endswith("/chat/completions") else "ddi")
+        return original(self, request, *args, **kwargs)
+    HTTPAdapter.send = send
+
+
+class LoopMonitor:
+    """Wakes every `interval` seconds; any extra delay is time the loop was blocked."""
+
+    def __init__(self, interval: float = 0.005, stall: float = 0.02):
+        self.interval, self.stall = interval, stall
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    async def run(self):
+        while True:
+            t = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - t - self.interval
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.stall:
+                self.stalls += 1
+                self.blocked += lag
+
+    def report(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {"blocked_ms": self.blocked * 1e3, "blocked_pct": 100 * self.blocked / wall if wall else 0.0,
+                "max_stall_ms": self.max_lag * 1e3, "stalls": self.stalls, "stall_threshold_ms": self.stall * 1e3}
+
+
+class Probe:
+    """ASGI wrapper: per-request call counts keyed by the x-loadtest-id
+    header, plus GET/POST /__loadtest/{stats,reset}."""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app, self.monitor = app, monitor
+        self.counts: Dict[str, dict] = {}
+        self.inflight = 0
+
+    async def _reply(self, send, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if scope["path"].startswith(PROBE_PREFIX):
+            if scope["path"].endswith("/reset"):
+                self.counts.clear()
+                self.monitor.reset()
+            return await self._reply(send, {"counts": self.counts, "loop": self.monitor.report(),
+                                            "inflight": self.inflight})
+
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode(), b"").decode()
+        counts = defaultdict(int)
+        token = _current.set(counts)
+        self.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+            _current.reset(token)
+            if request_id:
+                self.counts[request_id] = dict(counts)
+
+
+def serve(port: int, stub_url: str, mongo_uri: Optional[str], n_patients: int, seed: int, stall_ms: float):
+    import uvicorn
+
+    uri = _install_mongo(mongo_uri)
+    _install_http_counter(stub_url)
+    os.environ.update(MONGO_URI=uri, DB_NAME=DB_NAME, COLLECTION_NAME=COLLECTIONS["catalog"],
+                      MEDS_DB=COLLECTIONS["meds"], CHAT_DB=COLLECTIONS["chat"], ALERTS_DB=COLLECTIONS["alerts"],
+                      USER_DB="users", LLM_MODEL="stub-model", OPENROUTER_API_KEY="loadtest",
+                      OPENROUTER_API_URL=f"{stub_url}/v1/chat/completions", DDI_SERVICE_URL=stub_url)
+
+    # Seed before importing the service: the chat pipeline reads the catalog at import.
+    import pymongo
+    seed_data.seed(pymongo.MongoClient(uri)[DB_NAME], COLLECTIONS, seed_data.build(n_patients, seed))
+    import server
+
+    monitor = LoopMonitor(stall=stall_ms / 1000)
+    config = uvicorn.Config(Probe(server.app, monitor), host="127.0.0.1", port=port, log_level="warning")
+
+    async def main():
+        task = asyncio.ensure_future(monitor.run())
+        await uvicorn.Server(config).serve()
+        task.cancel()
+
+    asyncio.run(main())
+
+
+# ─── Driver side: workloads ───────────────────────────────────────────────
+def _chat(rng, data):
+    a, b = rng.sample(data["drugs"], 2)
+    question = rng.choice([f"Does {a} interact with {b}?", f"What are the common side effects of {a}?",
+                           f"Is it safe to take {a} with my current conditions?"])
+    return "POST", "/chat", {"json": {"question": question, "userId": rng.choice(data["patients"])}}
+
+def _patient_history(rng, data):
+    return "POST", "/api/patient-history", {"json": {"patientId": rng.choice(data["patients"]),
+                                                     "notes": seed_data.note_text(rng)}}
+
+def _check_ddi(rng, data):
+    meds = [{"name": n, "dosage": "10mg", "frequency": "daily"} for n in rng.sample(data["drugs"], rng.randint(2, 5))]
+    body = {"patientId": rng.choice(data["patients"]), "medications": meds, "age": rng.randint(18, 90),
+            "gender": rng.choice(["male", "female"])}
+    if rng.random() < 0.5:
+        body["conditions"] = rng.sample(seed_data.CONDITIONS, 2)
+        body["allergies"] = rng.sample(seed_data.ALLERGIES, 1)
+    return "POST", "/api/check-ddi", {"json": body}
+
+def _check_alerts(rng, data):
+    return "GET", "/api/check-alerts", {"params": {"patientId": rng.choice(data["patients"])}}
+
+def _history_upload(rng, data):
+    text = seed_data.history_text(rng).encode("utf-8")
+    return "POST", "/history/upload", {"params": {"userId": rng.choice(data["patients"])},
+                                       "files": [("files", ("history.txt", text, "text/plain"))]}
+
+WORKLOADS = {
+    "chat": _chat,
+    "patient_history": _patient_history,
+    "check_ddi": _check_ddi,
+    "check_alerts": _check_alerts,
+    "history_upload": _history_upload,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in WORKLOADS:
+            raise SystemExit(f"Unknown workload {name!r}; choose from {', '.join(WORKLOADS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def plan(mix: Dict[str, float], n: int, data: dict, rng: random.Random) -> List[tuple]:
+    names = list(mix)
+    picks = rng.choices(names, weights=[mix[k] for k in names], k=n)
+    return [(f"r{i}", name, *WORKLOADS[name](rng, data)) for i, name in enumerate(picks)]
+
+
+async def _drive(base_url: str, requests: List[tuple], clients: int, timeout: float) -> List[dict]:
+    import httpx
+
+    queue = list(reversed(requests))
+    results = []
+
+    async def client(http):
+        while queue:
+            request_id, name, method, path, kwargs = queue.pop()
+            start = time.perf_counter()
+            try:
+                res = await http.request(method, path, headers={REQUEST_ID_HEADER: request_id}, **kwargs)
+                status = res.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            results.append({"id": request_id, "endpoint": name, "status": status,
+                            "latency": time.perf_counter() - start})
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+    return results
+
+
+def _probe(base_url: str, path: str = "stats") -> dict:
+    import httpx
+    return httpx.post(f"{base_url}{PROBE_PREFIX}/{path}", timeout=10).json()
+
+def _wait_idle(base_url: str, timeout: float = 300) -> dict:
+    """Stats once background tasks have finished."""
+    deadline = time.time() + timeout
+    stats = _probe(base_url)
+    while stats["inflight"] and time.time() < deadline:
+        time.sleep(0.2)
+        stats = _probe(base_url)
+    return stats
+
+
+def summarize(results: List[dict], stats: dict, wall: float) -> dict:
+    by_endpoint = defaultdict(list)
+    for r in results:
+        by_endpoint[r["endpoint"]].append(r)
+    endpoints = {}
+    for name, rows in sorted(by_endpoint.items()):
+        ms = np.array([r["latency"] for r in rows]) * 1e3
+        counts = [stats["counts"].get(r["id"], {}) for r in rows]
+        errors = sum(1 for r in rows if not isinstance(r["status"], int) or r["status"] >= 400)
+        endpoints[name] = {
+            "requests": len(rows), "errors": errors,
+            "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max()),
+            "mongo_per_request": float(np.mean([c.get("mongo", 0) for c in counts])),
+            "llm_per_request": float(np.mean([c.get("llm", 0) for c in counts])),
+            "ddi_per_request": float(np.mean([c.get("ddi", 0) for c in counts])),
+        }
+    return {"wall_s": wall, "throughput_rps": len(results) / wall if wall else 0.0,
+            "event_loop": stats["loop"], "endpoints": endpoints}
+
+
+def run_phase(base_url: str, stub_url: str, requests: List[tuple], clients: int, timeout: float) -> dict:
+    import httpx
+    _probe(base_url, "reset")
+    httpx.post(f"{stub_url}/stats/reset", timeout=10)
+    start = time.perf_counter()
+    results = asyncio.run(_drive(base_url, requests, clients, timeout))
+    wall = time.perf_counter() - start
+    report = summarize(results, _wait_idle(base_url), wall)
+    report["llm_stub_calls"] = httpx.get(f"{stub_url}/stats", timeout=10).json()
+    return report
+
+
+def _print_phase(name: str, report: dict):
+    loop = report["event_loop"]
+    print(f"\n── {name}: {report['throughput_rps']:.1f} req/s, event loop blocked {loop['blocked_ms']:.0f} ms "
+          f"({loop['blocked_pct']:.1f}%), max stall {loop['max_stall_ms']:.0f} ms, {loop['stalls']} stalls")
+    print(f"{'endpoint':<16} {'n':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  {'mongo':>6} {'llm':>5} {'ddi':>5}")
+    for ep, r in report["endpoints"].items():
+        print(f"{ep:<16} {r['requests']:>5} {r['errors']:>4} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['max_ms']:>8.0f}  {r['mongo_per_request']:>6.1f} "
+              f"{r['llm_per_request']:>5.1f} {r['ddi_per_request']:>5.1f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_http(url: str, proc: subprocess.Popen, timeout: float = 120):
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{proc.args[2]} exited with status {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the ml-service")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per phase")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="workload=weight,... from: " + ", ".join(WORKLOADS))
+    parser.add_argument("--isolate", action="store_true", help="also run each workload alone before the mix")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--kind-latency", nargs="*", default=[], metavar="KIND=MS",
+                        help="per prompt kind LLM latency, e.g. structuring=2500")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--ddi-latency-ms", type=float, default=30)
+    parser.add_argument("--mongo-uri", default=None, help=f"real MongoDB (the {DB_NAME} database is replaced)")
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stall-ms", type=float, default=20, help="event-loop lag counted as blocking")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request (s)")
+    parser.add_argument("--server-log", default=None, help="file for the ml-service output")
+    parser.add_argument("--out", default=None, help="JSON report")
+    # internal: run the instrumented ml-service
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.stub_url, args.mongo_uri, args.patients, args.seed, args.stall_ms)
+        return
+
+    mix = parse_mix(args.mix)
+    stub_port, app_port = _free_port(), _free_port()
+    stub_url, base_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    stub_cmd = [sys.executable, "-m", "benchmarks.llm_stub", "--port", str(stub_port),
+                "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+                "--ddi-latency-ms", str(args.ddi_latency_ms), "--error-rate", str(args.llm_error_rate),
+                "--seed", str(args.seed), "--kind-latency", *args.kind_latency]
+    app_cmd = [sys.executable, "-m", "benchmarks.load_test", "--serve", str(app_port), "--stub-url", stub_url,
+               "--patients", str(args.patients), "--seed", str(args.seed), "--stall-ms", str(args.stall_ms)]
+    if args.mongo_uri:
+        app_cmd += ["--mongo-uri", args.mongo_uri]
+
+    procs = []
+    try:
+        procs.append(subprocess.Popen(stub_cmd, cwd=SERVICE_DIR))
+        _wait_http(f"{stub_url}/stats", procs[-1])
+        procs.append(subprocess.Popen(app_cmd, cwd=SERVICE_DIR, stdout=log, stderr=subprocess.STDOUT))
+        _wait_http(f"{base_url}{PROBE_PREFIX}/stats", procs[-1])
+
+        data = seed_data.build(args.patients, args.seed)
+        rng = random.Random(args.seed)
+        phases = [(name, {name: 1.0}) for name in mix] if args.isolate else []
+        phases.append(("mixed", mix))
+
+        report = {"config": {k: v for k, v in vars(args).items() if k not in ("serve", "stub_url")}, "phases": {}}
+        for name, phase_mix in phases:
+            phase = run_phase(base_url, stub_url, plan(phase_mix, args.requests, data, rng), args.clients, args.timeout)
+            report["phases"][name] = phase
+            _print_phase(name, phase)
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
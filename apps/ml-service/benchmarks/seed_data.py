@@ -0,0 +1,160 @@
+"""
+Synthetic data for the ml-service load test (benchmarks/load_test.py).
+
+A small drug catalog with curated interactions, and patients with
+consultation notes, structured summaries, medications and uploaded-history
+summaries. Nothing is real: names, identifiers and interactions are drawn
+with a fixed seed, so every run sees the same data.
+
+Seed a local MongoDB directly with:
+    python -m benchmarks.seed_data --mongo-uri mongodb://localhost:27017 --db drugnexus_loadtest
+"""
+import argparse
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+# name, SMILES
+DRUGS = [
+    ("Aspirin", "CC(=O)OC1=CC=CC=C1C(=O)O"),
+    ("Warfarin", "CC(=O)CC(C1=CC=CC=C1)C1=C(O)C2=CC=CC=C2OC1=O"),
+    ("Ibuprofen", "CC(C)CC1=CC=C(C=C1)C(C)C(=O)O"),
+    ("Paracetamol", "CC(=O)NC1=CC=C(O)C=C1"),
+    ("Metformin", "CN(C)C(=N)N=C(N)N"),
+    ("Lisinopril", "NCCCCC(NC(CCC1=CC=CC=C1)C(=O)O)C(=O)N1CCCC1C(=O)O"),
+    ("Atorvastatin", "CC(C)C1=C(C(=O)NC2=CC=CC=C2)C(=C(N1CCC(O)CC(O)CC(=O)O)C1=CC=C(F)C=C1)C1=CC=CC=C1"),
+    ("Simvastatin", "CCC(C)(C)C(=O)OC1CC(C)C=C2C=CC(C)C(CCC3CC(O)CC(=O)O3)C12"),
+    ("Amiodarone", "CCCCC1=C(C2=CC=CC=C2O1)C(=O)C1=CC(I)=C(OCCN(CC)CC)C(I)=C1"),
+    ("Digoxin", "CC1OC(CC(O)C1O)OC1C(O)CC(OC2C(O)CC(OC3CCC4(C)C(CCC5C4CC(O)C4(C)C(CCC45O)C4=CC(=O)OC4)C3)OC2C)OC1C"),
+    ("Clopidogrel", "COC(=O)C(N1CCC2=C(C1)C=CS2)C1=CC=CC=C1Cl"),
+    ("Omeprazole", "COC1=CC2=C(C=C1)N=C(N2)S(=O)CC1=NC=C(C)C(OC)=C1C"),
+    ("Fluoxetine", "CNCCC(OC1=CC=C(C=C1)C(F)(F)F)C1=CC=CC=C1"),
+    ("Tramadol", "CN(C)CC1CCCCC1(O)C1=CC(OC)=CC=C1"),
+    ("Sertraline", "CNC1CCC(C2=CC=CC=C12)C1=CC(Cl)=C(Cl)C=C1"),
+    ("Ciprofloxacin", "OC(=O)C1=CN(C2CC2)C2=CC(N3CCNCC3)=C(F)C=C2C1=O"),
+    ("Theophylline", "CN1C2=C(NC=N2)C(=O)N(C)C1=O"),
+    ("Amlodipine", "CCOC(=O)C1=C(COCCN)NC(C)=C(C1C1=CC=CC=C1Cl)C(=O)OC"),
+    ("Levothyroxine", "NC(CC1=CC(I)=C(OC2=CC(I)=C(O)C(I)=C2)C(I)=C1)C(=O)O"),
+    ("Prednisone", "CC12CC(=O)C3C(CCC4=CC(=O)C=CC34C)C1CCC2(O)C(=O)CO"),
+    ("Spironolactone", "CC(=O)SC1CC2=CC(=O)CCC2(C)C2CCC3(C)C(CCC34CCC(=O)O4)C12"),
+    ("Allopurinol", "O=C1NC=NC2=C1C=NN2"),
+    ("Methotrexate", "CN(CC1=CN=C2N=C(N)N=C(N)C2=N1)C1=CC=C(C=C1)C(=O)NC(CCC(=O)O)C(=O)O"),
+    ("Lithium carbonate", "[Li+].[Li+].[O-]C([O-])=O"),
+]
+# Catalog drugs without SMILES, so screening has unresolved names too.
+DRUGS_WITHOUT_SMILES = ["Herbal supplement", "Vitamin D3", "Fish oil"]
+
+CONDITIONS = ["hypertension", "type 2 diabetes", "asthma", "atrial fibrillation", "chronic kidney disease",
+              "depression", "gout", "hypothyroidism", "peptic ulcer", "osteoarthritis", "migraine", "heart failure"]
+ALLERGIES = ["penicillin", "sulfa drugs", "latex", "codeine"]
+FIRST_NAMES = ["John", "Maria", "Wei", "Aisha", "Carlos", "Emma", "Noah", "Fatima", "Liam", "Olga"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Khan", "Silva", "Johnson", "Brown", "Ivanova", "Okafor", "Nguyen"]
+NOTE_TEMPLATES = [
+    "Patient seen for follow-up of {condition}. Continues {drug1} {dose}. Started {drug2}. BP stable.",
+    "Reports worsening {condition}. {drug1} discontinued due to side effects; {drug2} {dose} twice daily.",
+    "{condition} has returned. Restarted {drug1} {dose}. Advised to continue {drug2}.",
+    "Routine review. {condition} resolved. Continue {drug1} {dose} and {drug2}. Allergic to {allergy}.",
+]
+DOSES = ["5mg", "10mg", "20mg", "50mg", "100mg", "500mg"]
+HISTORY_TEMPLATE = (
+    "Name: {name}\nDOB: {dob}\nPhone: 555{phone}\n\nHistory of {cond1} and {cond2}. Current medications: "
+    "{drug1} {dose} daily, {drug2} as needed. Allergies: {allergy}.\n"
+)
+
+
+def _catalog(rng: random.Random) -> List[dict]:
+    docs = []
+    names = [n for n, _ in DRUGS]
+    for name, smiles in DRUGS:
+        partners = rng.sample([n for n in names if n != name], 3)
+        docs.append({
+            "name": name,
+            "smiles": smiles,
+            "interactions": [{"name": p, "description": f"{name} may increase the adverse effects of {p}."}
+                             for p in partners],
+        })
+    docs += [{"name": name, "interactions": []} for name in DRUGS_WITHOUT_SMILES]
+    return docs
+
+
+def note_text(rng: random.Random) -> str:
+    drug1, drug2 = rng.sample([n for n, _ in DRUGS], 2)
+    return rng.choice(NOTE_TEMPLATES).format(condition=rng.choice(CONDITIONS), drug1=drug1, drug2=drug2,
+                                             dose=rng.choice(DOSES), allergy=rng.choice(ALLERGIES))
+
+def history_text(rng: random.Random) -> str:
+    drug1, drug2 = rng.sample([n for n, _ in DRUGS], 2)
+    cond1, cond2 = rng.sample(CONDITIONS, 2)
+    return HISTORY_TEMPLATE.format(name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                   dob=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/19{rng.randint(40, 99)}",
+                                   phone=rng.randint(10**6, 10**7 - 1), cond1=cond1, cond2=cond2,
+                                   drug1=drug1, drug2=drug2, dose=rng.choice(DOSES), allergy=rng.choice(ALLERGIES))
+
+
+def _patient(rng: random.Random, patient_id: str, start: datetime):
+    meds = [{"name": n, "dosage": rng.choice(DOSES), "frequency": "Once daily", "duration": "ongoing",
+             "status": "active"} for n, _ in rng.sample(DRUGS, rng.randint(2, 5))]
+    notes = []
+    for i in range(rng.randint(1, 6)):
+        created = (start + timedelta(days=30 * i)).isoformat()
+        text = note_text(rng)
+        current = rng.sample(CONDITIONS, rng.randint(1, 3))
+        notes.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "createdAt": created,
+            "rawText": text,
+            "summary": text,
+            "structured": {
+                "summary": text,
+                "conditions": {"current": current, "past": rng.sample(CONDITIONS, 1)},
+                "medications": meds,
+                "allergies": rng.sample(ALLERGIES, rng.randint(0, 1)),
+            },
+        })
+    prescription = {"patient": patient_id, "source": "notes", "createdAt": notes[-1]["createdAt"],
+                    "consultationNotes": notes, "medicines": meds}
+    history = {"userId": patient_id, "uploadedAt": start, "rawText": history_text(rng),
+               "cleanedText": "", "summary": notes[-1]["summary"], "isSafe": True, "removedPersonal": []}
+    return prescription, history
+
+
+def build(n_patients: int = 50, seed: int = 42) -> dict:
+    """Catalog, prescription and chat-history documents plus the patient ids."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    patients = [f"loadtest-patient-{i:04d}" for i in range(n_patients)]
+    prescriptions, histories = [], []
+    for pid in patients:
+        prescription, history = _patient(rng, pid, start)
+        prescriptions.append(prescription)
+        histories.append(history)
+    return {"catalog": _catalog(rng), "prescriptions": prescriptions, "histories": histories,
+            "patients": patients, "drugs": [n for n, _ in DRUGS] + DRUGS_WITHOUT_SMILES}
+
+
+def seed(db, names: dict, data: dict):
+    """Replaces the load-test collections in `db` with `data`. `names` maps
+    catalog/meds/chat/alerts to collection names."""
+    for key in ("catalog", "meds", "chat", "alerts"):
+        db[names[key]].drop()
+    db[names["catalog"]].insert_many([dict(d) for d in data["catalog"]])
+    db[names["meds"]].insert_many([dict(d) for d in data["prescriptions"]])
+    db[names["chat"]].insert_many([dict(d) for d in data["histories"]])
+    db[names["alerts"]].create_index("patient", unique=True)
+
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Seed MongoDB with synthetic load-test data")
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--db", default="drugnexus_loadtest")
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = build(args.patients, args.seed)
+    names = {"catalog": "drugs", "meds": "prescriptions", "chat": "chatHistory", "alerts": "patientAlerts"}
+    seed(MongoClient(args.mongo_uri)[args.db], names, data)
+    print(f"✅ Seeded {args.db}: {len(data['catalog'])} drugs, {len(data['patients'])} patients")
@@ -13,5 +13,20 @@ LLM_MODEL = os.getenv("LLM_MODEL")
 CHAT_DB = os.getenv("CHAT_DB")
 MEDS_DB = os.getenv("MEDS_DB")
 USER_DB = os.getenv("USER_DB")
+ALERTS_DB = os.getenv("ALERTS_DB", "patientAlerts")
+ALERTS_RETRY_BASE_SECONDS = float(os.getenv("ALERTS_RETRY_BASE_SECONDS", "60"))
+ALERTS_RETRY_MAX_SECONDS = float(os.getenv("ALERTS_RETRY_MAX_SECONDS", "3600"))
+DDI_SERVICE_URL = os.getenv("DDI_SERVICE_URL", "http://localhost:9000")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-TESSERACT_CMD = os.getenv("TESSERACT_CMD")
\ No newline at end of file
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+LLM_HEALTH_URL = os.getenv("LLM_HEALTH_URL", OPENROUTER_API_URL.rsplit("/chat/completions", 1)[0] + "/models")
@@ -0,0 +1,222 @@
+"""
+Deterministic drug-drug interaction screening.
+
+Every pair of active medications is checked against the curated
+`interactions` data in the drug catalog and, for pairs with SMILES on
+both sides, against the ddi-service models in one batched request.
+The LLM is only used afterwards to phrase explanations for the pairs
+that were actually flagged.
+
+Drug-condition contraindications go through the ddi-service PDI model,
+which resolves free-text condition names locally.
+"""
+import re, json, time
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import metrics
+import tracing
+from config import DDI_SERVICE_URL
+from drugnexusaipipeline4 import collection, get_drug_record
+
+# Binary model probability above which a model-only pair is flagged.
+MODEL_THRESHOLD = 0.5
+DDI_SERVICE_TIMEOUT = 10
+
+EXPLAIN_PROMPT = '''You are a clinical pharmacist AI assistant. The following drug pairs in a patient's regimen were flagged by our interaction screening.
+For each pair write a brief, clear description of the interaction (max 100 characters) and a clear action for the doctor (max 150 characters).
+Do not add pairs, remove pairs or change the severity.
+
+FLAGGED PAIRS:
+{pairs}
+
+Return ONLY JSON in this structure:
+{{
+  "interactions": [
+    {{"drugs": ["Drug A", "Drug B"], "message": "...", "recommendation": "..."}}
+  ]
+}}'''
+
+
+# ─── Catalog lookups ──────────────────────────────────────────────────────
+def _curated_interactions(names: List[str]) -> Dict[Tuple[str, str], str]:
+    """
+    Curated descriptions for every pair of `names`, keyed by the
+    lower-cased (drug, other) pair. One catalog query for the whole list.
+    """
+    if not names:
+        return {}
+    wanted = {n.lower() for n in names}
+    patterns = [re.compile(f"^{re.escape(n)}$", re.IGNORECASE) for n in names]
+    docs = collection.find({"name": {"$in": patterns}}, {"name": 1, "interactions.name": 1, "interactions.description": 1})
+
+    found = {}
+    for doc in docs:
+        src = doc.get("name", "").lower()
+        for intr in doc.get("interactions", []):
+            other = intr.get("name", "").lower()
+            if other in wanted and other != src:
+                found.setdefault((src, other), intr.get("description"))
+    return found
+
+
+def _score_pairs(pairs: List[Tuple[str, str]]) -> Optional[List[dict]]:
+    """
+    Batched prediction from the ddi-service cascade, or None if unavailable.
+    Interaction classes are only computed for pairs at or above MODEL_THRESHOLD.
+    """
+    if not pairs:
+        return []
+    try:
+        start = time.perf_counter()
+        with tracing.span("ddi-service /predict-ddi", "client", pairs=len(pairs)):
+            res = requests.post(
+                f"{DDI_SERVICE_URL}/predict-ddi",
+                json={"pairs": [{"smiles1": a, "smiles2": b} for a, b in pairs], "top_k": 1,
+                      "threshold": MODEL_THRESHOLD},
+                headers=tracing.inject(),
+                timeout=DDI_SERVICE_TIMEOUT,
+            )
+        metrics.DDI_SERVICE_SECONDS.observe(time.perf_counter() - start, "/predict-ddi", metrics.batch_label(len(pairs)))
+        body = res.json()
+        if "error" in body:
+            print(f"DDI service error: {body['error']}")
+            return None
+        return body.get("results")
+    except Exception as e:
+        print(f"DDI service unavailable: {e}")
+        return None
+
+
+# ─── Screening ────────────────────────────────────────────────────────────
+def screen_medications(drug_names: List[str]) -> dict:
+    """
+    Screen every unordered pair of `drug_names`.
+    Returns {"flagged": [...], "unresolved": [...], "smiles": {name: smiles}, "modelsUsed": bool}.
+    """
+    names = list(dict.fromkeys(n.strip() for n in drug_names if n and n.strip()))
+    smiles = {}
+    unresolved = []
+    for name in names:
+        _, smi = get_drug_record(name)
+        if smi:
+            smiles[name] = smi
+        else:
+            unresolved.append(name)
+
+    curated = _curated_interactions(names)
+    flagged = []
+    to_score = []
+    for a, b in combinations(names, 2):
+        desc = curated.get((a.lower(), b.lower())) or curated.get((b.lower(), a.lower()))
+        if desc:
+            flagged.append({"drugs": [a, b], "severity": "major", "source": "curated", "description": desc})
+        elif a in smiles and b in smiles:
+            to_score.append((a, b))
+
+    # Both directions are scored since the models are trained on ordered pairs.
+    scored = _score_pairs([(smiles[a], smiles[b]) for a, b in to_score] +
+                          [(smiles[b], smiles[a]) for a, b in to_score])
+    models_used = scored is not None
+    if scored:
+        n = len(to_score)
+        for i, (a, b) in enumerate(to_score):
+            fwd, rev = scored[i], scored[i + n]
+            best, (drug_a, drug_b) = (fwd, (a, b)) if fwd["probability"] >= rev["probability"] else (rev, (b, a))
+            if best["probability"] < MODEL_THRESHOLD:
+                continue
+            top = best["classes"][0] if best.get("classes") else None
+            desc = top["description"] if top else "Potential interaction predicted by the DDI model."
+            flagged.append({
+                "drugs": [drug_a, drug_b],
+                "severity": "moderate",
+                "source": "model",
+                "probability": best["probability"],
+                "description": desc.replace("Drug a", drug_a).replace("Drug b", drug_b),
+            })
+
+    return {"flagged": flagged, "unresolved": unresolved, "smiles": smiles, "modelsUsed": models_used}
+
+
+
+def unscreened_pairs(drug_names: List[str], screening: dict) -> List[Tuple[str, str]]:
+    """
+    Pairs `screening` (from screen_medications) could not check: every pair
+    with a drug that has no SMILES and, if the models were unavailable,
+    every other pair. Pairs already flagged are left out.
+    """
+    names = list(dict.fromkeys(n.strip() for n in drug_names if n and n.strip()))
+    unresolved = set(screening["unresolved"])
+    flagged = {frozenset(f["drugs"]) for f in screening["flagged"]}
+    return [(a, b) for a, b in combinations(names, 2)
+            if frozenset((a, b)) not in flagged
+            and (a in unresolved or b in unresolved or not screening["modelsUsed"])]
+
+def screen_conditions(smiles_by_drug: Dict[str, str], conditions: List[str]) -> Optional[dict]:
+    """
+    Drug × condition contraindications from the PDI model. Condition names
+    are resolved to PDI condition ids by the ddi-service, so no LLM is needed
+    to normalize them. Returns None if the ddi-service/PDI model is unavailable.
+    """
+    if not smiles_by_drug or not conditions:
+        return {"flagged": [], "unresolved": list(conditions)}
+    try:
+        start = time.perf_counter()
+        with tracing.span("ddi-service /predict-pdi", "client", drugs=len(smiles_by_drug), conditions=len(conditions)):
+            res = requests.post(
+                f"{DDI_SERVICE_URL}/predict-pdi",
+                json={"drugs": [{"name": n, "smiles": s} for n, s in smiles_by_drug.items()],
+                      "conditions": conditions},
+                headers=tracing.inject(),
+                timeout=DDI_SERVICE_TIMEOUT,
+            )
+        metrics.DDI_SERVICE_SECONDS.observe(time.perf_counter() - start, "/predict-pdi",
+                                            metrics.batch_label(len(smiles_by_drug) * len(conditions)))
+        body = res.json()
+        if "error" in body:
+            print(f"PDI service error: {body['error']}")
+            return None
+    except Exception as e:
+        print(f"PDI service unavailable: {e}")
+        return None
+
+    flagged = [{"drug": r["drug"], "condition": r["condition"], "probability": r["probability"]}
+               for r in body.get("results", []) if r.get("label") == 1]
+    return {"flagged": flagged, "unresolved": body.get("unresolved_conditions", [])}
+
+
+def explain_flagged(flagged: List[dict], llm) -> List[dict]:
+    """
+    Ask the LLM to phrase message/recommendation for flagged pairs only.
+    Falls back to the screening descriptions if the LLM is unavailable.
+    """
+    interactions = [{
+        "severity": f["severity"],
+        "drugs": f["drugs"],
+        "message": f["description"],
+        "recommendation": "Review this combination and monitor the patient.",
+        "source": f["source"],
+    } for f in flagged]
+    if not flagged:
+        return interactions
+
+    pairs = "\n".join(f"{i+1}. {f['drugs'][0]} + {f['drugs'][1]} ({f['severity']}): {f['description']}"
+                      for i, f in enumerate(flagged))
+    raw = llm(EXPLAIN_PROMPT.format(pairs=pairs))
+    match = re.search(r"\{.*\}", raw or "", re.DOTALL)
+    if not match:
+        return interactions
+    try:
+        explained = json.loads(match.group()).get("interactions", [])
+    except json.JSONDecodeError:
+        return interactions
+
+    by_pair = {frozenset(d.lower() for d in e.get("drugs", [])): e for e in explained if isinstance(e, dict)}
+    for item in interactions:
+        e = by_pair.get(frozenset(d.lower() for d in item["drugs"]))
+        if e:
+            item["message"] = e.get("message") or item["message"]
+            item["recommendation"] = e.get("recommendation") or item["recommendation"]
+    return interactions
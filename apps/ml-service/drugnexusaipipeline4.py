@@ -8,6 +8,8 @@ import tempfile
 import csv
 from pathlib import Path
 
+import metrics
+import tracing
 from openrouter_config import OPENROUTER_API_URL, HEADERS, MODEL_NAME
 
 from patientHistoryCheck import get_latest_summary  
@@ -108,7 +110,7 @@ Patient history: {cleaned_history}
 '''
 
 # ─── MongoDB setup ─────────────────────────────────────────────────────────────
-client = pymongo.MongoClient(MONGO_URI)
+client = pymongo.MongoClient(MONGO_URI, event_listeners=[metrics.mongo_listener(), tracing.mongo_listener()])
 collection = client[DB_NAME][COLLECTION_NAME]
 all_docs = list(collection.find({}, {"name": 1}))
 drug_names = [d["name"] for d in all_docs if "name" in d]
@@ -181,25 +183,35 @@ def paraphrase_for_user(question: str, raw_answer: str) -> str:
         Now, please rephrase this for the user in a friendly and easy-to-understand way, **but DO NOT** add your own ideas, corrections, or medical knowledge. Just make the existing answer more understandable for a non-medical person.
         also **DO NOT** use any preamble like “Sure, here’s…” or other commentary. Just output the rewritten text.
         """
-    payload = {"model": MODEL_NAME, "messages":[{"role":"user","content":final_paraphrase_prompt}]}
-    r = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=payload)
-    return r.json()["choices"][0]["message"]["content"]
+    return _post_llm(final_paraphrase_prompt, "paraphrase")["choices"][0]["message"]["content"]
 
 # ─── LLM helper ─────────────────────────────────────────────────────────────────
-def call_llm(prompt_text: str) -> str:
+def _post_llm(prompt_text: str, site: str) -> dict:
     payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt_text}]}
-    res = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=payload)
-    return res.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+    start = time.perf_counter()
+    try:
+        res = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=payload)
+        body = res.json()
+    except Exception as e:
+        metrics.observe_llm(site, start, error=type(e).__name__)
+        raise
+    metrics.observe_llm(site, start, body, error=None if res.ok else f"http_{res.status_code}")
+    return body
+
+def call_llm(prompt_text: str, site: str = "router") -> str:
+    return _post_llm(prompt_text, site).get("choices", [{}])[0].get("message", {}).get("content", "")
 
 
 def process_single_question(user_q: str, user_id: str) -> str:
     # 1) run router
     # cleaned_history = load_cleaned_history()
-    cleaned_history = load_cleaned_history(user_id)
-    router_out = call_llm(FULL_ROUTER_PROMPT.format(
-        user_prompt=user_q,
-        cleaned_history=cleaned_history
-    ))
+    with tracing.span("chat.load_history"):
+        cleaned_history = load_cleaned_history(user_id)
+    with tracing.span("chat.router"):
+        router_out = call_llm(FULL_ROUTER_PROMPT.format(
+            user_prompt=user_q,
+            cleaned_history=cleaned_history
+        ))
     # 2) parse blocks (lifted from run_pipeline)…
     def extract_block(name):
         m = re.search(rf"\[{name}:(.*?)\]", router_out, re.DOTALL)
@@ -210,14 +222,15 @@ def process_single_question(user_q: str, user_id: str) -> str:
     current_interaction_descriptions = []
     if is_safe and ddi_prompts:
         pair_not_found = []
-        for prompt in ddi_prompts:
-            pair = extract_two_drugs(prompt)
-            if pair:
-                desc = lookup_interaction(*pair)
-                if desc is None:
-                    current_interaction_descriptions.append(f"no information about this interaction between {pair[0]} and {pair[1]} found in the database")
-                else:
-                    current_interaction_descriptions.append(desc)
+        with tracing.span("chat.ddi_lookup", prompts=len(ddi_prompts)):
+            for prompt in ddi_prompts:
+                pair = extract_two_drugs(prompt)
+                if pair:
+                    desc = lookup_interaction(*pair)
+                    if desc is None:
+                        current_interaction_descriptions.append(f"no information about this interaction between {pair[0]} and {pair[1]} found in the database")
+                    else:
+                        current_interaction_descriptions.append(desc)
 
     history_check = extract_block("history_check_summary") or ""
     general_output = extract_block("output") or ""
@@ -234,5 +247,6 @@ def process_single_question(user_q: str, user_id: str) -> str:
 
     # 4) paraphrase
     if merged:
-        return paraphrase_for_user(user_q, merged).strip()
+        with tracing.span("chat.paraphrase"):
+            return paraphrase_for_user(user_q, merged).strip()
     return ""
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Cached dependency health for the ml-service.
+
+A background thread checks every dependency each HEALTH_CHECK_INTERVAL
+seconds: MongoDB with a `ping`, and the LLM provider with a GET of its
+model list (LLM_HEALTH_URL), which is free, unlike a completion. Each
+check is bounded by HEALTH_CHECK_TIMEOUT. The results and the time of
+each check are cached, so /health and /ready only read memory.
+
+A dependency counts as up when its last check passed and is not stale
+(older than STALE_AFTER check intervals).
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from config import HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TIMEOUT, LLM_HEALTH_URL
+
+STALE_AFTER = 3
+
+
+def check_mongo(client) -> str:
+    import pymongo
+    with pymongo.timeout(HEALTH_CHECK_TIMEOUT):
+        client.admin.command("ping")
+    return "connected"
+
+def check_llm(headers: dict) -> str:
+    res = requests.get(LLM_HEALTH_URL, headers=headers, timeout=HEALTH_CHECK_TIMEOUT)
+    res.raise_for_status()
+    return "connected"
+
+
+class HealthMonitor:
+    """Runs `checks` ({name: callable returning a status string or
+    raising}) periodically and keeps the last result of each."""
+
+    def __init__(self, checks: Dict[str, Callable[[], str]], interval: float = HEALTH_CHECK_INTERVAL):
+        self.checks = checks
+        self.interval = interval
+        self._results: Dict[str, dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_now()
+            self._stop.wait(self.interval)
+
+    def check_now(self):
+        for name, check in self.checks.items():
+            start = time.perf_counter()
+            try:
+                result = {"ok": True, "status": check()}
+            except Exception as e:
+                result = {"ok": False, "status": f"error: {e}"}
+            result["latencyMs"] = round((time.perf_counter() - start) * 1000, 1)
+            result["checkedAt"] = datetime.now(timezone.utc).isoformat()
+            result["_checked"] = time.monotonic()
+            # replaced whole, so readers never see a half-updated entry
+            self._results = {**self._results, name: result}
+
+    def _up(self, result: Optional[dict], now: float) -> bool:
+        return (result is not None and result["ok"]
+                and now - result["_checked"] <= STALE_AFTER * self.interval + HEALTH_CHECK_TIMEOUT)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Last result per dependency: status, up, latencyMs, checkedAt."""
+        now, results = time.monotonic(), self._results
+        return {name: {"status": r["status"], "up": self._up(r, now), "latencyMs": r["latencyMs"],
+                       "checkedAt": r["checkedAt"]} if r else {"status": "not checked yet", "up": False}
+                for name, r in ((name, results.get(name)) for name in self.checks)}
+
+    def ready(self) -> Tuple[bool, Dict[str, dict]]:
+        deps = self.snapshot()
+        return all(d["up"] for d in deps.values()), deps
+
+    def metrics_collector(self):
+        yield ("dependency_up", "gauge", "1 if the dependency passed its last (non-stale) health check",
+               [({"dependency": name}, 1.0 if d["up"] else 0.0) for name, d in self.snapshot().items()])
@@ -0,0 +1,43 @@
+"""
+Prometheus metrics for the ml-service, served as text by GET /metrics.
+
+The registry, metric types and HTTP/Mongo latency are shared with the
+ddi-service in the observability package (packages/observability); this
+module adds the ml-service metrics. LLM calls are recorded per call site
+(router, paraphrase, structuring, alerts, pii_filter, ...) with latency,
+token usage and errors; observe_llm() also records each call as a trace
+span (tracing.py).
+"""
+import time
+from typing import Optional
+
+import tracing
+from observability.metrics import (
+    Counter, Histogram, MetricsMiddleware, MONGO_SECONDS, REQUEST_SECONDS, batch_label, mongo_listener,
+    register_collector, render,
+)
+
+# ─── Service Metrics ──────────────────────────────────────────────────────
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "LLM completion latency by call site", ("site", "outcome"),
+                        buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 90.0))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens reported by the provider, by call site", ("site", "kind"))
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM calls by call site and reason", ("site", "reason"))
+DDI_SERVICE_SECONDS = Histogram("ddi_service_request_duration_seconds", "ddi-service call latency by endpoint and batch size",
+                                ("endpoint", "batch_size"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+
+
+def observe_llm(site: str, start: float, body: Optional[dict] = None, error: Optional[str] = None):
+    """Latency, token usage and failures of one LLM call made at `site`,
+    also recorded as a trace span."""
+    LLM_SECONDS.observe(time.perf_counter() - start, site, "error" if error else "ok")
+    if error:
+        LLM_ERRORS.inc(site, error)
+    usage = (body or {}).get("usage") or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(site, kind.split("_")[0], amount=usage[kind])
+    tracing.record(f"llm {site}", start, error, "client", **{
+        "llm.site": site, "llm.model": (body or {}).get("model"),
+        "llm.prompt_tokens": usage.get("prompt_tokens"), "llm.completion_tokens": usage.get("completion_tokens")})
+
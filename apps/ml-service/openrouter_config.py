@@ -1,9 +1,35 @@
-from config import OPENROUTER_API_KEY, LLM_MODEL
+import time
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+import requests
+
+import metrics
+from config import OPENROUTER_API_KEY, OPENROUTER_API_URL, LLM_MODEL
 
 HEADERS = {
     "Content-Type": "application/json",
     "Authorization": f"Bearer {OPENROUTER_API_KEY}"
 }
-MODEL_NAME = LLM_MODEL
\ No newline at end of file
+MODEL_NAME = LLM_MODEL
+
+
+def call_llm(prompt_text: str, site: str = "other") -> str:
+    start = time.perf_counter()
+    try:
+        payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt_text}]}
+        res = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=payload, timeout=30)
+        res.raise_for_status()
+        body = res.json()
+        metrics.observe_llm(site, start, body)
+        return body.get("choices", [{}])[0].get("message", {}).get("content", "")
+    except requests.exceptions.Timeout:
+        metrics.observe_llm(site, start, error="timeout")
+        print("LLM API timeout - using fallback")
+        return ""
+    except requests.exceptions.RequestException as e:
+        metrics.observe_llm(site, start, error=type(e).__name__)
+        print(f"LLM API error: {e} - using fallback")
+        return ""
+    except Exception as e:
+        metrics.observe_llm(site, start, error=type(e).__name__)
+        print(f"Unexpected LLM error: {e} - using fallback")
+        return ""
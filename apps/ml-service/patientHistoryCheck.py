@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, datetime, requests, uuid
+import os, datetime, requests, uuid, time
 from pathlib import Path
 from typing import Tuple, List
 from config import MONGO_URI, DB_NAME, CHAT_DB
@@ -19,9 +19,11 @@ load_dotenv()
 #pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD", "/usr/bin/tesseract")
 
 
+import metrics
+import tracing
 from openrouter_config import OPENROUTER_API_URL, HEADERS, MODEL_NAME
 
-mongo_client = MongoClient(MONGO_URI)
+mongo_client = MongoClient(MONGO_URI, event_listeners=[metrics.mongo_listener(), tracing.mongo_listener()])
 chatbot_history_collection = mongo_client[DB_NAME][CHAT_DB]
 
 # ─── prompts ──────────────────────────────────────────────────────────────
@@ -59,14 +61,19 @@ Summary:
 '''
 
 # ─── OpenRouter helper ────────────────────────────────────────────────────
-def call_openrouter(prompt: str) -> str:
+def call_openrouter(prompt: str, site: str = "pii_filter") -> str:
     payload = {"model": MODEL_NAME,
                "messages": [{"role": "user", "content": prompt}]}
+    start = time.perf_counter()
     try:
         r = requests.post(OPENROUTER_API_URL, headers=HEADERS, json=payload, timeout=90)
-        return r.json()["choices"][0]["message"]["content"]
+        body = r.json()
+        content = body["choices"][0]["message"]["content"]
     except Exception as e:
+        metrics.observe_llm(site, start, error=type(e).__name__)
         return ""
+    metrics.observe_llm(site, start, body)
+    return content
 
 # ─── text-extraction helpers ─────────────────────────────────────────────
 def _txt(path):      return open(path, "r", encoding="utf-8", errors="ignore").read()
@@ -160,7 +167,8 @@ def ingest_file(file_path: str | Path, user_id: str) -> str:
     if not p.exists():
         raise FileNotFoundError(p)
 
-    raw_text = extract_text(str(p))
+    with tracing.span("history.extract_text", suffix=p.suffix.lower()):
+        raw_text = extract_text(str(p))
     if not raw_text.strip():
         raise ValueError(f"Unable to extract text from {p}")
 
@@ -171,7 +179,7 @@ def ingest_file(file_path: str | Path, user_id: str) -> str:
         raise ValueError("Safety filter failed or produced empty history.")
 
     # 2️⃣ Summarise
-    summary = call_openrouter(PATIENT_SUMMARY_PROMPT.format(cleaned_history=cleaned_hist)).strip()
+    summary = call_openrouter(PATIENT_SUMMARY_PROMPT.format(cleaned_history=cleaned_hist), "summary").strip()
     
     if not summary:
         summary = cleaned_hist  # fallback to full cleaned text
@@ -0,0 +1,18 @@
+"""
+Opt-in sampling profiler for production requests, off unless PROFILE_DIR
+is set.
+
+The profiler is shared with the ddi-service in the observability package
+(packages/observability); this module configures it for the ml-service.
+ProfilingMiddleware profiles a request sent with "X-Profile: 1" and a valid
+X-Admin-Token, or one request in every PROFILE_SAMPLE_EVERY, and keeps the
+samples of threads running its endpoint function. For the async endpoints
+that run blocking LLM and Mongo calls inline (/api/patient-history, /chat)
+that is the event-loop thread. profile_process(seconds) samples every busy
+thread instead.
+"""
+from config import PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, ADMIN_TOKEN
+from observability import profiling as _profiling
+from observability.profiling import ProfilingMiddleware, enabled, list_profiles, profile_process, read_profile
+
+_profiling.configure(PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, ADMIN_TOKEN)
@@ -0,0 +1,32 @@
+"""
+Request tracing for the ml-service with W3C trace context (`traceparent`).
+
+The implementation is shared with the ddi-service in the observability
+package (packages/observability); this module configures it for the
+ml-service. TracingMiddleware continues the trace of an incoming
+`traceparent` header (the api-gateway sends one) or starts a new one.
+Pipeline stages open child spans with span(), LLM calls are recorded by
+metrics.observe_llm() through record(), Mongo commands by mongo_listener(),
+and calls to the ddi-service carry the context with inject() so its spans
+join the same trace.
+
+Spans go to TRACE_EXPORT (a file or an OTLP/HTTP URL); with it unset no
+spans are created. Break a trace file (all services can append to the same
+one) down with:
+    python -m tracing traces.jsonl --slowest 5
+    python -m tracing traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+from config import TRACE_EXPORT, TRACE_SAMPLE_RATE
+from observability import tracing as _tracing
+from observability.tracing import (
+    SpanContext, TracingMiddleware, enabled, format_trace, format_traceparent, inject, load_spans, main,
+    mongo_listener, parse_traceparent, record, span,
+)
+
+SERVICE_NAME = "ml-service"
+
+_tracing.configure(SERVICE_NAME, TRACE_EXPORT, TRACE_SAMPLE_RATE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Metrics, tracing and profiling shared by the DrugNexus Python services
+(apps/ml-service and apps/ddi-service). Each service keeps thin metrics.py,
+tracing.py and profiling.py modules that configure these and add its own
+metrics and hooks.
+"""
@@ -0,0 +1,226 @@
+"""
+Prometheus metrics shared by the ml-service and the ddi-service, rendered
+as text for their GET /metrics endpoints. Each service defines its own
+metrics in its metrics.py; HTTP request and Mongo command latency are
+defined here.
+
+Recording is lock-free on the hot path: every thread writes into its own
+shard of each metric (plain lists keyed by label values), and a scrape sums
+the shards. The only lock is taken the first time a thread records to a
+metric. Gauges that already exist elsewhere (cache statistics, dependency
+health) are read by collectors at scrape time instead of being updated per
+request.
+
+Samples recorded in another process (the ddi-service worker pool) are
+captured there with begin_capture()/end_capture() and replayed here.
+
+    REQUEST_SECONDS.observe(0.012, "/predict-ddi", "POST", "200")
+    register_collector(lambda: [("name", "gauge", "help", [({"cache": "x"}, 1.0)])])
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: Dict[str, "_Metric"] = {}
+_collectors: List[Callable[[], Iterable[tuple]]] = []
+_capture: Optional[list] = None  # set inside pool workers while a call runs
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> Dict[tuple, list]:
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for key, row in list(shard.items()):
+                total = merged.get(key)
+                merged[key] = list(row) if total is None else [a + b for a, b in zip(total, row)]
+        return merged
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        if _capture is not None:
+            _capture.append((self.name, labels, amount))
+            return
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = [0.0]
+        row[0] += amount
+
+    _record = inc
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labels, key)} {row[0]}" for key, row in sorted(self._merged().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        if _capture is not None:
+            _capture.append((self.name, labels, value))
+            return
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # per-bucket counts, the +Inf bucket, then the sum
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def _record(self, *labels: str, amount: float):
+        self.observe(amount, *labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, row in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else f"{bound:g}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {row[-1]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+def register_collector(collect: Callable[[], Iterable[tuple]]):
+    """`collect()` yields (name, type, help, [(labels dict, value), ...]) at
+    scrape time."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_registry.values()):
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+        lines += metric.render()
+    for collect in list(_collectors):
+        try:
+            families = list(collect())
+        except Exception as e:
+            print(f"Warning: metrics collector failed: {e}")
+            continue
+        for name, kind, help, samples in families:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def batch_label(n: int) -> str:
+    """Batch size rounded up to a power of two, to keep label cardinality low."""
+    return "0" if n <= 0 else str(1 << (n - 1).bit_length())
+
+
+# ─── Worker Pool Forwarding ───────────────────────────────────────────────
+def begin_capture():
+    global _capture
+    _capture = []
+
+def end_capture() -> list:
+    global _capture
+    captured, _capture = _capture or [], None
+    return captured
+
+def replay(samples: list):
+    for name, labels, value in samples:
+        metric = _registry.get(name)
+        if metric is not None:
+            metric._record(*labels, amount=value)
+
+
+# ─── HTTP & Mongo Metrics ─────────────────────────────────────────────────
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                            ("route", "method", "status"))
+MONGO_SECONDS = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ("command", "outcome"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its last body chunk is
+    sent, so background tasks are not counted."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [None]
+
+        def record(code: str):
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, getattr(route, "path", "unmatched"), scope["method"], code)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                record(status[0])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if status[0] is None:
+                record("500")
+            raise
+
+
+def mongo_listener():
+    """pymongo CommandListener timing every command; pass it to
+    MongoClient(event_listeners=[...])."""
+    from pymongo import monitoring
+
+    class _MongoListener(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            MONGO_SECONDS.observe(event.duration_micros / 1e6, event.command_name, "ok")
+
+        def failed(self, event):
+            MONGO_SECONDS.observe(event.duration_micros / 1e6, event.command_name, "error")
+
+    return _MongoListener()
@@ -0,0 +1,232 @@
+"""
+Opt-in sampling profiler for production requests, shared by the ml-service
+and the ddi-service. Each service calls configure() from its own
+profiling.py with its PROFILE_* and ADMIN_TOKEN settings; it stays off
+while the profile directory is empty.
+
+ProfilingMiddleware profiles a request sent with "X-Profile: 1" and a valid
+X-Admin-Token, or one request in every PROFILE_SAMPLE_EVERY. While a
+profile runs, a sampler thread reads every thread's stack
+(sys._current_frames) every PROFILE_INTERVAL_MS. A request keeps the
+samples of threads executing its endpoint function, so concurrent requests
+to the same endpoint share samples. profile_process(seconds) samples every
+busy thread instead.
+
+Profiles go to PROFILE_DIR as collapsed stacks, one "root;...;leaf count"
+line per stack. flamegraph.pl, speedscope and inferno read this format.
+Only the newest PROFILE_MAX_FILES are kept, and a profiled response names
+its file in X-Profile-Id. With PROFILE_DIR empty the middleware is not
+installed and no sampler thread exists.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+from typing import List, Optional
+
+# Settings, set by configure()
+PROFILE_DIR = ""
+PROFILE_SAMPLE_EVERY = 0
+PROFILE_INTERVAL_MS = 5.0
+PROFILE_MAX_FILES = 200
+ADMIN_TOKEN = ""
+
+# Innermost frames of threads that are waiting, not working; skipped in
+# whole-process profiles
+_IDLE = {("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("selectors.py", "select"),
+         ("queue.py", "get"), ("thread.py", "_worker"), ("connection.py", "_recv"), ("pool.py", "worker"),
+         ("periodic_executor.py", "_run")}
+
+
+def configure(profile_dir: str, sample_every: int = 0, interval_ms: float = 5.0, max_files: int = 200,
+              admin_token: str = ""):
+    """Sets where profiles go, the 1-in-N request sampling, the sampling
+    interval, how many profiles are kept and the token X-Profile needs;
+    call once at import."""
+    global PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, ADMIN_TOKEN
+    PROFILE_DIR, PROFILE_SAMPLE_EVERY, PROFILE_INTERVAL_MS = profile_dir, sample_every, interval_ms
+    PROFILE_MAX_FILES, ADMIN_TOKEN = max_files, admin_token
+
+
+def enabled() -> bool:
+    return bool(PROFILE_DIR)
+
+
+class _Session:
+    """Stacks collected for one profile: of every busy thread for a
+    whole-process profile (scope None), else of the threads running the
+    endpoint of the request `scope`."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.endpoint = None
+        self.caller = threading.get_ident()  # skipped: it only waits for the profile
+        self.stacks = Counter()
+        self.samples = 0
+
+    def matches(self, ident: int, codes: list) -> bool:
+        if self.scope is None:
+            if ident == self.caller:
+                return False
+            leaf = codes[-1]
+            return (os.path.basename(leaf.co_filename), leaf.co_name) not in _IDLE
+        if self.endpoint is None:
+            # the router adds the matched route to the scope
+            endpoint = getattr(self.scope.get("route"), "endpoint", None)
+            self.endpoint = getattr(endpoint, "__code__", None)
+        return self.endpoint is not None and self.endpoint in codes
+
+
+class _Sampler:
+    """Samples all threads while at least one session is open; the thread
+    exits when the last session closes."""
+
+    def __init__(self):
+        self._sessions: List[_Session] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._labels = {}
+
+    def open(self, session: _Session):
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def close(self, session: _Session):
+        with self._lock:
+            self._sessions.remove(session)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                stack = None
+                for session in sessions:
+                    if not codes or not session.matches(ident, codes):
+                        continue
+                    if stack is None:
+                        stack = ";".join([names.get(ident, str(ident))] + [self._label(c) for c in codes])
+                    session.stacks[stack] += 1
+                    session.samples += 1
+            time.sleep(interval)
+
+
+_sampler = _Sampler()
+
+
+# ─── Profile Ring ─────────────────────────────────────────────────────────
+def _write(name: str, session: _Session) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stacks = dict(session.stacks)  # the sampler may still be adding to it
+    with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {n}\n" for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1]))
+    files = list_profiles()
+    for old in files[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old["name"]))
+        except OSError:
+            pass
+    return name
+
+def _profile_name(kind: str, duration_ms: float) -> str:
+    kind = re.sub(r"[^A-Za-z0-9]+", "-", kind).strip("-")
+    return f"{time.strftime('%Y%m%d-%H%M%S')}_{kind}_{duration_ms:.0f}ms_{os.urandom(3).hex()}.collapsed"
+
+def list_profiles() -> List[dict]:
+    """Stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    files = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".collapsed"):
+            stat = entry.stat()
+            files.append({"name": entry.name, "bytes": stat.st_size, "mtime": stat.st_mtime})
+    return sorted(files, key=lambda f: f["mtime"], reverse=True)
+
+def read_profile(name: str) -> Optional[str]:
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    if not name.endswith(".collapsed") or not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def profile_process(seconds: float) -> dict:
+    """Samples every busy thread for `seconds`; blocks meanwhile."""
+    session = _Session()
+    _sampler.open(session)
+    try:
+        time.sleep(seconds)
+    finally:
+        _sampler.close(session)
+    name = _write(_profile_name("process", seconds * 1000), session)
+    return {"name": name, "samples": session.samples}
+
+
+# ─── ASGI Middleware ──────────────────────────────────────────────────────
+def _admin_allowed(token: str) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class ProfilingMiddleware:
+    """Profiles requests selected by header or by 1-in-N sampling and
+    stores each profile in the ring."""
+
+    def __init__(self, app):
+        self.app = app
+        self._requests = count(1)
+
+    def _selected(self, scope) -> bool:
+        if PROFILE_SAMPLE_EVERY > 0 and next(self._requests) % PROFILE_SAMPLE_EVERY == 0:
+            return True
+        headers = dict(scope["headers"])
+        return headers.get(b"x-profile") == b"1" and _admin_allowed(headers.get(b"x-admin-token", b"").decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            return await self.app(scope, receive, send)
+        session = _Session(scope)
+        start = time.perf_counter()
+        name = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Routing has matched by now; the file is named when the response starts
+                name[0] = _profile_name(f"{scope['method']}-{getattr(scope.get('route'), 'path', scope['path'])}",
+                                        (time.perf_counter() - start) * 1000)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", name[0].encode())]
+            await send(message)
+
+        _sampler.open(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _sampler.close(session)
+            _write(name[0] or _profile_name(f"{scope['method']}-{scope['path']}", (time.perf_counter() - start) * 1000),
+                   session)
@@ -0,0 +1,442 @@
+"""
+Request tracing with W3C trace context (`traceparent`), shared by the
+ml-service and the ddi-service. Each service calls configure() from its own
+tracing.py with its name and TRACE_EXPORT / TRACE_SAMPLE_RATE settings.
+
+TracingMiddleware continues the trace of an incoming `traceparent` header
+or starts a new one, and opens a server span per request. Code opens child
+spans with span(), records already-timed calls with record() and Mongo
+commands through mongo_listener(); inject() adds the context to outgoing
+requests so the next service's spans join the same trace. Work that runs
+in another process (the ddi-service worker pool) is carried over with
+current_context(), begin_capture()/end_capture() and replay().
+
+Finished spans are batched by a background thread and exported as
+OTLP/JSON: appended to a local file, one export request per line (the
+format of the OpenTelemetry collector's file exporter), or POSTed to an
+OTLP/HTTP collector when the export target is a URL such as
+http://localhost:4318/v1/traces. Without an export target no spans are
+created; an incoming `traceparent` is still passed on unchanged.
+
+Break a trace file (all services can append to the same one) down with:
+    python -m observability.tracing traces.jsonl --slowest 5
+    python -m observability.tracing traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+import argparse
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+# Settings, set by configure()
+SERVICE_NAME = "unknown"
+SAMPLE_RATE = 1.0
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def parse_traceparent(value: str) -> Optional[SpanContext]:
+    """SpanContext of a `traceparent` header value, or None if malformed."""
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or parts[0] == "ff" or (parts[0] == "00" and len(parts) != 4):
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if len(version) != 2 or len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+def format_traceparent(ctx) -> str:
+    return f"00-{ctx.trace_id}-{ctx.span_id}-{'01' if ctx.sampled else '00'}"
+
+
+# ─── Spans ────────────────────────────────────────────────────────────────
+# The current span (or the remote parent) of the running request; copied
+# into threadpool workers with the rest of the context.
+_current: ContextVar = ContextVar("trace_span", default=None)
+_capture: Optional[list] = None  # set inside pool workers while a call runs
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent=None, kind: str = "internal", attributes: Optional[dict] = None,
+                 start_ns: Optional[int] = None):
+        if parent is None:
+            self.trace_id, self.parent_id = os.urandom(16).hex(), ""
+            self.sampled = random.random() < SAMPLE_RATE
+        else:
+            self.trace_id, self.parent_id, self.sampled = parent.trace_id, parent.span_id, parent.sampled
+        self.span_id = os.urandom(8).hex()
+        self.name, self.kind = name, kind
+        self.attributes = attributes or {}
+        self.start_ns = start_ns or time.time_ns()
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self):
+        if not self.sampled or _exporter is None:
+            return
+        if _capture is not None:
+            _capture.append(self._otlp(time.time_ns()))
+        else:
+            _exporter.submit(self._otlp(time.time_ns()))
+
+    def _otlp(self, end_ns: int) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": _KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+_NOOP = _NoopSpan()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Child span of the current one around the block; yields the span so
+    attributes can be added with .set()."""
+    if _exporter is None:
+        yield _NOOP
+        return
+    s = Span(name, _current.get(), kind, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def record(name: str, start: float, error: Optional[str] = None, kind: str = "internal", **attributes):
+    """Records a finished leaf span that began at time.perf_counter()
+    `start`, for call sites that already time themselves."""
+    if _exporter is None:
+        return
+    parent = _current.get()
+    if parent is not None and not parent.sampled:
+        return
+    start_ns = time.time_ns() - int((time.perf_counter() - start) * 1e9)
+    s = Span(name, parent, kind, attributes, start_ns)
+    s.error = error
+    s.end()
+
+
+def inject(headers: Optional[dict] = None) -> dict:
+    """`headers` plus the `traceparent` of the current span, for outgoing
+    requests to the other services."""
+    headers = dict(headers or {})
+    ctx = _current.get()
+    if ctx is not None:
+        headers["traceparent"] = format_traceparent(ctx)
+    return headers
+
+
+# ─── Worker Pool Forwarding ───────────────────────────────────────────────
+def current_context() -> Optional[SpanContext]:
+    ctx = _current.get()
+    return None if ctx is None else SpanContext(ctx.trace_id, ctx.span_id, ctx.sampled)
+
+def begin_capture(parent: Optional[SpanContext]):
+    global _capture
+    _capture = []
+    _current.set(parent)
+
+def end_capture() -> list:
+    global _capture
+    captured, _capture = _capture or [], None
+    _current.set(None)
+    return captured
+
+def replay(spans: list):
+    if _exporter is not None:
+        for span_json in spans:
+            _exporter.submit(span_json)
+
+
+# ─── ASGI / Mongo hooks ───────────────────────────────────────────────────
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, ended with the
+    last body chunk. The span is named after the route template once
+    routing has matched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        parent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if _exporter is None:
+            if parent is None:
+                return await self.app(scope, receive, send)
+            token = _current.set(parent)
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+
+        s = Span(f"{scope['method']} {scope['path']}", parent, "server",
+                 {"http.method": scope["method"], "http.target": scope["path"]})
+        token = _current.set(s)
+        ended = [False]
+
+        def finish(status: int):
+            if ended[0]:
+                return
+            ended[0] = True
+            route = scope.get("route")
+            if route is not None:
+                s.name = f"{scope['method']} {route.path}"
+                s.set("http.route", route.path)
+            s.set("http.status_code", status)
+            if status >= 500 and not s.error:
+                s.error = f"HTTP {status}"
+            s.end()
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish(status[0])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            s.error = f"{type(e).__name__}: {e}"
+            finish(500)
+            raise
+        finally:
+            _current.reset(token)
+
+
+def mongo_listener():
+    """pymongo CommandListener recording a client span per command issued
+    inside a traced request; pass it to MongoClient(event_listeners=[...])."""
+    from pymongo import monitoring
+
+    class _MongoListener(monitoring.CommandListener):
+        def __init__(self):
+            self._open = {}
+
+        def started(self, event):
+            parent = _current.get()
+            if _exporter is None or parent is None or not parent.sampled:
+                return
+            target = event.command.get(event.command_name)
+            self._open[(event.request_id, event.connection_id)] = Span(
+                f"mongo {event.command_name}", parent, "client",
+                {"db.system": "mongodb", "db.name": event.database_name, "db.operation": event.command_name,
+                 "db.mongodb.collection": target if isinstance(target, str) else None})
+
+        def succeeded(self, event):
+            self._finish(event, None)
+
+        def failed(self, event):
+            self._finish(event, str(event.failure))
+
+        def _finish(self, event, error):
+            s = self._open.pop((event.request_id, event.connection_id), None)
+            if s is not None:
+                s.error = error
+                s.end()
+
+    return _MongoListener()
+
+
+# ─── Export ───────────────────────────────────────────────────────────────
+class _Exporter:
+    """Queues finished spans and writes them in batches from a daemon
+    thread, started with the first span. Spans are dropped (and counted)
+    when the queue is full."""
+
+    def __init__(self, target: str, batch_size: int = 512, interval: float = 2.0, max_queue: int = 20000):
+        self.target, self.batch_size, self.interval = target, batch_size, interval
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._started = False
+
+    def submit(self, span_json: dict):
+        if not self._started:
+            self._start()
+        try:
+            self.queue.put_nowait(span_json)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            while True:
+                spans = []
+                try:
+                    while len(spans) < self.batch_size:
+                        spans.append(self.queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not spans:
+                    return
+                try:
+                    self._write(spans)
+                except Exception as e:
+                    print(f"Warning: trace export to {self.target} failed: {e}")
+
+    def _write(self, spans: list):
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "drugnexus.tracing"}, "spans": spans}],
+        }]}
+        if self.target.startswith(("http://", "https://")):
+            import requests
+            requests.post(self.target, json=payload, timeout=5).raise_for_status()
+        else:
+            with open(self.target, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+_exporter: Optional[_Exporter] = None
+
+
+def configure(service_name: str, export: str, sample_rate: float = 1.0):
+    """Names the service in exported spans and turns tracing on when
+    `export` (a file path or OTLP/HTTP URL) is set; call once at import."""
+    global SERVICE_NAME, SAMPLE_RATE, _exporter
+    SERVICE_NAME, SAMPLE_RATE = service_name, sample_rate
+    _exporter = _Exporter(export) if export else None
+
+
+# ─── Trace file viewer ────────────────────────────────────────────────────
+def load_spans(path: str) -> dict:
+    """{trace id: [span, ...]} from an OTLP/JSON lines file; every span gets
+    a "service" key from its resource."""
+    traces = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                attrs = resource_spans.get("resource", {}).get("attributes", [])
+                service = next((a["value"].get("stringValue") for a in attrs if a["key"] == "service.name"), "?")
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for s in scope_spans.get("spans", []):
+                        s["service"] = service
+                        traces.setdefault(s["traceId"], []).append(s)
+    return traces
+
+
+def _duration_ms(s: dict) -> float:
+    return (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+
+def format_trace(spans: list) -> str:
+    """Indented span tree of one trace with start offsets and durations."""
+    ids = {s["spanId"] for s in spans}
+    children = {}
+    for s in spans:
+        parent = s.get("parentSpanId") if s.get("parentSpanId") in ids else ""
+        children.setdefault(parent, []).append(s)
+    for group in children.values():
+        group.sort(key=lambda s: int(s["startTimeUnixNano"]))
+    t0 = min(int(s["startTimeUnixNano"]) for s in spans)
+    lines = []
+
+    def walk(s: dict, depth: int):
+        offset = (int(s["startTimeUnixNano"]) - t0) / 1e6
+        status = "  ERROR " + s["status"].get("message", "") if s.get("status", {}).get("code") == 2 else ""
+        label = f"{'  ' * depth}{s['name']}"
+        lines.append(f"{offset:>9.1f} {_duration_ms(s):>9.1f} ms  {s['service']:<12} {label}{status}")
+        for child in children.get(s["spanId"], []):
+            walk(child, depth + 1)
+
+    for root in children.get("", []):
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show traces from an OTLP/JSON lines trace file")
+    parser.add_argument("file")
+    parser.add_argument("--trace", help="trace id to show")
+    parser.add_argument("--slowest", type=int, default=10, help="show the N traces with the longest root span")
+    args = parser.parse_args()
+
+    traces = load_spans(args.file)
+    if args.trace:
+        selected = [args.trace] if args.trace in traces else []
+    else:
+        span_ms = {tid: max(_duration_ms(s) for s in spans) for tid, spans in traces.items()}
+        selected = sorted(span_ms, key=span_ms.get, reverse=True)[:args.slowest]
+    if not selected:
+        print("No matching traces.")
+    for tid in selected:
+        print(f"trace {tid}\n{'start':>9} {'duration':>12}  {'service':<12} span")
+        print(format_trace(traces[tid]) + "\n")
+
+
+if __name__ == "__main__":
+    main()